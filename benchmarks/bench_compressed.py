@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Compares the end-to-end throughput of ReadDSSP (read, decompress and parse) on plain DSSP files,
+on files compressed with gzip, bzip2 and xz, and on members of an uncompressed tar archive of plain or
+gzip-compressed files. The data set is made by benchmarks.synthetic_dssp; the parsed output of every
+format is checked against the plain files. Throughput is given in plain-text megabytes per second, so
+the formats compare directly; the size column shows what each format stores on disk.
+
+The archive's member index is built before the timed runs, as it is once per archive in practice. The
+files are read from the page cache, so the timings show the CPU cost of each format; on storage where
+I/O is the bottleneck, the smaller formats gain in proportion to their size.
+
+Run from the repository root:
+    python -m benchmarks.bench_compressed
+"""
+
+import os
+import time
+import tarfile
+import tempfile
+import numpy as np
+from benchmarks.synthetic_dssp import SyntheticDSSP
+from src.archive import DsspArchive
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+
+N_PROTEINS = 200
+REPEATS = 3
+
+
+def write_formats(directory: str, pdb_ids: list) -> dict:
+    """Writes the plain files of directory/plain in every format; returns (DSSP path, archives) by name."""
+    plain_path = os.path.join(directory, 'plain')
+    formats = {'plain': (plain_path, [])}
+    for suffix, compression in ReadDSSP.compressions.items():
+        path = os.path.join(directory, suffix.strip('.'))
+        os.makedirs(path)
+        for pdb_id in pdb_ids:
+            name = pdb_id + Settings.dssp_extension
+            with open(os.path.join(plain_path, name), 'rb') as fp, \
+                    compression.open(os.path.join(path, name + suffix), 'wb') as compressed_fp:
+                compressed_fp.write(fp.read())
+        formats[suffix.strip('.')] = (path, [])
+    for name, source in (('tar', plain_path), ('tar of gz', formats['gz'][0])):
+        archive_path = os.path.join(directory, name.replace(' ', '_') + '.tar')
+        with tarfile.open(archive_path, 'w') as tar:
+            tar.add(source, arcname='dssp')
+        empty_path = os.path.join(directory, name.replace(' ', '_') + '_empty')
+        os.makedirs(empty_path)
+        formats[name] = (empty_path, [archive_path])
+    return formats
+
+
+def get_size(dssp_path: str, archives: list) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(dssp_path)) + sum(map(os.path.getsize, archives))
+
+
+def read_all(pdb_ids: list) -> list:
+    return [ReadDSSP.read_chain_arrays(pdb_id=pdb_id) for pdb_id in pdb_ids]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        Settings.cache_enabled = False
+        Settings.cache_path = os.path.join(directory, 'cache')
+        pdb_ids, n_residues = SyntheticDSSP(seed=1).write_dataset(
+            directory=os.path.join(directory, 'plain'), n_proteins=N_PROTEINS
+        )
+        formats = write_formats(directory=directory, pdb_ids=pdb_ids)
+        plain_bytes = get_size(*formats['plain'])
+        expected = None
+        plain_time = None
+        print(f'{N_PROTEINS} proteins, {n_residues} residues, {plain_bytes / 1024 ** 2:.1f} MB of plain text')
+        print(f'{"format":<10} {"size [MB]":>10} {"ratio":>7} {"time [ms]":>10} {"MB/s":>8} {"residues/s":>12} '
+              f'{"vs plain":>9}')
+        for name, (dssp_path, archives) in formats.items():
+            Settings.dssp_path, Settings.dssp_archives = dssp_path, archives
+            DsspArchive.archives.clear()
+            observed = read_all(pdb_ids)  # builds the member index of an archive
+            if expected is None:
+                expected = observed
+            for observed_arrays, expected_arrays in zip(observed, expected):
+                assert all(np.array_equal(a, b) for a, b in zip(observed_arrays, expected_arrays)), name
+            timings = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                read_all(pdb_ids)
+                timings.append(time.perf_counter() - start)
+            seconds = min(timings)
+            plain_time = plain_time or seconds
+            size = get_size(dssp_path, archives)
+            print(f'{name:<10} {size / 1024 ** 2:>10.1f} {plain_bytes / size:>6.1f}x {seconds * 1e3:>10.1f} '
+                  f'{plain_bytes / 1024 ** 2 / seconds:>8.1f} {n_residues / seconds:>12,.0f} '
+                  f'{plain_time / seconds:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
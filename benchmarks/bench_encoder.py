@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Compares the per-residue window encoding loop with the batched WindowEncoder.
+
+Run from the repository root:
+    python -m benchmarks.bench_encoder
+"""
+
+import time
+import numpy as np
+from src.read_dssp import ReadDSSP
+from src.residue import Residue
+
+LENGTHS = (100, 500, 1000, 2500, 5000)
+REPEATS = 3
+
+
+def get_random_residue(length: int, rng: np.random.Generator) -> Residue:
+    residue = Residue(pdb_id=f'synthetic{length}')
+    amino_acids = [aa for aa in residue.amino_acids.keys() if aa != '-']
+    categories = list(residue.targets.keys())
+    residue.residue_and_structure = [
+        ReadDSSP.ResidueAndCategory(amino_acid=aa, category=cat)
+        for aa, cat in zip(rng.choice(amino_acids, size=length), rng.choice(categories, size=length))
+    ]
+    residue.residue_count = length
+    residue.is_setup = True
+    return residue
+
+
+def loop_encoding(residue: Residue) -> None:
+    """The per-residue loop that get_X_and_Y_arrays used before batching."""
+    input_group_units = np.array(list(residue.amino_acids.keys()))
+    input_group_units_length = input_group_units.shape[0]
+    ouput_units = np.array(list(residue.targets.keys()))
+    n_groups = residue.residue_count - residue.window_length
+    X_data = np.zeros((n_groups, residue.window_length * input_group_units_length))
+    Y_data = np.zeros((n_groups, len(ouput_units)))
+    for residue_counter in range(residue.central_aa_pos, n_groups):
+        idx = residue_counter - residue.central_aa_pos + residue.window_length - 1
+        current_aa = residue.residue_and_structure[idx].amino_acid
+        current_units = residue.get_onehot_encoded_label(target_units=input_group_units, label=current_aa)
+        X_data[residue_counter] = np.append(X_data[residue_counter - 1][input_group_units_length:], current_units)
+        category = residue.residue_and_structure[residue_counter].category
+        Y_data[residue_counter] = residue.get_onehot_encoded_label(target_units=ouput_units, label=category)
+
+
+def best_of(func, *args) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    rng = np.random.default_rng(1)
+    print(f'{"residues":>10} {"loop [ms]":>12} {"batched [ms]":>14} {"speedup":>9}')
+    for length in LENGTHS:
+        residue = get_random_residue(length=length, rng=rng)
+        loop_time = best_of(loop_encoding, residue)
+        batched_time = best_of(residue.get_X_and_Y_arrays)
+        print(f'{length:>10} {loop_time * 1e3:>12.2f} {batched_time * 1e3:>14.2f} {loop_time / batched_time:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
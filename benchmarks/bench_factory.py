@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Measures how ResidueFactory.construct scales with the number of worker processes, on copies of
+test/1tes.dssp. The DSSP files are parsed on every run (no cache).
+
+Run from the repository root:
+    python -m benchmarks.bench_factory [n_proteins]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+from src.read_dssp import ReadDSSP
+from src.residue import ResidueFactory
+from src.settings import Settings
+
+FIXTURE = os.path.join('test', '1tes.dssp')
+
+
+def main(n_proteins: int = 2000):
+    worker_counts = sorted({1, 2, 4, 8, 16, 32, os.cpu_count()})
+    worker_counts = [n for n in worker_counts if n <= os.cpu_count()]
+    with tempfile.TemporaryDirectory() as directory:
+        Settings.dssp_path = directory
+        pdb_ids = [f'{i:04d}' for i in range(n_proteins)]
+        for pdb_id in pdb_ids:
+            shutil.copy(FIXTURE, os.path.join(directory, pdb_id) + Settings.dssp_extension)
+        print(f'{n_proteins} proteins on {os.cpu_count()} cores')
+        print(f'{"workers":>8} {"time [s]":>10} {"proteins/s":>12} {"speedup":>9}')
+        baseline = None
+        for n_workers in worker_counts:
+            factory = ResidueFactory(pdb_id_lst=pdb_ids, feature_format='codes', read_seq=ReadDSSP, n_workers=n_workers)
+            start = time.perf_counter()
+            residues = factory.construct()
+            elapsed = time.perf_counter() - start
+            assert len(residues) == n_proteins, factory.errors[:3]
+            baseline = baseline or elapsed
+            print(f'{n_workers:>8} {elapsed:>10.2f} {n_proteins / elapsed:>12,.0f} {baseline / elapsed:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Compares prediction with MLPClassifier.predict on sparse one-hot input, the float32
+InferenceEngine on the same input, and the engine on uint8 window codes, whose first layer gathers
+weight rows instead of building one-hot features. Reports latency of single windows, throughput on
+large batches and the input size per window of each path.
+
+Run from the repository root:
+    python -m benchmarks.bench_inference
+"""
+
+import time
+import numpy as np
+from sklearn.neural_network import MLPClassifier
+from src.inference import InferenceEngine
+from src.residue import Residue
+
+SIZES = (1, 100, 10000, 200000)
+HIDDEN_LAYER_SIZES = (13, 13)
+N_TIMINGS = 5
+
+
+def get_model(encoder) -> MLPClassifier:
+    rng = np.random.default_rng(1)
+    X_codes = rng.integers(0, encoder.n_input_units, size=(5000, encoder.window_length), dtype=np.uint8)
+    Y_data = encoder.expand_Y(rng.integers(0, encoder.n_output_units, size=5000).astype(np.uint8))
+    model = MLPClassifier(hidden_layer_sizes=HIDDEN_LAYER_SIZES, max_iter=5, random_state=1)
+    return model.fit(encoder.to_sparse(X_codes), Y_data)
+
+
+def best_of(func, *args) -> float:
+    timings = []
+    for _ in range(N_TIMINGS):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    encoder = Residue.get_encoder()
+    model = get_model(encoder)
+    engine = InferenceEngine.from_classifier(model)
+    rng = np.random.default_rng(2)
+    X_codes = rng.integers(0, encoder.n_input_units + 1, size=(1000, encoder.window_length), dtype=np.uint8)
+    X_sparse = encoder.to_sparse(X_codes)
+    sparse_bytes = X_sparse.data.nbytes + X_sparse.indices.nbytes + X_sparse.indptr.nbytes
+    print(f'Input per window: dense one-hot {encoder.expand_X(X_codes).nbytes // 1000} B, '
+          f'sparse {sparse_bytes // 1000} B, codes {X_codes.nbytes // 1000} B')
+    print(f'{"windows":>10} {"sklearn [ms]":>14} {"engine [ms]":>13} {"codes [ms]":>12} {"sklearn [win/s]":>17} '
+          f'{"codes [win/s]":>15} {"speedup":>9} {"same labels":>12}')
+    for size in SIZES:
+        X_codes = rng.integers(0, encoder.n_input_units + 1, size=(size, encoder.window_length), dtype=np.uint8)
+        # The one-hot paths pay for building their input, as they do when predicting from window codes.
+        sklearn_time = best_of(lambda X: model.predict(encoder.to_sparse(X)), X_codes)
+        engine_time = best_of(lambda X: engine.predict(encoder.to_sparse(X)), X_codes)
+        codes_time = best_of(engine.predict, X_codes)
+        same = bool((model.predict(encoder.to_sparse(X_codes)) == engine.predict(X_codes)).all())
+        print(f'{size:>10} {sklearn_time * 1e3:>14.3f} {engine_time * 1e3:>13.3f} {codes_time * 1e3:>12.3f} '
+              f'{size / sklearn_time:>17,.0f} {size / codes_time:>15,.0f} {sklearn_time / codes_time:>8.1f}x '
+              f'{str(same):>12}')
+
+
+if __name__ == '__main__':
+    main()
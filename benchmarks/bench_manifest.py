@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Times the manifest of a synthetic DSSP library: the first scan, which reads every file, a rescan of
+the unchanged library, a rescan after 1% of the files changed, and selecting proteins from the stored
+manifest, which reads no DSSP file. The first scan runs with 1 and with 4 worker processes.
+
+Run from the repository root:
+    python -m benchmarks.bench_manifest
+"""
+
+import os
+import time
+import tempfile
+from benchmarks.synthetic_dssp import SyntheticDSSP
+from src.manifest import DsspManifest
+from src.settings import Settings
+
+N_PROTEINS = 1000
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        Settings.dssp_path = os.path.join(directory, 'dssp')
+        Settings.dssp_archives = []
+        Settings.manifest_path = os.path.join(directory, 'manifest.npz')
+        pdb_ids, n_residues = SyntheticDSSP(seed=1).write_dataset(directory=Settings.dssp_path, n_proteins=N_PROTEINS)
+        print(f'{N_PROTEINS} proteins, {n_residues} residues')
+
+        for n_workers in (1, 4):
+            manifest = DsspManifest()
+            seconds = timed(lambda: manifest.scan(n_workers=n_workers))
+            print(f'first scan, {n_workers} workers: {seconds * 1e3:9.1f} ms ({manifest.n_rescanned} files read)')
+        manifest.save()
+
+        manifest = DsspManifest.open()
+        seconds = timed(lambda: manifest.scan(n_workers=1))
+        print(f'unchanged rescan:        {seconds * 1e3:9.1f} ms ({manifest.n_rescanned} files read)')
+        generator = SyntheticDSSP(seed=2)
+        for pdb_id in pdb_ids[::100]:
+            generator.write(directory=Settings.dssp_path, pdb_id=pdb_id)
+        seconds = timed(lambda: manifest.scan(n_workers=1))
+        print(f'rescan, 1% changed:      {seconds * 1e3:9.1f} ms ({manifest.n_rescanned} files read)')
+        manifest.save()
+
+        selected = []
+        seconds = timed(lambda: selected.extend(DsspManifest.open().select(
+            min_residues=200, max_fractions={'c': 0.5}, n_proteins=100
+        )))
+        print(f'open and select:         {seconds * 1e3:9.1f} ms ({len(selected)} PDB IDs)')
+
+
+if __name__ == '__main__':
+    main()
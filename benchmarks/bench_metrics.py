@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Compares the per-row evaluation loops used before StructureMetrics (exact-match accuracy, decoding
+one-hot rows through ohe2label and scikit-learn's classification_report) with StructureMetrics, which
+computes Q3, per-class metrics, the confusion matrix and SOV of a held-out set in one vectorized pass.
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics
+"""
+
+import time
+import numpy as np
+from sklearn.metrics import classification_report
+from src.metrics import StructureMetrics
+from src.tables import Target
+
+N_PROTEINS = (100, 1000, 5000)
+MEAN_LENGTH = 250
+REPEATS = 3
+
+
+def get_random_labels(n_proteins: int, rng: np.random.Generator) -> tuple:
+    """Returns observed and predicted one-hot labels of proteins with segments of 1 to 12 residues."""
+    lengths = rng.integers(MEAN_LENGTH // 2, 3 * MEAN_LENGTH // 2, size=n_proteins)
+    n_groups = int(lengths.sum())
+    classes = np.repeat(rng.integers(0, 3, size=n_groups), rng.integers(1, 13, size=n_groups))[:n_groups]
+    predicted = np.where(rng.random(n_groups) < 0.7, classes, rng.integers(0, 3, size=n_groups))
+    Y_true = np.eye(3, dtype=np.uint8)[classes]
+    Y_pred = np.eye(3, dtype=np.uint8)[predicted]
+    Y_pred[rng.random(n_groups) < 0.02] = 0  # outputs that stay below 0.5
+    return Y_true, Y_pred, lengths
+
+
+def loop_evaluation(Y_true: np.ndarray, Y_pred: np.ndarray) -> int:
+    """The per-row loops of Predict.accuracy and Training.validate_model before StructureMetrics."""
+    hits = sum(all(Y_true[i] == Y_pred[i]) for i in range(len(Y_true)))
+    predictions, ground_truth = [], []
+    for true_row, pred_row in zip(Y_true, Y_pred):
+        try:
+            predictions.append(Target.ohe2label[tuple(pred_row)])
+            ground_truth.append(Target.ohe2label[tuple(true_row)])
+        except KeyError:
+            pass
+    classification_report(ground_truth, predictions)
+    return hits
+
+
+def vectorized_evaluation(Y_true: np.ndarray, Y_pred: np.ndarray, lengths: np.ndarray) -> None:
+    metrics = StructureMetrics()
+    metrics.update(Y_true=Y_true, Y_pred=Y_pred, lengths=lengths)
+    metrics.get_report()
+
+
+def best_of(func, *args) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    rng = np.random.default_rng(1)
+    print(f'{"proteins":>10} {"groups":>10} {"loop [ms]":>12} {"vectorized [ms]":>17} {"groups/s":>14} '
+          f'{"speedup":>9}')
+    for n_proteins in N_PROTEINS:
+        Y_true, Y_pred, lengths = get_random_labels(n_proteins=n_proteins, rng=rng)
+        loop_time = best_of(loop_evaluation, Y_true, Y_pred)
+        vectorized_time = best_of(vectorized_evaluation, Y_true, Y_pred, lengths)
+        print(f'{n_proteins:>10} {len(Y_true):>10} {loop_time * 1e3:>12.1f} {vectorized_time * 1e3:>17.1f} '
+              f'{len(Y_true) / vectorized_time:>14,.0f} {loop_time / vectorized_time:>8.0f}x')
+
+
+if __name__ == '__main__':
+    main()
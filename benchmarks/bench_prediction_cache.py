@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Times SequencePredict on a stream of random sequences in which a quarter are distinct and the rest
+repeat them, as identical chains of assemblies and resubmitted proteins do: without the prediction
+cache, with an empty in-memory cache, with the warm in-memory cache of the first pass and with a new
+cache that only has the on-disk tier of the earlier passes, as a later run would.
+
+Run from the repository root:
+    python -m benchmarks.bench_prediction_cache
+"""
+
+import os
+import time
+import tempfile
+import numpy as np
+from benchmarks.bench_inference import get_model
+from src.inference import InferenceEngine
+from src.predict import SequencePredict
+from src.prediction_cache import PredictionCache
+from src.residue import Residue
+from src.settings import Settings
+
+N_SEQUENCES = 4000
+N_DISTINCT = 1000
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def make_records(rng: np.random.Generator) -> list:
+    distinct = [
+        ''.join(rng.choice(list(AMINO_ACIDS), size=int(rng.integers(50, 500)))) for _ in range(N_DISTINCT)
+    ]
+    return [(f's{i}', distinct[int(rng.integers(0, N_DISTINCT))]) for i in range(N_SEQUENCES)]
+
+
+def timed(predict: SequencePredict, records: list) -> float:
+    start = time.perf_counter()
+    for _ in predict.iter_predictions(records=records):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    engine = InferenceEngine.from_classifier(get_model(Residue.get_encoder()))
+    records = make_records(rng=np.random.default_rng(1))
+    n_residues = sum(len(sequence) for _, sequence in records)
+    print(f'{N_SEQUENCES} sequences, {N_DISTINCT} distinct, {n_residues} residues')
+    print(f'{"cache":<22} {"time [ms]":>10} {"residues/s":>12} {"hits":>6} {"misses":>7}')
+    Settings.prediction_cache_enabled = False
+    seconds = timed(SequencePredict(model=engine), records)
+    print(f'{"none":<22} {seconds * 1e3:>10.1f} {n_residues / seconds:>12,.0f} {"":>6} {"":>7}')
+    with tempfile.TemporaryDirectory() as directory:
+        disk_path = os.path.join(directory, 'predictions')
+        first_cache = PredictionCache(disk_path=disk_path)
+        for label, cache in (('memory, empty', first_cache), ('memory, warm', first_cache),
+                             ('disk, new process', PredictionCache(disk_path=disk_path))):
+            hits, misses = cache.hits, cache.misses
+            seconds = timed(SequencePredict(model=engine, cache=cache), records)
+            print(f'{label:<22} {seconds * 1e3:>10.1f} {n_residues / seconds:>12,.0f} {cache.hits - hits:>6} '
+                  f'{cache.misses - misses:>7}')
+
+
+if __name__ == '__main__':
+    main()
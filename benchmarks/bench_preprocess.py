@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Compares time and peak memory of Training.preprocess with the per-protein concatenation it used
+before, for growing numbers of copies of test/1tes.dssp (dense features).
+
+Run from the repository root:
+    python -m benchmarks.bench_preprocess
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+from src.training import Training
+
+FIXTURE = os.path.join('test', '1tes.dssp')
+N_PROTEINS = (25, 50, 100, 200)
+
+
+def concatenate_per_protein(training: Training) -> None:
+    """The growing np.concatenate that Training.preprocess used before the two-pass builder."""
+    factory = training.get_factory()
+    factory.feature_format = 'dense'
+    first = True
+    for obj in factory.construct().values():
+        if first:
+            training.X_data, training.Y_data = obj.X_data, obj.Y_data
+            first = False
+        else:
+            training.X_data = np.concatenate((training.X_data, obj.X_data))
+            training.Y_data = np.concatenate((training.Y_data, obj.Y_data))
+
+
+def measure(func, training: Training) -> tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(training)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    training.X_data = training.Y_data = None
+    return elapsed, peak / 1024 ** 2
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        Settings.dssp_path = directory
+        # Time the DSSP files themselves; nothing is written to the parsed-DSSP cache of settings.ini.
+        Settings.cache_enabled = False
+        Settings.cache_path = os.path.join(directory, 'cache')
+        pdb_ids = [f'{i:04d}' for i in range(max(N_PROTEINS))]
+        for pdb_id in pdb_ids:
+            shutil.copy(FIXTURE, os.path.join(directory, pdb_id) + Settings.dssp_extension)
+        print(f'{"proteins":>9} {"concat [s]":>11} {"concat [MB]":>12} {"builder [s]":>12} {"builder [MB]":>13}')
+        for n_proteins in N_PROTEINS:
+            training = Training(feature_format='dense', read_seq=ReadDSSP, n_workers=1)
+            training.pdb_lst = pdb_ids[:n_proteins]
+            concat_time, concat_peak = measure(concatenate_per_protein, training)
+            builder_time, builder_peak = measure(Training.preprocess, training)
+            print(f'{n_proteins:>9} {concat_time:>11.2f} {concat_peak:>12.0f} {builder_time:>12.2f} '
+                  f'{builder_peak:>13.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Measures DSSP parse throughput in residues per second for the line-by-line reader and the bulk
+parser, on files made by repeating the residue lines of test/1tes.dssp.
+
+Run from the repository root:
+    python -m benchmarks.bench_read_dssp
+"""
+
+import os
+import tempfile
+import time
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+
+FIXTURE = os.path.join('test', '1tes.dssp')
+REPEATS = (1, 10, 50)
+N_TIMINGS = 3
+
+
+def write_dssp_file(directory: str, pdb_id: str, repeats: int) -> None:
+    with open(FIXTURE, 'r') as fp:
+        lines = fp.readlines()
+    header_idx = next(i for i, line in enumerate(lines) if line.startswith(ReadDSSP.header_line))
+    with open(os.path.join(directory, pdb_id) + Settings.dssp_extension, 'w') as fp:
+        fp.writelines(lines[:header_idx + 1])
+        for _ in range(repeats):
+            fp.writelines(lines[header_idx + 1:])
+
+
+def read_line_by_line(pdb_id: str) -> list:
+    """The line-by-line reader that ReadDSSP.read used before the bulk parser."""
+    residue_and_category_lst = []
+    read_line = False
+    with open(ReadDSSP.get_filename(pdb_id=pdb_id), 'r') as fp:
+        for line in fp:
+            if line.startswith(ReadDSSP.header_line):
+                read_line = True
+                continue
+            if read_line:
+                aa, structure, tag = ReadDSSP.extract_info_from_line(line=line)
+                if tag.name == 'OKAY':
+                    cat = ReadDSSP.dssp_structure_to_category(structure_label=structure)
+                    residue_and_category_lst.append(ReadDSSP.ResidueAndCategory(amino_acid=aa.upper(), category=cat))
+    return residue_and_category_lst
+
+
+def residues_per_second(func, pdb_id: str, n_residues: int) -> float:
+    best = min(_time(func, pdb_id) for _ in range(N_TIMINGS))
+    return n_residues / best
+
+
+def _time(func, pdb_id: str) -> float:
+    start = time.perf_counter()
+    func(pdb_id)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        Settings.dssp_path = directory
+        # Time the DSSP files themselves; nothing is written to the parsed-DSSP cache of settings.ini.
+        Settings.cache_enabled = False
+        Settings.cache_path = os.path.join(directory, 'cache')
+        print(f'{"residues":>10} {"line-by-line [res/s]":>22} {"read() [res/s]":>16} {"read_arrays() [res/s]":>23}')
+        for repeats in REPEATS:
+            pdb_id = f'rep{repeats}'
+            write_dssp_file(directory=directory, pdb_id=pdb_id, repeats=repeats)
+            n_residues = len(ReadDSSP.read_arrays(pdb_id)[0])
+            line_rate = residues_per_second(read_line_by_line, pdb_id, n_residues)
+            read_rate = residues_per_second(ReadDSSP.read, pdb_id, n_residues)
+            bulk_rate = residues_per_second(ReadDSSP.read_arrays, pdb_id, n_residues)
+            print(f'{n_residues:>10} {line_rate:>22,.0f} {read_rate:>16,.0f} {bulk_rate:>23,.0f}')
+
+
+if __name__ == '__main__':
+    main()
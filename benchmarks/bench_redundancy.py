@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Times the sketching and clustering of RedundancyFilter on synthetic chains, to show that the cost
+grows with the number of chains and not with the number of pairs. Every fourth chain founds a family;
+the others are copies (as in homo-oligomers) or mutants at 95% identity of a family member. Chains are
+made in memory, so reading DSSP files is not timed; see benchmarks.bench_read_dssp for that.
+
+Run from the repository root:
+    python -m benchmarks.bench_redundancy
+"""
+
+import time
+import numpy as np
+from src.redundancy import RedundancyFilter
+
+SIZES = (1000, 10000, 50000)
+
+
+def make_chains(n_chains: int, rng: np.random.Generator) -> list:
+    chains = []
+    for i in range(n_chains):
+        if i % 4 == 0:
+            chains.append(rng.integers(0, 20, size=int(rng.integers(80, 400))).astype(np.uint8))
+            continue
+        chain = chains[i - i % 4].copy()
+        if i % 2:
+            positions = rng.choice(len(chain), size=len(chain) // 20, replace=False)
+            chain[positions] = (chain[positions] + rng.integers(1, 20, size=len(positions))) % 20
+        chains.append(chain)
+    return chains
+
+
+def main():
+    rng = np.random.default_rng(1)
+    redundancy_filter = RedundancyFilter(identity=0.9, kmer_length=5, window=5)
+    print(f'{"chains":>8} {"families":>9} {"kept":>8} {"sketch [s]":>11} {"cluster [s]":>12} {"chains/s":>10}')
+    for n_chains in SIZES:
+        chains = make_chains(n_chains=n_chains, rng=rng)
+        start = time.perf_counter()
+        sketches = [
+            (str(i), chain, RedundancyFilter.get_minimizers(chain, kmer_length=5, window=5))
+            for i, chain in enumerate(chains)
+        ]
+        sketch_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        redundancy_filter.cluster(sketches=sketches)
+        cluster_seconds = time.perf_counter() - start
+        chains_per_second = n_chains / (sketch_seconds + cluster_seconds)
+        print(f'{n_chains:>8} {(n_chains + 3) // 4:>9} {len(redundancy_filter.representatives):>8} '
+              f'{sketch_seconds:>11.2f} {cluster_seconds:>12.2f} {chains_per_second:>10,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Cold-start cost of the command line interface: wall time and import time, measured with
+python -X importtime, of `pred-sec-struc.py -h` and of `-p` for one PDB ID, in fresh interpreters.
+For reference the import of scikit-learn's neural network module, which every invocation used to pay,
+is measured the same way.
+
+The -p run uses a temporary working directory with its own settings.ini, a model with random weights
+and test/1tes.dssp, so no trained model or DSSP directory is needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+"""
+
+import os
+import re
+import sys
+import shutil
+import subprocess
+import tempfile
+import time
+import numpy as np
+from src.model_io import ModelArtifact
+from src.residue import Residue
+
+N_RUNS = 5
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(REPOSITORY_DIR, 'pred-sec-struc.py')
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def make_workdir(workdir: str) -> None:
+    """Write a settings.ini, a DSSP directory and a model with random weights into workdir."""
+    shutil.copytree(os.path.join(REPOSITORY_DIR, 'data'), os.path.join(workdir, 'data'))
+    os.makedirs(os.path.join(workdir, 'dssp'))
+    shutil.copy(os.path.join(REPOSITORY_DIR, 'test', '1tes.dssp'), os.path.join(workdir, 'dssp'))
+    with open(os.path.join(REPOSITORY_DIR, 'settings.ini'), 'r') as fp:
+        settings = re.sub(r'(?m)^DsspPath = .*$', 'DsspPath = dssp', fp.read())
+    with open(os.path.join(workdir, 'settings.ini'), 'w') as fp:
+        fp.write(settings)
+    encoder = Residue.get_encoder()
+    rng = np.random.default_rng(1)
+    sizes = (encoder.window_length * encoder.n_input_units, 5, 3, encoder.n_output_units)
+    ModelArtifact(
+        coefs=[rng.normal(size=shape).astype(np.float32) for shape in zip(sizes[:-1], sizes[1:])],
+        intercepts=[np.zeros(size, dtype=np.float32) for size in sizes[1:]],
+        window_length=encoder.window_length, amino_acids=encoder.amino_acids, targets=encoder.targets
+    ).save(path=os.path.join(workdir, 'models', ModelArtifact.default_name))
+
+
+def measure(command: list, cwd: str) -> tuple:
+    """Returns the best wall time over N_RUNS, the import time and the heaviest top-level imports."""
+    wall_times = []
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=cwd, capture_output=True, text=True)
+        wall_times.append(time.perf_counter() - start)
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match and not match.group(3):
+            top_level.append((int(match.group(2)), match.group(4)))
+    top_level.sort(reverse=True)
+    import_time = sum(cumulative for cumulative, _ in top_level) / 1e6
+    return min(wall_times), import_time, ', '.join(name for _, name in top_level[:3])
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    try:
+        make_workdir(workdir)
+        commands = {
+            '-h': [sys.executable, '-X', 'importtime', SCRIPT, '-h'],
+            '-p 1tes': [sys.executable, '-X', 'importtime', SCRIPT, '-p', '1tes'],
+            'import sklearn.neural_network': [
+                sys.executable, '-X', 'importtime', '-c', 'import sklearn.neural_network'
+            ],
+        }
+        print(f'{"command":<30} {"wall [ms]":>10} {"imports [ms]":>13}   heaviest imports')
+        for name, command in commands.items():
+            wall_time, import_time, heaviest = measure(command=command, cwd=workdir)
+            print(f'{name:<30} {wall_time * 1e3:>10.0f} {import_time * 1e3:>13.0f}   {heaviest}')
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Load test of the prediction server: concurrent clients post random sequences and the p50/p99
+latency, requests per second and requests per model call are reported for each concurrency level.
+
+Without --url, a server is started in this process with a small model fitted on random windows, so
+the numbers reflect serving overhead and batching rather than model quality.
+
+Run from the repository root:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --requests 2000
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.neural_network import MLPClassifier
+from src.residue import Residue
+from src.server import PredictionServer
+
+CONCURRENCY = (1, 8, 32)
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def get_random_model() -> MLPClassifier:
+    rng = np.random.default_rng(1)
+    encoder = Residue.get_encoder()
+    X_codes = rng.integers(1, encoder.n_input_units, size=(2000, encoder.window_length), dtype=np.uint8)
+    Y_data = encoder.expand_Y(rng.integers(0, encoder.n_output_units, size=2000).astype(np.uint8))
+    model = MLPClassifier(hidden_layer_sizes=(13, 13), max_iter=5, random_state=1)
+    model.fit(encoder.to_sparse(X_codes), Y_data)
+    return model
+
+
+def post(url: str, body: dict) -> float:
+    start = time.perf_counter()
+    request = urllib.request.Request(
+        f'{url}/predict', data=json.dumps(body).encode('utf-8'), headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def get_health(url: str) -> dict:
+    with urllib.request.urlopen(f'{url}/health') as response:
+        return json.loads(response.read())
+
+
+def run(url: str, n_requests: int, concurrency: int, length: int) -> dict:
+    rng = np.random.default_rng(concurrency)
+    bodies = [
+        {'name': f'seq{i}', 'sequence': ''.join(rng.choice(list(AMINO_ACIDS), size=length))}
+        for i in range(n_requests)
+    ]
+    health = get_health(url)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = np.array(list(executor.map(lambda body: post(url, body), bodies)))
+    elapsed = time.perf_counter() - start
+    n_batches = get_health(url)['batches'] - health['batches']
+    return {
+        'concurrency': concurrency, 'p50_ms': np.percentile(latencies, 50) * 1e3,
+        'p99_ms': np.percentile(latencies, 99) * 1e3, 'requests_per_s': n_requests / elapsed,
+        'requests_per_batch': n_requests / max(n_batches, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test of the pred-sec-struc prediction server.')
+    parser.add_argument('--url', help='server to test (default: start one in this process)')
+    parser.add_argument('--requests', default=500, type=int, help='requests per concurrency level')
+    parser.add_argument('--length', default=300, type=int, help='residues per sequence')
+    parser.add_argument('--max-wait-ms', default=2., type=float, help='max wait of the in-process server')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = PredictionServer(model=get_random_model(), port=0, max_wait=args.max_wait_ms / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}'
+
+    print(f'{"concurrency":>12} {"p50 [ms]":>10} {"p99 [ms]":>10} {"req/s":>10} {"req/batch":>10}')
+    try:
+        for concurrency in CONCURRENCY:
+            result = run(url=url, n_requests=args.requests, concurrency=concurrency, length=args.length)
+            print(f'{result["concurrency"]:>12} {result["p50_ms"]:>10.2f} {result["p99_ms"]:>10.2f} '
+                  f'{result["requests_per_s"]:>10.1f} {result["requests_per_batch"]:>10.1f}')
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
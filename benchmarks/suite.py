@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Offline benchmark suite: times ReadDSSP.read, Residue.get_X_and_Y_arrays, Training.preprocess,
+Training.train and Predict.predict on synthetic DSSP data sets of several sizes, and writes the results
+as JSON. Given the JSON of an earlier run with --baseline, every stage that got slower by more than
+--tolerance is reported as a regression and the exit status is 1, so the suite can gate CI.
+
+The data sets are made by benchmarks.synthetic_dssp in a temporary directory; the parsed-DSSP cache is
+disabled so every run parses the files.
+
+Run from the repository root:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --output new.json --baseline bench.json
+"""
+
+import io
+import sys
+import json
+import time
+import warnings
+import argparse
+import platform
+import tempfile
+import datetime
+import subprocess
+import contextlib
+import numpy as np
+import sklearn.neural_network  # noqa: F401; imported here so the train stage does not time the import
+from benchmarks.synthetic_dssp import SyntheticDSSP
+from src.predict import Predict
+from src.read_dssp import ReadDSSP
+from src.residue import Residue
+from src.settings import Settings
+from src.training import Training
+
+SIZES = (10, 50, 200)
+
+
+def best_of(func, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_size(directory: str, n_proteins: int, repeats: int, seed: int, train_iterations: int) -> list:
+    """Returns the result of each stage on a data set of n_proteins synthetic proteins. Training runs a
+    fixed number of solver iterations, as random labels never converge."""
+    pdb_ids, n_residues = SyntheticDSSP(seed=seed).write_dataset(directory=directory, n_proteins=n_proteins)
+    residues = []
+    for pdb_id in pdb_ids:
+        residue = Residue(pdb_id=pdb_id, read_seq=ReadDSSP)
+        residue.set_residue_and_structure()
+        residues.append(residue)
+    training = Training(feature_format='dense', read_seq=ReadDSSP, n_workers=1)
+    training.pdb_lst = pdb_ids
+    training.max_iter = train_iterations
+
+    def train():
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            training.train()
+
+    def predict():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for pdb_id in pdb_ids:
+                Predict(pdb_id=pdb_id, model=training.model).predict()
+
+    timings = {
+        'read_dssp': best_of(lambda: [ReadDSSP.read(pdb_id=pdb_id) for pdb_id in pdb_ids], repeats),
+        'encode': best_of(lambda: [residue.get_X_and_Y_arrays() for residue in residues], repeats),
+        'preprocess': best_of(training.preprocess, repeats),
+        'train': best_of(train, 1),  # lbfgs with warm_start would continue from the first fit
+        'predict': best_of(predict, repeats),
+    }
+    return [
+        {
+            'stage': stage, 'n_proteins': n_proteins, 'n_residues': n_residues, 'seconds': round(seconds, 6),
+            'residues_per_second': round(n_residues / seconds, 1) if seconds else None,
+        } for stage, seconds in timings.items()
+    ]
+
+
+def get_environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Returns the results that took more than (1 + tolerance) times as long as in the baseline, with the
+    ratio of their times."""
+    baseline_seconds = {
+        (result['stage'], result['n_proteins']): result['seconds'] for result in baseline['results']
+    }
+    regressions = []
+    for result in results:
+        reference = baseline_seconds.get((result['stage'], result['n_proteins']))
+        if reference and result['seconds'] > (1 + tolerance) * reference:
+            ratio = round(result['seconds'] / reference, 2)
+            regressions.append(dict(result, baseline_seconds=reference, ratio=ratio))
+    return regressions
+
+
+def argparser():
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline on synthetic DSSP data sets.')
+    parser.add_argument(
+        '--sizes', default=','.join(map(str, SIZES)),
+        help=f'comma-separated numbers of proteins (default: {",".join(map(str, SIZES))})'
+    )
+    parser.add_argument('--repeats', default=5, type=int, help='runs per stage; the fastest counts (default: 5)')
+    parser.add_argument('--seed', default=1, type=int, help='seed of the synthetic data sets (default: 1)')
+    parser.add_argument(
+        '--train-iterations', default=50, type=int, dest='train_iterations',
+        help='solver iterations of the train stage (default: 50)'
+    )
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help='JSON file of the results')
+    parser.add_argument('--baseline', help='JSON file of an earlier run to compare with')
+    parser.add_argument(
+        '--tolerance', default=0.25, type=float,
+        help='fraction by which a stage may be slower than in the baseline (default: 0.25)'
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = argparser()
+    Settings.cache_enabled = False
+    results = []
+    print(f'{"stage":<12} {"proteins":>9} {"residues":>10} {"seconds":>10} {"residues/s":>14}')
+    for n_proteins in (int(size) for size in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as directory:
+            Settings.dssp_path = directory
+            for result in run_size(
+                directory=directory, n_proteins=n_proteins, repeats=args.repeats, seed=args.seed,
+                train_iterations=args.train_iterations
+            ):
+                results.append(result)
+                print(f'{result["stage"]:<12} {n_proteins:>9} {result["n_residues"]:>10} '
+                      f'{result["seconds"]:>10.3f} {result["residues_per_second"]:>14,.0f}')
+    report = {
+        'environment': get_environment(), 'seed': args.seed, 'repeats': args.repeats,
+        'train_iterations': args.train_iterations, 'results': results
+    }
+    with open(args.output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, 'r') as fp:
+            baseline = json.load(fp)
+        regressions = compare(results=results, baseline=baseline, tolerance=args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression["stage"]} with {regression["n_proteins"]} proteins: '
+                  f'{regression["seconds"]:.3f} s vs {regression["baseline_seconds"]:.3f} s '
+                  f'({regression["ratio"]:.2f}x)')
+        if regressions:
+            sys.exit(1)
+        print(f'No stage is more than {args.tolerance:.0%} slower than in {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
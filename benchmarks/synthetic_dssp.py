@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Generator of synthetic DSSP files in the fixed column layout that ReadDSSP parses, so the pipeline
+can be benchmarked and tested without a copy of the DSSP library.
+
+A protein has one or more chains separated by '!*' lines. Within a chain, '!' lines mark breaks in
+the backbone. The secondary structure is drawn as segments of helices (H, G, I), strands (E, B) and
+coil (T, S, - and blank), with random amino acids. The codes ReadDSSP is expected to return are
+computed alongside, following its rules: break lines and residues without a structure label are
+skipped, and only H, G, I and E are not coil.
+"""
+
+import os
+import numpy as np
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+
+HEADER = '\n'.join([
+    '==== Secondary Structure Definition by the program DSSP, CMBI version 2.2.1 ==== DATE=2026-01-01',
+    'REFERENCE W. KABSCH AND C.SANDER, BIOPOLYMERS 22 (1983) 2577-2637',
+    'HEADER    SYNTHETIC PROTEIN                       01-JAN-26   {pdb_id}',
+    'COMPND    MOL_ID: 1; MOLECULE: SYNTHETIC;',
+    '{n_residues:>5}{n_chains:>3}  0  0  0 TOTAL NUMBER OF RESIDUES, NUMBER OF CHAINS, NUMBER OF SS-BRIDGES',
+    '  #  RESIDUE AA STRUCTURE BP1 BP2  ACC     N-H-->O    O-->H-N    N-H-->O    O-->H-N    TCO  KAPPA ALPHA'
+    '  PHI   PSI    X-CA   Y-CA   Z-CA',
+    ''
+])
+TAIL = ('     0   0   50      0, 0.0     0, 0.0     0, 0.0     0, 0.0'
+        '   0.000 360.0 360.0 360.0 360.0    0.0    0.0    0.0')
+# Structure labels of each kind of segment and the range of segment lengths.
+SEGMENTS = {
+    'helix': ('HHHHGI', (4, 20)),
+    'strand': ('EEEB', (3, 10)),
+    'coil': ('TTSS-- ', (2, 12)),
+}
+AMINO_ACIDS = sorted(ReadDSSP.aa_single_letter_abbreviations)
+
+
+class SyntheticDSSP:
+    """Writes synthetic DSSP files. break_rate is the probability of a '!' line after a residue and
+    chain_lengths the range of residues per chain; all draws come from a generator seeded with seed."""
+
+    def __init__(self, seed: int = 1, chain_lengths: tuple = (50, 400), max_chains: int = 4,
+                 break_rate: float = 0.005):
+        self.rng = np.random.default_rng(seed)
+        self.chain_lengths = chain_lengths
+        self.max_chains = max_chains
+        self.break_rate = break_rate
+        ReadDSSP.get_lookups()
+
+    def get_structure(self, n_residues: int) -> str:
+        """Returns n_residues DSSP structure labels made of alternating segments."""
+        labels: list = []
+        kinds = list(SEGMENTS)
+        while len(labels) < n_residues:
+            letters, (shortest, longest) = SEGMENTS[kinds[self.rng.integers(len(kinds))]]
+            length = int(self.rng.integers(shortest, longest + 1))
+            labels.extend(self.rng.choice(list(letters), size=length))
+        return ''.join(labels[:n_residues])
+
+    def generate(self, pdb_id: str, n_chains: int = None, n_residues: int = None) -> tuple:
+        """Returns the content of a DSSP file and the amino acid and category codes that ReadDSSP reads
+        from it. Without n_chains or n_residues, both are drawn; n_residues is split over the chains."""
+        if n_chains is None:
+            n_chains = int(self.rng.integers(1, self.max_chains + 1))
+        if n_residues is None:
+            chain_sizes = self.rng.integers(self.chain_lengths[0], self.chain_lengths[1] + 1, size=n_chains)
+        else:
+            chain_sizes = np.diff(np.linspace(0, n_residues, n_chains + 1).astype(int))
+        lines, aa_codes, category_codes = [], [], []
+        number = 0
+        for chain_index, chain_size in enumerate(chain_sizes):
+            chain = chr(ord('A') + chain_index % 26)
+            if chain_index:
+                number += 1
+                lines.append(f'{number:>5}        !*{TAIL[1:]}')
+            amino_acids = self.rng.choice(AMINO_ACIDS, size=chain_size)
+            structure = self.get_structure(chain_size)
+            is_break = self.rng.random(chain_size) < self.break_rate
+            for resnum, (aa, label) in enumerate(zip(amino_acids, structure), start=1):
+                number += 1
+                lines.append(f'{number:>5}{resnum:>5} {chain} {aa}  {label}{TAIL}')
+                if label != ' ':
+                    aa_codes.append(ReadDSSP.aa_lookup[ord(aa)])
+                    category_codes.append(ReadDSSP.category_lookup[ord(label)])
+                if is_break[resnum - 1]:
+                    number += 1
+                    lines.append(f'{number:>5}        !{TAIL}')
+        header = HEADER.format(pdb_id=pdb_id.upper(), n_residues=int(sum(chain_sizes)), n_chains=n_chains)
+        content = header + '\n'.join(lines) + '\n'
+        aa_codes, category_codes = np.array(aa_codes, dtype=np.uint8), np.array(category_codes, dtype=np.uint8)
+        return content.encode('ascii'), aa_codes, category_codes
+
+    def write(self, directory: str, pdb_id: str, n_chains: int = None, n_residues: int = None) -> int:
+        """Writes pdb_id.dssp to directory and returns the number of residues ReadDSSP reads from it."""
+        content, aa_codes, _ = self.generate(pdb_id=pdb_id, n_chains=n_chains, n_residues=n_residues)
+        with open(os.path.join(directory, pdb_id) + Settings.dssp_extension, 'wb') as fp:
+            fp.write(content)
+        return len(aa_codes)
+
+    def write_dataset(self, directory: str, n_proteins: int, prefix: str = 's') -> tuple[list, int]:
+        """Writes n_proteins files named prefix0000... to directory; returns their PDB IDs and the total
+        number of residues ReadDSSP reads from them."""
+        os.makedirs(directory, exist_ok=True)
+        pdb_ids = [f'{prefix}{i:04d}' for i in range(n_proteins)]
+        n_residues = sum(self.write(directory=directory, pdb_id=pdb_id) for pdb_id in pdb_ids)
+        return pdb_ids, n_residues
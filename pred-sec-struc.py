@@ -5,10 +5,15 @@ import sys
 import logging
 import argparse
 import time
+import typing
 from src.settings import Settings
-from src.training import Training
-from src.predict import Predict
-from joblib import dump, load
+
+# The modules of the package, and NumPy, SciPy and scikit-learn behind them, are imported by the code
+# paths that need them, so that -h answers at once and prediction does not load scikit-learn.
+if typing.TYPE_CHECKING:
+    from src.model_io import ModelArtifact
+
+PROFILE_TOP = 25  # entries of --profile logged
 
 
 def main():
@@ -18,48 +23,402 @@ def main():
     logger.info(f'Window length: {Settings.window_length}')
 
     args = argparser()
+    if args.no_cache:
+        Settings.cache_enabled = False
+    if args.no_prediction_cache:
+        Settings.prediction_cache_enabled = False
+
+    profiler = start_profiling(profile=args.profile or [])
+    try:
+        run(args=args, logger=logger)
+    finally:
+        stop_profiling(profiler=profiler, args=args, logger=logger)
+
+
+def run(args, logger: logging.Logger) -> None:
+    if args.manifest:
+        scan_manifest(args=args, logger=logger)
+        return
+
+    if args.pack:
+        from src.corpus import PackedCorpus
+        from src.training import Training
+        start = time.time()
+        pdb_ids = select_proteins(
+            args=args, pdb_ids=Training.read_pdb_lst(filepath=args.pdb_list) if args.pdb_list else None, logger=logger
+        )
+        if pdb_ids is None:
+            pdb_ids = PackedCorpus.list_dssp_dir()
+        corpus = PackedCorpus.pack(corpus_path=args.pack, pdb_ids=pdb_ids)
+        msg = f'Packed {len(corpus)} of {len(pdb_ids)} PDB IDs into {args.pack}'
+        logger.info(f'{msg}; that took {get_elapsed_time(start_time=start)} s')
+        print(msg)
 
     if args.train or args.train_predict:
+        from src.corpus import PackedCorpus
+        from src.model_io import ModelArtifact
+        from src.training import Training
         start = time.time()
         dataset_type = 'q_s_tab1'  # Quian and Sejnowski data set from their table 1
-        model = Training(dataset_type=dataset_type)
-        model.get_pdb_lst()
-        model.preprocess()
-        model.train()
-        model.validate_model()
-
-        # Persist model.
-        model_dir = Settings.model_path
-        if not os.path.exists(model_dir):
-            os.makedirs(model_dir)
-        filename = os.path.join(model_dir, 'neural_net.model')
-        logger.info(f'Writing model to {filename}')
-        dump(model, filename)
-
-        logger.info('Generated multi-layer neural network model...')
+        corpus = PackedCorpus(args.corpus) if args.corpus else None
+        model = Training(
+            dataset_type=dataset_type, feature_format=args.feature_format, read_seq=corpus, n_workers=args.workers
+        )
+        model.pdb_lst = get_training_pdb_ids(args=args, corpus=corpus, logger=logger)
+        if args.continue_training:
+            artifact = continue_training(args=args, model=model, logger=logger)
+        else:
+            if args.stream:
+                model.n_epochs = args.epochs
+                model.batch_size = args.batch_size
+                model.train_streaming()
+            else:
+                model.preprocess()
+                model.train()
+                model.validate_model()
+
+            # Persist the network and its metadata, without the training data.
+            model_dir = Settings.model_path
+            if not os.path.exists(model_dir):
+                os.makedirs(model_dir)
+            artifact = ModelArtifact.from_training(training=model)
+            logger.info(f'Writing model to {ModelArtifact.get_default_path()}')
+            artifact.save(path=ModelArtifact.get_default_path())
+            logger.info('Generated multi-layer neural network model...')
+
         logger.info(f'That took {get_elapsed_time(start_time=start)} s')
 
+    if args.search:
+        search(args=args, logger=logger)
+        return
+
+    if args.dedup:
+        dedup(args=args, logger=logger)
+        return
+
+    if args.serve:
+        serve(args=args, artifact=load_model(logger=logger), logger=logger)
+        return
+
     if args.train_predict or args.predict:
         if args.predict:
-            if not 'model' in locals():  # load model from disk
-                try:
-                    model_dir = Settings.model_path
-                    filename = os.path.join(model_dir, 'neural_net.model')
-                    model = load(filename=filename)
-                    logger.info(f'Loading model {filename} into memory.')
-                except FileNotFoundError:
-                    msg = 'No model found on disk. Run training first.'
-                    print(msg)
-                    sys.exit(logger.info(msg))
+            if not 'artifact' in locals():  # load model from disk
+                artifact = load_model(logger=logger)
 
+        if args.batch:
+            predict_batch(args=args, artifact=artifact, logger=logger)
+            return
+        if args.fasta:
+            predict_fasta(args=args, artifact=artifact, logger=logger)
+            return
+
+        from src.inference import InferenceEngine
+        from src.predict import Predict
+        from src.read_dssp import ReadDSSP
         try:
-            predict = Predict(pdb_id=args.pdb.lower(), model=model.model)
+            predict = Predict(
+                pdb_id=ReadDSSP.normalize_pdb_id(args.pdb), model=InferenceEngine.from_artifact(artifact),
+                feature_format=args.feature_format, window_length=artifact.window_length
+            )
         except AttributeError as err:
             msg = f'{err.__repr__()}: flag -tp requires a PDB ID as argument'
             logger.error(msg)
             sys.exit(msg)
-        predict.predict()
+        try:
+            predict.predict()
+        except (FileNotFoundError, ValueError) as err:
+            msg = f'{err.__repr__()}: cannot predict {predict.pdb_id}'
+            logger.error(msg)
+            sys.exit(msg)
         predict.accuracy()
+        log_prediction_cache(logger=logger)
+
+
+def start_profiling(profile: list):
+    """Starts tracemalloc for 'memory' and returns a running cProfile profiler for 'cpu', else None."""
+    if 'memory' in profile:
+        import tracemalloc
+        tracemalloc.start()
+    if 'cpu' in profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    return None
+
+
+def stop_profiling(profiler, args, logger: logging.Logger) -> None:
+    """Logs the stage summary, writes --metrics and the profiles, and logs their top entries."""
+    import io
+    import tracemalloc
+    from src.instrumentation import Instrumentation
+    if profiler is not None:
+        import pstats
+        profiler.disable()
+        profiler.dump_stats(args.profile_output)
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        logger.info(f'CPU profile written to {args.profile_output}; top entries:\n{stream.getvalue()}')
+    if tracemalloc.is_tracing():
+        statistics = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP]
+        tracemalloc.stop()
+        logger.info('Largest allocations still held:\n' + '\n'.join(str(stat) for stat in statistics))
+    if Instrumentation.stages or Instrumentation.counters:
+        logger.info(f'Stage metrics:\n{Instrumentation.format_summary()}')
+    if args.metrics:
+        Instrumentation.write(filename=args.metrics)
+
+
+def continue_training(args, model, logger: logging.Logger) -> 'ModelArtifact':
+    """Continue training the model on disk on the proteins of the training it was not trained on, and save
+    the result as its next version; the model on disk is kept with its version suffix. Returns the new
+    model, or the model on disk if there are no new proteins."""
+    from src.model_io import ModelArtifact
+    parent = load_model(logger=logger, mmap=False)
+    model.n_epochs = args.epochs
+    model.batch_size = args.batch_size
+    try:
+        is_trained = model.train_continued(artifact=parent)
+    except ValueError as err:
+        logger.error(f'{err.__repr__()}')
+        sys.exit(str(err))
+    if not is_trained:
+        msg = f'No new proteins to train version {parent.version} of the model on; the model is unchanged'
+        logger.info(msg)
+        print(msg)
+        return parent
+    model.validate_model()
+    artifact = ModelArtifact.from_training(training=model)
+    path = ModelArtifact.get_default_path()
+    version_path = ModelArtifact.keep_version(path=path)
+    artifact.save(path=path)
+    msg = (f'Trained version {artifact.version} of the model on {len(model.get_trained_pdb_lst())} new proteins '
+           f'({len(artifact.pdb_ids)} in all), validated it on {len(model.test_pdb_lst)} held-out proteins and '
+           f'wrote it to {path}; version {parent.version} is kept in {version_path}')
+    logger.info(msg)
+    print(msg)
+    return artifact
+
+
+def load_model(logger: logging.Logger, mmap: bool = True) -> 'ModelArtifact':
+    """Load the model artifact in ModelPath; a pickled neural_net.model is migrated on first use."""
+    from src.model_io import ModelArtifact
+    from src.tables import AminoAcid, Target
+    try:
+        artifact = ModelArtifact.load_default(mmap=mmap)
+        logger.info(f'Loading model {ModelArtifact.get_default_path()} into memory.')
+    except FileNotFoundError:
+        msg = 'No model found on disk. Run training first.'
+        print(msg)
+        sys.exit(logger.info(msg))
+    AminoAcid.get_table()
+    Target.get_table()
+    try:
+        artifact.verify_tables(amino_acids=AminoAcid.mapping, targets=Target.mapping)
+    except ValueError as err:
+        logger.error(f'{err.__repr__()}')
+        sys.exit(str(err))
+    return artifact
+
+
+def search(args, logger: logging.Logger) -> None:
+    """Cross-validate the candidates of the search, write the leaderboard to --output and save the best
+    network as the model."""
+    import json
+    from src.corpus import PackedCorpus
+    from src.model_io import ModelArtifact
+    from src.search import HyperparameterSearch
+    corpus = PackedCorpus(args.corpus) if args.corpus else None
+    pdb_ids = get_training_pdb_ids(args=args, corpus=corpus, logger=logger)
+    start = time.time()
+    hyperparameter_search = HyperparameterSearch(
+        pdb_lst=pdb_ids, window_lengths=args.window_lengths, hidden_layer_sizes=args.hidden_layers,
+        alphas=args.alphas, n_folds=args.folds, max_iter=args.max_iter, feature_format=args.feature_format,
+        read_seq=corpus, n_workers=args.workers
+    )
+    leaderboard = hyperparameter_search.run()
+    table = hyperparameter_search.format_leaderboard()
+    logger.info(f'Leaderboard:\n{table}')
+    print(table)
+    output = args.output or 'leaderboard.json'
+    with open(output, 'w') as fp:
+        json.dump({'leaderboard': leaderboard, 'results': hyperparameter_search.results}, fp, indent=2)
+
+    os.makedirs(Settings.model_path, exist_ok=True)
+    encoder = hyperparameter_search.encoder
+    artifact = ModelArtifact.from_classifier(
+        classifier=hyperparameter_search.model, window_length=encoder.window_length,
+        amino_acids=encoder.amino_acids, targets=encoder.targets, metadata=hyperparameter_search.get_metadata(),
+        pdb_ids=hyperparameter_search.pdb_ids
+    )
+    artifact.save(path=ModelArtifact.get_default_path())
+    msg = (f'Searched {len(leaderboard)} candidates in {get_elapsed_time(start_time=start)} s; leaderboard in '
+           f'{output}, best model ({leaderboard[0]["candidate"]}) in {ModelArtifact.get_default_path()}')
+    logger.info(msg)
+    print(msg)
+
+
+def dedup(args, logger: logging.Logger) -> None:
+    """Write the non-redundant chains of --pdb-list, the corpus, the manifest selection or all of DsspPath
+    to --output."""
+    from src.corpus import PackedCorpus
+    from src.redundancy import RedundancyFilter
+    from src.training import Training
+    start = time.time()
+    corpus = PackedCorpus(args.corpus) if args.corpus else None
+    if args.pdb_list:
+        pdb_ids = Training.read_pdb_lst(filepath=args.pdb_list)
+    elif corpus is not None:
+        pdb_ids = corpus.pdb_ids
+    else:
+        pdb_ids = None
+    pdb_ids = select_proteins(args=args, pdb_ids=pdb_ids, logger=logger)
+    if pdb_ids is None:
+        pdb_ids = PackedCorpus.list_dssp_dir()
+    redundancy_filter = RedundancyFilter(identity=args.identity, read_seq=corpus, n_workers=args.workers)
+    redundancy_filter.run(pdb_ids=pdb_ids)
+    output = args.output or 'nonredundant_pdb_ids'
+    redundancy_filter.write(filepath=output)
+    msg = (f'Kept {len(redundancy_filter.representatives)} of {len(redundancy_filter.chain_ids)} chains of '
+           f'{len(pdb_ids)} PDB IDs at identity {args.identity} in {output}; that took '
+           f'{get_elapsed_time(start_time=start)} s')
+    logger.info(msg)
+    print(msg)
+
+
+def scan_manifest(args, logger: logging.Logger) -> None:
+    """Scan DsspPath and DsspArchives into the manifest of ManifestPath; unchanged files are not read."""
+    from src.manifest import DsspManifest
+    start = time.time()
+    manifest = DsspManifest()
+    manifest.load()
+    manifest.scan(n_workers=args.workers)
+    manifest.save()
+    msg = f'Manifest {manifest.path}: {manifest.format_summary()}; that took {get_elapsed_time(start_time=start)} s'
+    logger.info(msg)
+    print(msg)
+
+
+def get_training_pdb_ids(args, corpus, logger: logging.Logger) -> list:
+    """Returns the PDB IDs to train or search on: those of --pdb-list, else all of the corpus, else all of the
+    manifest if proteins are selected, else the training list of settings.ini; filtered by the selection."""
+    from src.training import Training
+    if args.pdb_list:
+        pdb_ids = Training.read_pdb_lst(filepath=args.pdb_list)
+    elif corpus is not None:
+        pdb_ids = corpus.pdb_ids
+    elif is_selecting(args=args):
+        pdb_ids = None
+    else:
+        pdb_ids = Training.read_pdb_lst(filepath=Settings.q_s_tab1)
+    return select_proteins(args=args, pdb_ids=pdb_ids, logger=logger)
+
+
+def is_selecting(args) -> bool:
+    return any(value is not None for value in (
+        args.min_residues, args.max_residues, args.min_fractions, args.max_fractions, args.n_proteins
+    ))
+
+
+def select_proteins(args, pdb_ids: list, logger: logging.Logger):
+    """Returns the PDB IDs of pdb_ids (all of the manifest if None) that pass the selection options, or
+    pdb_ids unchanged if no option is given."""
+    if not is_selecting(args=args):
+        return pdb_ids
+    from src.manifest import DsspManifest
+    try:
+        manifest = DsspManifest.open()
+        return manifest.select(
+            pdb_ids=pdb_ids, min_residues=args.min_residues or 1, max_residues=args.max_residues,
+            min_fractions=dict(args.min_fractions or []), max_fractions=dict(args.max_fractions or []),
+            n_proteins=args.n_proteins
+        )
+    except (FileNotFoundError, ValueError) as err:
+        logger.error(f'{err.__repr__()}')
+        sys.exit(str(err))
+
+
+def serve(args, artifact: 'ModelArtifact', logger: logging.Logger) -> None:
+    """Answer prediction requests over HTTP with the model kept in memory until interrupted."""
+    from src.corpus import PackedCorpus
+    from src.inference import InferenceEngine
+    from src.server import PredictionServer
+    corpus = PackedCorpus(args.corpus) if args.corpus else None
+    server = PredictionServer(
+        model=InferenceEngine.from_artifact(artifact), host=args.host, port=args.port,
+        max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000, read_seq=corpus,
+        window_length=artifact.window_length
+    )
+    msg = f'Serving predictions on http://{args.host}:{server.server_port} (POST /predict, GET /health)'
+    logger.info(msg)
+    print(msg)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f'Served {server.batcher.n_requests} requests in {server.batcher.n_batches} batches')
+        log_prediction_cache(logger=logger)
+
+
+def predict_batch(args, artifact: 'ModelArtifact', logger: logging.Logger) -> None:
+    """Predict the PDB IDs of the --batch list file (or stdin for '-') and write JSON lines to --output."""
+    from src.corpus import PackedCorpus
+    from src.inference import InferenceEngine
+    from src.predict import BatchPredict
+    from src.read_dssp import ReadDSSP
+    from src.training import Training
+    if args.batch == '-':
+        pdb_ids = [ReadDSSP.normalize_pdb_id(line) for line in sys.stdin if line.strip()]
+    else:
+        pdb_ids = [ReadDSSP.normalize_pdb_id(pdb_id) for pdb_id in Training.read_pdb_lst(filepath=args.batch)]
+    corpus = PackedCorpus(args.corpus) if args.corpus else None
+    predict = BatchPredict(
+        pdb_id_lst=pdb_ids, model=InferenceEngine.from_artifact(artifact), batch_size=args.batch_size_predict,
+        read_seq=corpus, n_workers=args.workers, window_length=artifact.window_length
+    )
+    output = args.output or 'predictions.jsonl'
+    with open(output, 'w') as fp:
+        predict.predict(fp=fp)
+    msg = (f'Predicted {predict.n_proteins} of {len(pdb_ids)} proteins ({predict.n_residues} residues) in '
+           f'{predict.elapsed:.2f} s: {predict.proteins_per_second:.1f} proteins/s, '
+           f'{predict.residues_per_second:.0f} residues/s; results in {output}')
+    logger.info(msg)
+    print(msg)
+    log_prediction_cache(logger=logger)
+
+
+def predict_fasta(args, artifact: 'ModelArtifact', logger: logging.Logger) -> None:
+    """Predict the sequences of the --fasta file (or stdin for '-') and write H/E/C strings to --output."""
+    from src.fasta import ReadFasta
+    from src.inference import InferenceEngine
+    from src.predict import SequencePredict
+    if args.fasta == '-':
+        sys.stdin.reconfigure(errors='replace')
+        records = ReadFasta.iter_records(fp=sys.stdin)
+    else:
+        records = ReadFasta.read(filepath=args.fasta)
+    predict = SequencePredict(
+        model=InferenceEngine.from_artifact(artifact), batch_size=args.batch_size_predict,
+        window_length=artifact.window_length
+    )
+    output = args.output or 'predictions.fasta'
+    with open(output, 'w') as fp:
+        predict.predict(records=records, fp=fp)
+    msg = (f'Predicted {predict.n_sequences} sequences ({predict.n_residues} residues) in {predict.elapsed:.2f} s: '
+           f'{predict.residues_per_second:.0f} residues/s; results in {output}')
+    logger.info(msg)
+    print(msg)
+    log_prediction_cache(logger=logger)
+
+
+def log_prediction_cache(logger: logging.Logger) -> None:
+    """Log the hits and misses of the prediction cache of this run, if it is enabled."""
+    from src.prediction_cache import PredictionCache
+    cache = PredictionCache.get_default()
+    if cache is not None:
+        logger.info(cache.format_stats())
 
 
 def argparser():
@@ -79,13 +438,182 @@ def argparser():
         '-p', '--predict', default=False, action='store_true', dest='predict',
         help='predict structure using the neural network model on disk (requires [pdb])'
     )
+    group.add_argument(
+        '--pack', metavar='CORPUS_DIR', dest='pack',
+        help='pack the DSSP files of --pdb-list (default: all files in DsspPath) into a corpus directory'
+    )
+    group.add_argument(
+        '--search', default=False, action='store_true', dest='search',
+        help='cross-validate a grid of window lengths and network configurations on the training proteins, '
+             'write the leaderboard to --output and save the best network as the model'
+    )
+    group.add_argument(
+        '--dedup', default=False, action='store_true', dest='dedup',
+        help='write the chains of --pdb-list (default: all of DsspPath) without near-identical chains to --output'
+    )
+    group.add_argument(
+        '--manifest', default=False, action='store_true', dest='manifest',
+        help='scan DsspPath and DsspArchives into the manifest of per-protein statistics (ManifestPath of '
+             'settings.ini); a rescan only reads new and changed files'
+    )
+    group.add_argument(
+        '--serve', default=False, action='store_true', dest='serve',
+        help='serve predictions of sequences and PDB IDs over HTTP using the neural network model on disk'
+    )
+    parser.add_argument(
+        'pdb', nargs='?',
+        help='a PDB ID whose structure is predicted; a chain suffix such as 1abcB predicts only those chains'
+    )
+    parser.add_argument(
+        '--batch', metavar='FILE', dest='batch',
+        help="with -p or -tp, predict the PDB IDs in FILE (one per line; '-' reads stdin) instead of [pdb]"
+    )
     parser.add_argument(
-        'pdb', nargs='?', help='a PDB ID whose structure is predicted'
+        '--fasta', metavar='FILE', dest='fasta',
+        help="with -p or -tp, predict the sequences of a FASTA file ('-' reads stdin) instead of [pdb]"
+    )
+    parser.add_argument(
+        '-o', '--output', metavar='FILE', dest='output',
+        help='output file of --batch (JSON lines, default: predictions.jsonl), --fasta '
+             '(H/E/C strings in FASTA format, default: predictions.fasta), --search (JSON, default: leaderboard.json) '
+             'or --dedup (one chain per line, default: nonredundant_pdb_ids)'
+    )
+    parser.add_argument(
+        '--identity', default=Settings.redundancy_identity, type=float, dest='identity',
+        help='sequence identity above which --dedup treats chains as redundant (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--predict-batch-size', default=Settings.predict_batch_size, type=int, dest='batch_size_predict',
+        help='number of groups per model call with --batch or --fasta (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--host', default=Settings.server_host, dest='host', help='address --serve binds to (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--port', default=Settings.server_port, type=int, dest='port',
+        help='port --serve listens on (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--max-batch-size', default=Settings.server_max_batch_size, type=int, dest='max_batch_size',
+        help='windows of concurrent requests that --serve predicts together (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--max-wait-ms', default=Settings.server_max_wait_ms, type=float, dest='max_wait_ms',
+        help='longest time --serve holds a request to batch it with others (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--pdb-list', metavar='FILE', dest='pdb_list',
+        help='file with one PDB ID per line to train on or pack (default for training from settings.ini)'
+    )
+    parser.add_argument(
+        '--corpus', metavar='CORPUS_DIR', dest='corpus',
+        help='train, predict --batch or --serve from a packed corpus instead of DSSP files '
+             '(for training all of its PDB IDs unless --pdb-list is given)'
+    )
+    parser.add_argument(
+        '--min-residues', type=int, dest='min_residues', metavar='N',
+        help='train, search or pack only proteins of the manifest with at least N residues'
+    )
+    parser.add_argument(
+        '--max-residues', type=int, dest='max_residues', metavar='N',
+        help='train, search or pack only proteins of the manifest with at most N residues'
+    )
+    parser.add_argument(
+        '--min-fraction', type=category_fraction, action='append', dest='min_fractions', metavar='CATEGORY=F',
+        help='train, search or pack only proteins of the manifest with at least the fraction F of their residues '
+             'in a category of target.csv, e.g. a=0.3; may be repeated'
+    )
+    parser.add_argument(
+        '--max-fraction', type=category_fraction, action='append', dest='max_fractions', metavar='CATEGORY=F',
+        help='like --min-fraction, with at most the fraction F, e.g. c=0.6'
+    )
+    parser.add_argument(
+        '--n-proteins', type=int, dest='n_proteins', metavar='N',
+        help='train, search or pack a random sample of N of the proteins selected from the manifest'
+    )
+    parser.add_argument(
+        '--stream', default=False, action='store_true', dest='stream',
+        help='train on shuffled minibatches with a bounded memory footprint instead of in memory'
+    )
+    parser.add_argument(
+        '--continue', default=False, action='store_true', dest='continue_training',
+        help='with -t or -tp, continue training the model on disk on the proteins it was not trained on and '
+             'save it as its next version, keeping the previous version'
+    )
+    parser.add_argument(
+        '--epochs', default=Settings.epochs, type=int, dest='epochs',
+        help='number of passes over the data with --stream or --continue (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--batch-size', default=Settings.batch_size, type=int, dest='batch_size',
+        help='groups per minibatch with --stream or --continue (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--window-lengths', type=int_list, dest='window_lengths',
+        help='comma-separated window lengths of --search (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--hidden-layers', type=int_list, nargs='+', dest='hidden_layers', metavar='SIZES',
+        help='hidden layer sizes of --search, e.g. 5,3 10 for two configurations (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--alphas', type=lambda value: [float(alpha) for alpha in value.split(',')], dest='alphas',
+        help='comma-separated L2 penalties of --search (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--folds', default=Settings.search_folds, type=int, dest='folds',
+        help='number of cross-validation folds of proteins in --search (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--max-iter', default=Settings.search_max_iter, type=int, dest='max_iter',
+        help='solver iterations of each fit in --search (default from settings.ini)'
+    )
+    parser.add_argument(
+        '-f', '--feature-format', default=Settings.feature_format, choices=('dense', 'codes', 'sparse'),
+        dest='feature_format', help='in-memory format of the features (default from settings.ini)'
+    )
+    parser.add_argument(
+        '-j', '--workers', default=Settings.workers, type=int, dest='workers',
+        help='number of processes that parse and encode DSSP files (default from settings.ini)'
+    )
+    parser.add_argument(
+        '--no-cache', default=False, action='store_true', dest='no_cache',
+        help='always parse the DSSP files instead of using the parsed-DSSP cache'
+    )
+    parser.add_argument(
+        '--no-prediction-cache', default=False, action='store_true', dest='no_prediction_cache',
+        help='always run the network instead of reusing cached predictions of repeated sequences'
+    )
+    parser.add_argument(
+        '--metrics', metavar='FILE', dest='metrics',
+        help='write the time and memory of each stage and the parse counters to FILE '
+             '(Prometheus text format for .prom and .txt, JSON otherwise)'
+    )
+    parser.add_argument(
+        '--profile', choices=('cpu', 'memory'), action='append', dest='profile',
+        help='profile the run with cProfile (cpu) or trace allocations with tracemalloc (memory); '
+             'the top entries are logged; may be given twice'
+    )
+    parser.add_argument(
+        '--profile-output', metavar='FILE', default='profile.pstats', dest='profile_output',
+        help='file the cProfile statistics of --profile cpu are written to (default: profile.pstats)'
     )
 
     return parser.parse_args()
 
 
+def int_list(value: str) -> list:
+    return [int(item) for item in value.split(',')]
+
+
+def category_fraction(value: str) -> tuple:
+    category, _, fraction = value.partition('=')
+    try:
+        return category.strip(), float(fraction)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected CATEGORY=FRACTION, e.g. a=0.3, not {value}')
+
+
 def initiate_logging() -> logging.Logger:
     logfile_name = 'main.log'
     # Include filemode='w' in next command?
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+import os
+import zlib
+import logging
+import tarfile
+import zipfile
+import numpy as np
+from src.files import atomic_write
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class DsspArchive:
+    """An uncompressed tar archive of DSSP files, such as a copy of the DSSP library, whose members may
+    themselves be compressed. The archive is scanned once for the offset and size of every member; the
+    member index is stored in the parse cache directory (CachePath), so later runs open a member with
+    one seek instead of reading the archive. An index is rebuilt when the size or modification time of
+    its archive changes. Members are found by their file name, whatever their directory in the archive.
+
+    A member is referred to as '<archive path>::<member name>', which ReadDSSP accepts as a filename."""
+    separator: str = '::'
+    index_extension: str = '.members'
+    archives: dict = {}  # path: DsspArchive of the archives opened by the process
+
+    def __init__(self, path: str, index_path: str = None):
+        self.path = os.path.abspath(path)
+        self.index_path = index_path if index_path is not None else Settings.cache_path
+        self.members: dict = {}  # file name: (offset of the data, size)
+        stat = os.stat(self.path)
+        self.size, self.mtime_ns = stat.st_size, stat.st_mtime_ns
+        if not self.load_index():
+            self.build_index()
+            self.save_index()
+
+    @classmethod
+    def get(cls, path: str):
+        """Returns the archive at path, opened once per process and reopened if the archive changed."""
+        path = os.path.abspath(path)
+        archive = cls.archives.get(path)
+        if archive is not None:
+            stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) == (archive.size, archive.mtime_ns):
+                return archive
+        archive = cls.archives[path] = cls(path)
+        return archive
+
+    @classmethod
+    def find(cls, names: list):
+        """Returns the reference to the first of names found in the archives of settings.ini, or None."""
+        for path in Settings.dssp_archives:
+            try:
+                archive = cls.get(path)
+            except (OSError, ValueError) as err:
+                logger.info(f'{err.__repr__()}: skipping DSSP archive {path}')
+                continue
+            for name in names:
+                if name in archive.members:
+                    return f'{archive.path}{cls.separator}{name}'
+        return None
+
+    @classmethod
+    def split_reference(cls, filename: str) -> tuple[str, str]:
+        """Returns the archive path and member name of a member reference, or (filename, '')."""
+        path, _, name = filename.partition(cls.separator)
+        return path, name
+
+    def build_index(self) -> None:
+        """Scans the headers of the archive for the data offset and size of its regular files."""
+        try:
+            with tarfile.open(self.path, mode='r:') as tar:
+                self.members = {
+                    os.path.basename(member.name): (member.offset_data, member.size)
+                    for member in tar if member.isfile()
+                }
+        except tarfile.ReadError as err:
+            raise ValueError(f'{self.path} is not an uncompressed tar archive ({err}); compressed archives '
+                             f'cannot be read at random, so store compressed members in a plain tar') from err
+        logger.info(f'Indexed {len(self.members)} members of {self.path}')
+
+    def get_index_filename(self) -> str:
+        name = os.path.basename(self.path)
+        return os.path.join(self.index_path, f'{name}.{zlib.crc32(self.path.encode()):08x}{self.index_extension}')
+
+    def load_index(self) -> bool:
+        """Loads the stored member index; returns False if there is none for the archive as it is."""
+        try:
+            with np.load(self.get_index_filename()) as index:
+                if (str(index['path']) != self.path or int(index['size']) != self.size
+                        or int(index['mtime_ns']) != self.mtime_ns):
+                    return False
+                self.members = {
+                    name: (offset, size) for name, offset, size in
+                    zip(index['names'].tolist(), index['offsets'].tolist(), index['sizes'].tolist())
+                }
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return False
+        return True
+
+    def save_index(self) -> None:
+        filename = self.get_index_filename()
+        try:
+            os.makedirs(self.index_path, exist_ok=True)
+            with atomic_write(filename) as fp:
+                np.savez(
+                    fp, names=np.array(list(self.members), dtype=str),
+                    offsets=np.array([offset for offset, _ in self.members.values()], dtype=np.int64),
+                    sizes=np.array([size for _, size in self.members.values()], dtype=np.int64),
+                    path=self.path, size=self.size, mtime_ns=self.mtime_ns
+                )
+        except OSError as err:
+            logger.info(f'{err.__repr__()}: could not write member index {filename}')
+
+    def read_member(self, name: str) -> bytes:
+        """Returns the bytes of member name as stored in the archive."""
+        try:
+            offset, size = self.members[name]
+        except KeyError:
+            raise FileNotFoundError(f'{name} is not in the DSSP archive {self.path}')
+        with open(self.path, 'rb') as fp:
+            fp.seek(offset)
+            return fp.read(size)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import os
+import logging
+import zipfile
+import numpy as np
+from src.files import atomic_write
+from src.instrumentation import Instrumentation
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class DsspCache:
+    """On-disk cache of parsed DSSP files. Each entry holds the amino acid codes, category codes and
+    chain identifiers of one PDB ID together with the path, size and modification time of the DSSP
+    file it was parsed from. An entry is only used while the DSSP file is unchanged. Accessing an
+    entry refreshes its modification time, so the least recently used entries are evicted first
+    once the cache grows beyond max_bytes.
+
+    Next to each entry, the cache keeps the chain index of the DSSP file, the byte ranges of its chains.
+    A PDB ID with a chain suffix, such as 1abcB, is answered from the entry of the whole file; if the
+    entry is unreadable, the index lets only the lines of the chain be read and parsed. An index counts
+    towards max_bytes and is evicted together with its entry."""
+    entry_extension: str = '.npz'
+    index_extension: str = '.chains'
+    default = None
+
+    def __init__(self, cache_path: str = Settings.cache_path, max_bytes: int = None, reader=ReadDSSP):
+        self.cache_path = cache_path
+        if max_bytes is None:
+            max_bytes = int(Settings.cache_max_megabytes * 1024 ** 2)
+        self.max_bytes = max_bytes
+        self.reader = reader
+        self.hits: int = 0
+        self.misses: int = 0
+        self._size: int = None
+
+    @classmethod
+    def get_default(cls):
+        """Returns the process-wide cache configured in settings.ini, or ReadDSSP if caching is disabled."""
+        if not Settings.cache_enabled:
+            return ReadDSSP
+        if cls.default is None or cls.default.cache_path != Settings.cache_path:
+            cls.default = cls(cache_path=Settings.cache_path)
+        return cls.default
+
+    def read_arrays(self, pdb_id: str) -> tuple[np.ndarray, np.ndarray]:
+        """Return amino acid and category codes of PDB ID from the cache, or parse the DSSP file and
+        store the result if there is no valid entry."""
+        return self.read_chain_arrays(pdb_id=pdb_id)[:2]
+
+    def read_chain_arrays(self, pdb_id: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Like read_arrays, but also return the chain identifier of each residue as a byte."""
+        pdb_id, chains = ReadDSSP.split_pdb_id(pdb_id=pdb_id)
+        filename = os.path.abspath(self.reader.get_filename(pdb_id=pdb_id))
+        try:
+            source_stat = ReadDSSP.stat(filename)
+        except FileNotFoundError as err:
+            logger.info(f'{err.__repr__()}: {filename} might be missing; also check path in settings.ini')
+            raise err
+
+        arrays = self.get(pdb_id=pdb_id, filename=filename, source_stat=source_stat)
+        if arrays is not None:
+            self.hits += 1
+            Instrumentation.count('cache_hits')
+            return ReadDSSP.select_chains(arrays=arrays, chains=chains, filename=filename)
+        self.misses += 1
+        Instrumentation.count('cache_misses')
+        if chains:
+            index = self.get_index(pdb_id=pdb_id, filename=filename, source_stat=source_stat)
+            if index is not None:
+                return self.reader.read_chain_arrays(pdb_id=pdb_id + chains, index=index)
+        arrays, index = self.reader.read_with_index(pdb_id=pdb_id)
+        self.put(pdb_id=pdb_id, filename=filename, source_stat=source_stat, arrays=arrays)
+        self.put_index(pdb_id=pdb_id, filename=filename, source_stat=source_stat, index=index)
+        return ReadDSSP.select_chains(arrays=arrays, chains=chains, filename=filename)
+
+    def get(self, pdb_id: str, filename: str, source_stat: os.stat_result):
+        """Return the cached codes of PDB ID if the entry was parsed from the unchanged file, else None."""
+        entry_path = self.get_entry_path(pdb_id=pdb_id)
+        try:
+            with np.load(entry_path) as entry:
+                if (str(entry['filename']) != filename or int(entry['size']) != source_stat.st_size
+                        or int(entry['mtime_ns']) != source_stat.st_mtime_ns):
+                    return None
+                arrays = entry['aa_codes'], entry['category_codes'], entry['chains']
+            os.utime(entry_path)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+        return arrays
+
+    def put(self, pdb_id: str, filename: str, source_stat: os.stat_result, arrays: tuple) -> None:
+        """Store the (amino acid codes, category codes, chains) of PDB ID."""
+        os.makedirs(self.cache_path, exist_ok=True)
+        entry_path = self.get_entry_path(pdb_id=pdb_id)
+        previous_size = self._get_file_size(entry_path)
+        try:
+            aa_codes, category_codes, chains = arrays
+            with atomic_write(entry_path) as fp:
+                np.savez(fp, aa_codes=aa_codes, category_codes=category_codes, chains=chains,
+                         filename=filename, size=source_stat.st_size, mtime_ns=source_stat.st_mtime_ns)
+        except OSError as err:
+            logger.info(f'{err.__repr__()}: could not write cache entry {entry_path}')
+            return
+        if self._size is not None:
+            self._size += self._get_file_size(entry_path) - previous_size
+        self.evict()
+
+    def get_index(self, pdb_id: str, filename: str, source_stat: os.stat_result):
+        """Return the chain index of PDB ID if it was built from the unchanged file, else None."""
+        try:
+            with np.load(self.get_index_path(pdb_id=pdb_id)) as entry:
+                if (str(entry['filename']) != filename or int(entry['size']) != source_stat.st_size
+                        or int(entry['mtime_ns']) != source_stat.st_mtime_ns):
+                    return None
+                return {
+                    chr(chain): (start, stop) for chain, start, stop in
+                    zip(entry['chains'].tolist(), entry['starts'].tolist(), entry['stops'].tolist())
+                }
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+    def put_index(self, pdb_id: str, filename: str, source_stat: os.stat_result, index: dict) -> None:
+        """Store the chain index of PDB ID, as returned by ReadDSSP.get_chain_index."""
+        os.makedirs(self.cache_path, exist_ok=True)
+        index_path = self.get_index_path(pdb_id=pdb_id)
+        previous_size = self._get_file_size(index_path)
+        ranges = np.array(list(index.values()), dtype=np.int64).reshape(-1, 2)
+        try:
+            with atomic_write(index_path) as fp:
+                np.savez(fp, chains=np.array([ord(chain) for chain in index], dtype=np.uint8),
+                         starts=ranges[:, 0], stops=ranges[:, 1], filename=filename, size=source_stat.st_size,
+                         mtime_ns=source_stat.st_mtime_ns)
+        except OSError as err:
+            logger.info(f'{err.__repr__()}: could not write chain index {index_path}')
+            return
+        if self._size is not None:
+            self._size += self._get_file_size(index_path) - previous_size
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries and their chain indexes until the cache fits into max_bytes."""
+        if self.max_bytes <= 0:
+            return
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._get_entries())
+        if self._size <= self.max_bytes:
+            return
+        for _, paths, size in sorted(self._get_entries()):
+            try:
+                for path in paths:
+                    os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            if self._size <= self.max_bytes:
+                break
+        logger.info(f'Evicted cache entries in {self.cache_path}; size is now {self._size} bytes')
+
+    def clear(self) -> None:
+        for _, paths, _ in self._get_entries():
+            for path in paths:
+                os.remove(path)
+        self._size = 0
+
+    def get_filename(self, pdb_id: str) -> str:
+        return self.reader.get_filename(pdb_id=pdb_id)
+
+    def get_entry_path(self, pdb_id: str) -> str:
+        return os.path.join(self.cache_path, pdb_id) + self.entry_extension
+
+    def get_index_path(self, pdb_id: str) -> str:
+        return os.path.join(self.cache_path, pdb_id) + self.index_extension
+
+    def _get_entries(self) -> list[tuple]:
+        """Returns (last access, paths, size) of all entries. The paths and size of an entry include its chain
+        index; an index without an entry is listed on its own, with its own modification time."""
+        entries = {}
+        try:
+            dir_entries = list(os.scandir(self.cache_path))
+        except FileNotFoundError:
+            return []
+        for dir_entry in dir_entries:
+            for extension in (self.entry_extension, self.index_extension):
+                if dir_entry.name.endswith(extension):
+                    stat = dir_entry.stat()
+                    pdb_id = dir_entry.name[:-len(extension)]
+                    mtime_ns, paths, size = entries.get(pdb_id, (None, [], 0))
+                    if mtime_ns is None or extension == self.entry_extension:
+                        mtime_ns = stat.st_mtime_ns
+                    entries[pdb_id] = (mtime_ns, paths + [dir_entry.path], size + stat.st_size)
+        return list(entries.values())
+
+    @staticmethod
+    def _get_file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
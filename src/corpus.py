@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import os
+import logging
+import numpy as np
+from src.archive import DsspArchive
+from src.cache import DsspCache
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class PackedCorpus:
+    """Many parsed DSSP files packed into one directory: a contiguous array of amino acid codes, a
+    contiguous array of category codes and an index with the offsets of every chain of every PDB ID.
+    The code arrays are memory-mapped read-only, so processes that open the same corpus share its
+    pages and residues of a PDB ID are returned as zero-copy views."""
+    residues_filename: str = 'residues.u8'
+    categories_filename: str = 'categories.u8'
+    index_filename: str = 'index.npz'
+
+    def __init__(self, corpus_path: str):
+        self.corpus_path = corpus_path
+        with np.load(os.path.join(corpus_path, self.index_filename)) as index:
+            self.chain_pdb_ids: np.ndarray = index['pdb_ids']
+            self.chains: np.ndarray = index['chains']
+            self.starts: np.ndarray = index['starts']
+            self.stops: np.ndarray = index['stops']
+        self.aa_codes = self._memmap(self.residues_filename)
+        self.category_codes = self._memmap(self.categories_filename)
+        # Rows of the index that belong to each PDB ID; the chains of a PDB ID are stored consecutively.
+        self.proteins: dict = {}
+        for row, pdb_id in enumerate(self.chain_pdb_ids.tolist()):
+            first_row, _ = self.proteins.get(pdb_id, (row, row + 1))
+            self.proteins[pdb_id] = (first_row, row + 1)
+
+    def __reduce__(self):
+        # Worker processes re-open the memory maps instead of receiving a pickled copy of the codes.
+        return self.__class__, (self.corpus_path,)
+
+    def __len__(self) -> int:
+        return len(self.proteins)
+
+    def __contains__(self, pdb_id: str) -> bool:
+        """Returns whether PDB ID, and all chains of its chain suffix, are in the corpus."""
+        try:
+            self._get_rows(pdb_id=pdb_id)
+        except (FileNotFoundError, ValueError):
+            return False
+        return True
+
+    @property
+    def pdb_ids(self) -> list:
+        return list(self.proteins.keys())
+
+    def read_arrays(self, pdb_id: str) -> tuple[np.ndarray, np.ndarray]:
+        """Return views on the amino acid and category codes of PDB ID. A PDB ID with a chain suffix, such
+        as 1abcB, returns the residues of those chains; copies if they are not stored consecutively."""
+        return self._read_rows(rows=self._get_rows(pdb_id=pdb_id))
+
+    def read_chain_arrays(self, pdb_id: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Like read_arrays, but also return the chain identifier of each residue as a byte."""
+        rows = self._get_rows(pdb_id=pdb_id)
+        aa_codes, category_codes = self._read_rows(rows=rows)
+        chains = np.repeat(self.chains[rows], self.stops[rows] - self.starts[rows])
+        return aa_codes, category_codes, chains
+
+    def get_chain_spans(self, pdb_id: str) -> list[tuple]:
+        """Return (chain, start, stop) of the chains of PDB ID, with offsets into the code arrays."""
+        rows = self._get_rows(pdb_id=pdb_id)
+        return [
+            (chr(chain), start, stop) for chain, start, stop in
+            zip(self.chains[rows].tolist(), self.starts[rows].tolist(), self.stops[rows].tolist())
+        ]
+
+    def get_filename(self, pdb_id: str) -> str:
+        return self.corpus_path
+
+    def _get_rows(self, pdb_id: str):
+        """Returns the slice of the index rows of PDB ID, or the list of the rows of the chains of a chain
+        suffix; a single row is returned as a slice."""
+        if pdb_id in self.proteins:
+            return slice(*self.proteins[pdb_id])
+        base_id, chains = ReadDSSP.split_pdb_id(pdb_id=pdb_id)
+        if base_id not in self.proteins:
+            raise FileNotFoundError(f'{pdb_id} is not in the packed corpus {self.corpus_path}')
+        first_row, stop_row = self.proteins[base_id]
+        rows = [row for row in range(first_row, stop_row) if chr(self.chains[row]) in chains]
+        missing = set(chains) - {chr(self.chains[row]) for row in rows}
+        if missing:
+            raise ValueError(f'{base_id} in the packed corpus {self.corpus_path} has no chain '
+                             f'{", ".join(sorted(missing))}')
+        return slice(rows[0], rows[0] + 1) if len(rows) == 1 else rows
+
+    def _read_rows(self, rows) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the amino acid and category codes of index rows as returned by _get_rows."""
+        if isinstance(rows, slice):
+            start, stop = self.starts[rows][0], self.stops[rows][-1]
+            return self.aa_codes[start:stop], self.category_codes[start:stop]
+        positions = np.concatenate([np.arange(self.starts[row], self.stops[row]) for row in rows])
+        return self.aa_codes[positions], self.category_codes[positions]
+
+    def _memmap(self, filename: str) -> np.ndarray:
+        path = os.path.join(self.corpus_path, filename)
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode='r')
+
+    @classmethod
+    def pack(cls, corpus_path: str, pdb_ids: list, reader=None):
+        """Parse the DSSP files of a list of PDB IDs and write them into a packed corpus. PDB IDs whose
+        file cannot be read are skipped. Codes are streamed to disk, so memory use does not grow with
+        the size of the corpus."""
+        if reader is None:
+            reader = DsspCache.get_default()
+        os.makedirs(corpus_path, exist_ok=True)
+        chain_pdb_ids, chains, starts, stops = [], [], [], []
+        offset = 0
+        with open(os.path.join(corpus_path, cls.residues_filename), 'wb') as residues_fp, \
+                open(os.path.join(corpus_path, cls.categories_filename), 'wb') as categories_fp:
+            for pdb_id in dict.fromkeys(pdb_ids):
+                try:
+                    aa_codes, category_codes, residue_chains = reader.read_chain_arrays(pdb_id=pdb_id)
+                except (OSError, ValueError) as err:
+                    logger.info(f'{err.__repr__()}: skipping {pdb_id} while packing {corpus_path}')
+                    continue
+                if len(aa_codes) == 0:
+                    logger.info(f'skipping {pdb_id} without residues while packing {corpus_path}')
+                    continue
+                residues_fp.write(np.ascontiguousarray(aa_codes, dtype=np.uint8).tobytes())
+                categories_fp.write(np.ascontiguousarray(category_codes, dtype=np.uint8).tobytes())
+                # Consecutive residues of the same chain form one entry of the index.
+                boundaries = np.flatnonzero(np.diff(residue_chains)) + 1
+                chain_starts = np.concatenate(([0], boundaries))
+                chain_stops = np.append(boundaries, len(residue_chains))
+                chain_pdb_ids.extend([pdb_id] * len(chain_starts))
+                chains.extend(residue_chains[chain_starts].tolist())
+                starts.extend((chain_starts + offset).tolist())
+                stops.extend((chain_stops + offset).tolist())
+                offset += len(aa_codes)
+        np.savez(
+            os.path.join(corpus_path, cls.index_filename),
+            pdb_ids=np.array(chain_pdb_ids, dtype=str), chains=np.array(chains, dtype=np.uint8),
+            starts=np.array(starts, dtype=np.int64), stops=np.array(stops, dtype=np.int64)
+        )
+        n_packed = len(set(chain_pdb_ids))
+        logger.info(f'Packed {n_packed} of {len(pdb_ids)} PDB IDs ({offset} residues) into {corpus_path}')
+        return cls(corpus_path)
+
+    @staticmethod
+    def list_dssp_dir(dssp_path: str = None, archives: list = None) -> list:
+        """Return the PDB IDs of all DSSP files in a directory, plain or compressed, and in the archives
+        (by default DsspPath and DsspArchives of settings.ini)."""
+        if dssp_path is None:
+            dssp_path = Settings.dssp_path
+        if archives is None:
+            archives = Settings.dssp_archives
+        names = [entry.name for entry in os.scandir(dssp_path) if entry.is_file()]
+        for archive_path in archives:
+            names.extend(DsspArchive.get(archive_path).members)
+        extensions = [Settings.dssp_extension + suffix for suffix in ('',) + tuple(ReadDSSP.compressions)]
+        pdb_ids = set()
+        for name in names:
+            for extension in extensions:
+                if name.endswith(extension):
+                    pdb_ids.add(name[:-len(extension)])
+        return sorted(pdb_ids)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class WindowEncoder:
+    """Encodes a protein as sliding windows of one-hot encoded amino acids in batched NumPy steps.
+    Residues are mapped to integer codes once; windows are built as index views on the codes and
+    expanded with a single gather from a one-hot lookup table.
+
+    Features can be carried in three formats: 'dense' float64 one-hot rows, 'codes' with one uint8
+    amino acid code per window position, or a 'sparse' CSR matrix with the one-hot layout."""
+    feature_formats: tuple = ('dense', 'codes', 'sparse')
+
+    def __init__(self, amino_acids: dict, targets: dict, window_length: int):
+        self.amino_acids = amino_acids
+        self.targets = targets
+        self.window_length = window_length
+        self.central_aa_pos = int(np.ceil(self.window_length / 2))
+        self.n_input_units = len(self.amino_acids)
+        self.n_output_units = len(self.targets)
+        # The code one past the last table entry pads positions without a residue (all-zero block).
+        self.input_pad_code = self.n_input_units
+        self.output_pad_code = self.n_output_units
+        self.input_onehot_table = self._get_onehot_table(self.amino_acids)
+        self.output_onehot_table = self._get_onehot_table(self.targets)
+        self.input_lookup = self._get_lookup(self.amino_acids, pad_code=self.input_pad_code)
+        self.output_lookup = self._get_lookup(self.targets, pad_code=self.output_pad_code)
+
+    @staticmethod
+    def _get_onehot_table(mapping: dict) -> np.ndarray:
+        """Returns a (len(mapping) + 1, len(mapping)) table whose row i is the one-hot vector of code i.
+        The last row is all zeros and belongs to the pad code."""
+        n_units = len(mapping)
+        table = np.zeros((n_units + 1, n_units), dtype=np.uint8)
+        table[np.arange(n_units), np.arange(n_units)] = 1
+        return table
+
+    @staticmethod
+    def _get_lookup(mapping: dict, pad_code: int) -> np.ndarray:
+        """Returns a byte-indexed table that translates single-letter labels into their encoding,
+        which is also the column of the label in the one-hot encoding."""
+        lookup = np.full(256, pad_code, dtype=np.uint8)
+        for label, code in mapping.items():
+            lookup[ord(label)] = code
+        return lookup
+
+    def encode_labels(self, labels: str, lookup: np.ndarray) -> np.ndarray:
+        """Returns the integer codes of a string of single-letter labels. Labels that are not in the table,
+        including non-ASCII characters, get the pad code."""
+        return lookup[np.frombuffer(labels.encode('ascii', errors='replace'), dtype=np.uint8)]
+
+    def encode_sequence(self, residue_and_structure: list) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the amino acid and category codes of a list of (amino acid, category) tuples."""
+        amino_acids = ''.join(residue.amino_acid for residue in residue_and_structure)
+        categories = ''.join(residue.category for residue in residue_and_structure)
+        return self.encode_labels(amino_acids, self.input_lookup), self.encode_labels(categories, self.output_lookup)
+
+    def get_n_groups(self, residue_count: int) -> int:
+        return max(residue_count - self.window_length, 0)
+
+    def get_window_codes(self, aa_codes: np.ndarray, category_codes: np.ndarray,
+                         chains: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the (groups, window length) amino acid codes and the (groups,) category codes.
+        Group i holds the window starting at residue i - central_aa_pos and is labeled with the category
+        of residue i. The first central_aa_pos groups have no complete window and are padded. Given the
+        chain of each residue, window positions in another chain than residue i are padded too."""
+        n_groups = self.get_n_groups(len(aa_codes))
+        X_codes = np.full((n_groups, self.window_length), self.input_pad_code, dtype=np.uint8)
+        Y_codes = np.full(n_groups, self.output_pad_code, dtype=np.uint8)
+        if n_groups > self.central_aa_pos:
+            windows = sliding_window_view(aa_codes, self.window_length)
+            X_codes[self.central_aa_pos:] = windows[:n_groups - self.central_aa_pos]
+            Y_codes[self.central_aa_pos:] = category_codes[self.central_aa_pos:n_groups]
+            if chains is not None:
+                segments = self.get_chain_segments(chains)
+                segment_windows = sliding_window_view(segments, self.window_length)[:n_groups - self.central_aa_pos]
+                is_other_chain = segment_windows != segments[self.central_aa_pos:n_groups, None]
+                X_codes[self.central_aa_pos:][is_other_chain] = self.input_pad_code
+        return X_codes, Y_codes
+
+    @staticmethod
+    def get_chain_segments(chains: np.ndarray) -> np.ndarray:
+        """Returns the number of the run of equal chain identifiers each residue belongs to."""
+        chains = np.asarray(chains)
+        return np.concatenate(([0], np.cumsum(chains[1:] != chains[:-1])))
+
+    def get_residue_window_codes(self, aa_codes: np.ndarray, chains: np.ndarray = None) -> np.ndarray:
+        """Returns one window per residue for sequences without known structure: row i holds the
+        residues i - central_aa_pos to i - central_aa_pos + window length - 1, the same alignment as
+        get_window_codes, with positions outside the sequence padded. The rows are a read-only view.
+        Given the chain of each residue, positions in another chain than residue i are padded as well;
+        the rows are then a copy."""
+        n_residues = len(aa_codes)
+        padded = np.full(n_residues + self.window_length, self.input_pad_code, dtype=np.uint8)
+        padded[self.central_aa_pos:self.central_aa_pos + n_residues] = aa_codes
+        windows = sliding_window_view(padded, self.window_length)[:n_residues]
+        if chains is None:
+            return windows
+        segments = np.full(n_residues + self.window_length, -1, dtype=np.int64)
+        segments[self.central_aa_pos:self.central_aa_pos + n_residues] = self.get_chain_segments(chains)
+        is_other_chain = (
+            sliding_window_view(segments, self.window_length)[:n_residues]
+            != segments[self.central_aa_pos:self.central_aa_pos + n_residues, None]
+        )
+        return np.where(is_other_chain, np.uint8(self.input_pad_code), windows)
+
+    def expand_X(self, X_codes: np.ndarray, dtype=np.float64) -> np.ndarray:
+        """Returns the dense one-hot feature matrix of window codes."""
+        n_groups = X_codes.shape[0]
+        return self.input_onehot_table[X_codes].reshape(n_groups, -1).astype(dtype, copy=False)
+
+    def expand_Y(self, Y_codes: np.ndarray, dtype=np.float64) -> np.ndarray:
+        """Returns the dense one-hot label matrix of category codes."""
+        return self.output_onehot_table[Y_codes].astype(dtype, copy=False)
+
+    def to_sparse(self, X_codes: np.ndarray, dtype=np.float64):
+        """Returns the CSR matrix with the one-hot layout of window codes; padded positions hold no entry."""
+        from scipy import sparse  # imported on first use; prediction from window codes does not need SciPy
+        n_groups, window_length = X_codes.shape
+        is_residue = X_codes != self.input_pad_code
+        column_offsets = np.arange(window_length, dtype=np.int32) * self.n_input_units
+        indices = (X_codes.astype(np.int32) + column_offsets)[is_residue]
+        indptr = np.zeros(n_groups + 1, dtype=np.int64)
+        np.cumsum(is_residue.sum(axis=1), out=indptr[1:])
+        data = np.ones(len(indices), dtype=dtype)
+        return sparse.csr_matrix((data, indices, indptr), shape=(n_groups, window_length * self.n_input_units))
+
+    def format_X(self, X_codes: np.ndarray, feature_format: str = 'dense'):
+        """Returns window codes in the requested feature format."""
+        if feature_format == 'dense':
+            return self.expand_X(X_codes)
+        elif feature_format == 'codes':
+            return X_codes
+        elif feature_format == 'sparse':
+            return self.to_sparse(X_codes)
+        raise ValueError(f'Unknown feature format {feature_format}; choose one of {self.feature_formats}')
+
+    def format_Y(self, Y_codes: np.ndarray, feature_format: str = 'dense') -> np.ndarray:
+        """Returns one-hot labels; compact formats keep them as uint8."""
+        if feature_format == 'dense':
+            return self.expand_Y(Y_codes)
+        return self.expand_Y(Y_codes, dtype=np.uint8)
+
+    def get_estimator_input(self, X_data, accept_sparse: bool = True):
+        """Returns features an estimator can consume. Window codes are expanded to CSR, and sparse
+        features are only made dense if the estimator does not accept sparse input."""
+        if isinstance(X_data, np.ndarray) and X_data.dtype == np.uint8 and X_data.shape[1] == self.window_length:
+            X_data = self.to_sparse(X_data)
+        if hasattr(X_data, 'toarray') and not accept_sparse:
+            X_data = X_data.toarray()
+        return X_data
+
+    def get_model_input(self, model, X_data):
+        """Returns features for a model: window codes are passed on unchanged to models that accept them,
+        such as the inference engine, and converted with get_estimator_input otherwise."""
+        if getattr(model, 'accepts_codes', False):
+            return X_data
+        return self.get_estimator_input(X_data)
+
+    def build_arrays(self, X_codes_lst: list, Y_data_lst: list, feature_format: str = 'dense') -> tuple:
+        """Returns X and Y of many proteins in the requested feature format, from their window codes and
+        one-hot labels. The groups of all proteins are counted first, so X and Y are allocated once and
+        filled in place."""
+        n_groups = sum(len(X_codes) for X_codes in X_codes_lst)
+        Y_dtype = np.float64 if feature_format == 'dense' else np.uint8
+        Y_data = np.empty((n_groups, self.n_output_units), dtype=Y_dtype)
+        if feature_format == 'dense':
+            X_data = np.empty((n_groups, self.window_length * self.n_input_units), dtype=np.float64)
+            X_blocks = X_data.reshape(n_groups, self.window_length, self.n_input_units)
+        elif feature_format in ('codes', 'sparse'):
+            X_data = np.empty((n_groups, self.window_length), dtype=np.uint8)
+        else:
+            raise ValueError(f'Unknown feature format {feature_format}; choose one of {self.feature_formats}')
+
+        start = 0
+        for X_codes, Y_onehot in zip(X_codes_lst, Y_data_lst):
+            stop = start + len(X_codes)
+            if feature_format == 'dense':
+                X_blocks[start:stop] = self.input_onehot_table[X_codes]
+            else:
+                X_data[start:stop] = X_codes
+            Y_data[start:stop] = Y_onehot
+            start = stop
+
+        if feature_format == 'sparse':
+            X_data = self.to_sparse(X_data)
+        return X_data, Y_data
+
+    @staticmethod
+    def concatenate(arrays: list):
+        """Concatenates features of the same format along the groups axis."""
+        if hasattr(arrays[0], 'tocsr'):
+            from scipy import sparse
+            return sparse.vstack(arrays, format='csr')
+        return np.concatenate(arrays)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import logging
+import typing
+
+logger = logging.getLogger(__name__)
+
+
+class ReadFasta:
+    """Streams the records of FASTA files. Only the record being read is held in memory, so files of
+    any size can be processed."""
+    FastaRecord = typing.NamedTuple('FastaRecord', [('name', str), ('sequence', str)])
+
+    @classmethod
+    def read(cls, filepath: str):
+        """Yields the (name, sequence) records of a FASTA file. Bytes that are not UTF-8 are read as
+        unknown residues."""
+        try:
+            with open(filepath, 'r', errors='replace') as fp:
+                yield from cls.iter_records(fp=fp)
+        except FileNotFoundError as err:
+            logger.info(f'{err.__repr__()}: {filepath} might be missing')
+            raise err
+
+    @classmethod
+    def iter_records(cls, fp: typing.Iterable[str]):
+        """Yields the (name, sequence) records of the lines of a FASTA file. The name is the first word
+        of the header; sequences are upper-cased and a terminal '*' is removed. Lines before the first
+        header are ignored."""
+        name, lines = None, []
+        for line in fp:
+            if line.startswith('>'):
+                if name is not None:
+                    yield cls._get_record(name=name, lines=lines)
+                words = line[1:].split(maxsplit=1)
+                name, lines = words[0] if words else '', []
+            elif name is not None:
+                lines.append(line.strip())
+            elif line.strip():
+                logger.info(f'Ignoring FASTA line before the first header: {line.strip()[:40]}')
+        if name is not None:
+            yield cls._get_record(name=name, lines=lines)
+
+    @classmethod
+    def _get_record(cls, name: str, lines: list):
+        sequence = ''.join(lines).replace(' ', '').upper().rstrip('*')
+        return cls.FastaRecord(name=name, sequence=sequence)
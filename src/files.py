@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path: str):
+    """Opens a temporary file next to path for binary writing and moves it onto path when the block ends,
+    so readers, also of other processes, see the previous file or the complete new one but never a partial
+    file. If the block raises, the temporary file is removed and path is left as it was."""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as fp:
+            yield fp
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
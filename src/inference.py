@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import hashlib
+import logging
+import numpy as np
+from src.instrumentation import Instrumentation
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def _relu(X: np.ndarray) -> None:
+    np.maximum(X, 0, out=X)
+
+
+def _tanh(X: np.ndarray) -> None:
+    np.tanh(X, out=X)
+
+
+def _logistic(X: np.ndarray) -> None:
+    np.negative(X, out=X)
+    np.exp(X, out=X)
+    X += 1
+    np.reciprocal(X, out=X)
+
+
+def _identity(X: np.ndarray) -> None:
+    pass
+
+
+class InferenceEngine:
+    """Forward pass of a trained multi-layer perceptron in float32 NumPy, without scikit-learn. The
+    weights are converted once; inputs are processed in chunks of chunk_size rows so the activations of
+    a chunk stay in cache. Labels are one-hot rows with a 1 where the output logit is positive, which
+    is where the logistic output of MLPClassifier exceeds 0.5, so the labels are those of
+    MLPClassifier.predict.
+
+    Inputs can also be (n_samples, window length) uint8 window codes, as made by WindowEncoder. The
+    first layer is then computed by gathering and summing one row of the first weight matrix per window
+    position instead of multiplying with the one-hot encoding, which is never built."""
+    accepts_codes: bool = True
+    activations: dict = {'relu': _relu, 'tanh': _tanh, 'logistic': _logistic, 'identity': _identity}
+
+    def __init__(self, coefs: list, intercepts: list, activation: str = 'relu', out_activation: str = 'logistic',
+                 chunk_size: int = Settings.inference_chunk_size, dtype=np.float32):
+        if activation not in self.activations:
+            raise ValueError(f'Unknown activation {activation}; choose one of {tuple(self.activations)}')
+        if out_activation != 'logistic':
+            raise ValueError(f'Only networks with a logistic output layer are supported, not {out_activation}')
+        self.dtype = dtype
+        self.coefs = [np.ascontiguousarray(coef, dtype=dtype) for coef in coefs]
+        self.intercepts = [np.ascontiguousarray(intercept, dtype=dtype) for intercept in intercepts]
+        self.activation = activation
+        self.out_activation = out_activation
+        self.chunk_size = chunk_size
+        self.n_features_in_ = self.coefs[0].shape[0]
+        self.n_outputs_ = self.coefs[-1].shape[1]
+        self.embeddings: dict = {}
+        self._fingerprint: str = None
+
+    @classmethod
+    def from_classifier(cls, classifier, chunk_size: int = Settings.inference_chunk_size):
+        """Returns the engine of a fitted MLPClassifier."""
+        return cls(
+            coefs=classifier.coefs_, intercepts=classifier.intercepts_, activation=classifier.activation,
+            out_activation=classifier.out_activation_, chunk_size=chunk_size
+        )
+
+    @classmethod
+    def from_artifact(cls, artifact, chunk_size: int = Settings.inference_chunk_size):
+        """Returns the engine of a ModelArtifact."""
+        return cls(
+            coefs=artifact.coefs, intercepts=artifact.intercepts, activation=artifact.activation,
+            out_activation=artifact.out_activation, chunk_size=chunk_size
+        )
+
+    @classmethod
+    def from_model(cls, model):
+        """Returns an engine for a fitted MLPClassifier; engines and other estimators are returned as is."""
+        if isinstance(model, cls) or not hasattr(model, 'coefs_'):
+            return model
+        return cls.from_classifier(classifier=model)
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the activations and weights of the network, computed once; networks with the same
+        fingerprint make the same predictions."""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(f'{self.activation}:{self.out_activation}:{np.dtype(self.dtype).name}'.encode(),
+                                     digest_size=16)
+            for array in self.coefs + self.intercepts:
+                digest.update(str(array.shape).encode())
+                digest.update(array.data)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def decision_function(self, X) -> np.ndarray:
+        """Returns the output logits of a dense or sparse (n_samples, n_features) input, or of
+        (n_samples, window length) uint8 window codes."""
+        n_samples = X.shape[0]
+        is_codes = self.is_codes(X)
+        if is_codes:
+            embedding = self.get_embedding(window_length=X.shape[1])
+        elif X.shape[1] != self.n_features_in_:
+            raise ValueError(f'X has {X.shape[1]} features, but the network expects {self.n_features_in_}')
+        elif hasattr(X, 'tocsr'):
+            X = X.tocsr().astype(self.dtype)
+        logits = np.empty((n_samples, self.n_outputs_), dtype=self.dtype)
+        with Instrumentation.stage('predict'):
+            for start in range(0, n_samples, self.chunk_size):
+                stop = min(start + self.chunk_size, n_samples)
+                if is_codes:
+                    logits[start:stop] = self._forward_codes(X[start:stop], embedding=embedding)
+                else:
+                    logits[start:stop] = self._forward(X[start:stop])
+        Instrumentation.count('windows_predicted', n_samples)
+        return logits
+
+    def is_codes(self, X) -> bool:
+        """Returns whether X holds uint8 window codes rather than one-hot features."""
+        return isinstance(X, np.ndarray) and X.dtype == np.uint8 and X.ndim == 2 and X.shape[1] != self.n_features_in_
+
+    def get_embedding(self, window_length: int) -> np.ndarray:
+        """Returns the first weight matrix as a (window length, units + 1, hidden units) table: entry
+        [p, code] holds the weights of amino acid code at window position p. The row of the pad code,
+        one past the last unit, is zero, so padded positions contribute nothing."""
+        if window_length not in self.embeddings:
+            n_units, remainder = divmod(self.n_features_in_, window_length)
+            if remainder:
+                raise ValueError(f'Windows of length {window_length} do not fit {self.n_features_in_} features')
+            n_hidden = self.coefs[0].shape[1]
+            embedding = np.zeros((window_length, n_units + 1, n_hidden), dtype=self.dtype)
+            embedding[:, :n_units] = self.coefs[0].reshape(window_length, n_units, n_hidden)
+            self.embeddings[window_length] = embedding
+        return self.embeddings[window_length]
+
+    def _forward(self, X) -> np.ndarray:
+        if not hasattr(X, 'tocsr'):
+            X = np.asarray(X, dtype=self.dtype)
+        activation = X @ self.coefs[0]
+        activation += self.intercepts[0]
+        return self._forward_hidden(activation)
+
+    def _forward_codes(self, X_codes: np.ndarray, embedding: np.ndarray) -> np.ndarray:
+        activation = np.empty((X_codes.shape[0], embedding.shape[2]), dtype=self.dtype)
+        activation[:] = self.intercepts[0]
+        for position in range(X_codes.shape[1]):
+            activation += embedding[position].take(X_codes[:, position], axis=0)
+        return self._forward_hidden(activation)
+
+    def _forward_hidden(self, activation: np.ndarray) -> np.ndarray:
+        """Runs the layers after the first on the pre-activation of the first layer."""
+        hidden_activation = self.activations[self.activation]
+        for coef, intercept in zip(self.coefs[1:], self.intercepts[1:]):
+            hidden_activation(activation)
+            activation = activation @ coef
+            activation += intercept
+        return activation
+
+    def predict(self, X) -> np.ndarray:
+        """Returns one-hot (n_samples, n_outputs) labels; rows may hold no or several classes."""
+        return (self.decision_function(X) > 0).astype(np.uint8)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Returns the logistic outputs of the network."""
+        probabilities = self.decision_function(X)
+        _logistic(probabilities)
+        return probabilities
+
+    def predict_classes(self, X) -> np.ndarray:
+        """Returns the column of the most probable class of each row."""
+        return np.argmax(self.decision_function(X), axis=1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import time
+import logging
+import threading
+import contextlib
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class Instrumentation:
+    """Process-wide record of where a run spends time and memory. Each stage (read, parse, encode,
+    concatenate, split, fit, validate, dump, load, predict) adds its calls, wall and CPU time, the peak
+    resident set size of the process at its end and, while tracemalloc is tracing, the peak of traced
+    memory during the stage. Nested stages are included in the stages around them. Counters count
+    events such as parsed DSSP lines, kept residues and lines dropped for each StructureTag reason.
+
+    Worker processes send their snapshot() back with their results and the caller merges it, so the
+    totals cover the whole run. The record is exported as JSON or in the Prometheus text format."""
+    prefix: str = 'pred_sec_struc'
+    stages: dict = {}
+    counters: dict = {}
+    _lock = threading.Lock()
+    _local = threading.local()  # stack of the open stages of each thread
+
+    @classmethod
+    @contextlib.contextmanager
+    def stage(cls, name: str):
+        """Context manager that adds the time and memory of its block to stage name."""
+        stack = cls._local.__dict__.setdefault('stack', [])
+        tracing = tracemalloc.is_tracing()
+        frame = {'peak': 0}
+        if tracing:
+            # The traced peak is reset for the new stage; the peak so far is kept by the enclosing stage.
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['peak'] = current
+        stack.append(frame)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            seconds, cpu_seconds = time.perf_counter() - start, time.process_time() - cpu_start
+            stack.pop()
+            peak = 0
+            if tracing and tracemalloc.is_tracing():
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            with cls._lock:
+                record = cls.stages.setdefault(name, {
+                    'calls': 0, 'seconds': 0., 'cpu_seconds': 0., 'max_rss_bytes': 0, 'traced_peak_bytes': 0
+                })
+                record['calls'] += 1
+                record['seconds'] += seconds
+                record['cpu_seconds'] += cpu_seconds
+                record['max_rss_bytes'] = max(record['max_rss_bytes'], cls.get_max_rss())
+                record['traced_peak_bytes'] = max(record['traced_peak_bytes'], peak)
+
+    @classmethod
+    def count(cls, name: str, n: int = 1) -> None:
+        with cls._lock:
+            cls.counters[name] = cls.counters.get(name, 0) + int(n)
+
+    @staticmethod
+    def get_max_rss() -> int:
+        """Returns the peak resident set size of the process in bytes, or 0 where it is not available."""
+        if resource is None:
+            return 0
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024  # bytes on macOS, kilobytes elsewhere
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls.stages.clear()
+            cls.counters.clear()
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        return {
+            'stages': {name: dict(record) for name, record in cls.stages.items()}, 'counters': dict(cls.counters)
+        }
+
+    @classmethod
+    def merge(cls, snapshot: dict) -> None:
+        """Adds the snapshot of another process: times and counts are summed, memory peaks maximised."""
+        with cls._lock:
+            for name, other in snapshot['stages'].items():
+                record = cls.stages.setdefault(name, dict.fromkeys(other, 0))
+                for key in ('calls', 'seconds', 'cpu_seconds'):
+                    record[key] += other[key]
+                for key in ('max_rss_bytes', 'traced_peak_bytes'):
+                    record[key] = max(record[key], other[key])
+            for name, n in snapshot['counters'].items():
+                cls.counters[name] = cls.counters.get(name, 0) + n
+
+    @classmethod
+    def to_prometheus(cls) -> str:
+        """Returns the record in the Prometheus text exposition format."""
+        lines = []
+        metrics = (
+            ('stage_calls_total', 'counter', 'calls', 'Number of times a stage ran.'),
+            ('stage_seconds_total', 'counter', 'seconds', 'Wall time spent in a stage.'),
+            ('stage_cpu_seconds_total', 'counter', 'cpu_seconds', 'CPU time of the process spent in a stage.'),
+            ('stage_max_rss_bytes', 'gauge', 'max_rss_bytes', 'Peak resident set size at the end of a stage.'),
+            ('stage_traced_peak_bytes', 'gauge', 'traced_peak_bytes', 'Peak memory traced by tracemalloc.'),
+        )
+        for metric, metric_type, key, description in metrics:
+            lines.append(f'# HELP {cls.prefix}_{metric} {description}')
+            lines.append(f'# TYPE {cls.prefix}_{metric} {metric_type}')
+            for name, record in sorted(cls.stages.items()):
+                lines.append(f'{cls.prefix}_{metric}{{stage="{name}"}} {record[key]}')
+        for name, n in sorted(cls.counters.items()):
+            lines.append(f'# TYPE {cls.prefix}_{name}_total counter')
+            lines.append(f'{cls.prefix}_{name}_total {n}')
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def write(cls, filename: str) -> None:
+        """Writes the record to filename: Prometheus text for .prom and .txt files, JSON otherwise."""
+        with open(filename, 'w') as fp:
+            if filename.endswith(('.prom', '.txt')):
+                fp.write(cls.to_prometheus())
+            else:
+                json.dump(cls.snapshot(), fp, indent=2)
+        logger.info(f'Wrote stage metrics to {filename}')
+
+    @classmethod
+    def format_summary(cls) -> str:
+        """Returns the stages and counters as a table for the log."""
+        lines = [f'{"stage":<12} {"calls":>8} {"wall [s]":>10} {"cpu [s]":>10} {"max RSS [MB]":>13} '
+                 f'{"traced [MB]":>12}']
+        for name, record in sorted(cls.stages.items(), key=lambda item: -item[1]['seconds']):
+            lines.append(
+                f'{name:<12} {record["calls"]:>8} {record["seconds"]:>10.3f} {record["cpu_seconds"]:>10.3f} '
+                f'{record["max_rss_bytes"] / 1024 ** 2:>13.1f} {record["traced_peak_bytes"] / 1024 ** 2:>12.1f}'
+            )
+        lines.extend(f'{name}: {n}' for name, n in sorted(cls.counters.items()))
+        return '\n'.join(lines)
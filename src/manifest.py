@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+import os
+import logging
+import zipfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.corpus import PackedCorpus
+from src.files import atomic_write
+from src.instrumentation import Instrumentation
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+from src.tables import Target
+
+logger = logging.getLogger(__name__)
+
+
+class DsspManifest:
+    """Summary of the DSSP library in DsspPath and DsspArchives, made by one scan of its files: for every
+    PDB ID the file, its size and modification time, its number of chains, the number of residues that
+    pass the filter of ReadDSSP and how many of them are of each category of target.csv, or the error that
+    kept the file from being read. The manifest is stored as one .npz file of column arrays, so proteins
+    are selected by length, class balance or number without opening a DSSP file.
+
+    A rescan only reads the files that are new or whose size or modification time changed, and drops
+    the PDB IDs whose file is gone."""
+    columns: tuple = ('pdb_ids', 'filenames', 'sizes', 'mtimes_ns', 'n_chains', 'n_residues', 'category_counts',
+                      'errors')
+
+    def __init__(self, path: str = None):
+        self.path = path if path is not None else Settings.manifest_path
+        self.categories: list = self.get_categories()
+        self.pdb_ids = np.zeros(0, dtype=str)
+        self.filenames = np.zeros(0, dtype=str)
+        self.sizes = np.zeros(0, dtype=np.int64)
+        self.mtimes_ns = np.zeros(0, dtype=np.int64)
+        self.n_chains = np.zeros(0, dtype=np.int32)
+        self.n_residues = np.zeros(0, dtype=np.int64)
+        self.category_counts = np.zeros((0, len(self.categories)), dtype=np.int64)
+        self.errors = np.zeros(0, dtype=str)
+        self.n_rescanned: int = 0  # files read by the last scan
+
+    def __len__(self) -> int:
+        return len(self.pdb_ids)
+
+    @classmethod
+    def open(cls, path: str = None):
+        """Returns the stored manifest; raises FileNotFoundError if there is none."""
+        manifest = cls(path=path)
+        if not manifest.load():
+            raise FileNotFoundError(f'No manifest of the DSSP library in {manifest.path}; run --manifest first')
+        return manifest
+
+    @staticmethod
+    def get_categories() -> list:
+        """Returns the labels of target.csv in the order of their encoding, the columns of category_counts."""
+        Target.get_table()
+        return sorted(Target.mapping, key=Target.mapping.get)
+
+    def load(self) -> bool:
+        """Loads the stored manifest; returns False if there is none or it counts other categories."""
+        try:
+            with np.load(self.path) as stored:
+                if stored['categories'].tolist() != self.categories:
+                    return False
+                for column in self.columns:
+                    setattr(self, column, stored[column])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return False
+        return True
+
+    def save(self) -> None:
+        """Writes the manifest to path."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with atomic_write(self.path) as fp:
+            np.savez(fp, categories=np.array(self.categories, dtype=str),
+                     **{column: getattr(self, column) for column in self.columns})
+        logger.info(f'Wrote the manifest of {len(self)} PDB IDs to {self.path}')
+
+    def scan(self, n_workers: int = Settings.workers) -> None:
+        """Brings the manifest up to date with DsspPath and DsspArchives. Files whose size and modification
+        time match the manifest are not opened; the others are read in n_workers processes."""
+        with Instrumentation.stage('scan'):
+            rows = {pdb_id: row for row, pdb_id in enumerate(self.pdb_ids.tolist())}
+            records, stale = [], []
+            for pdb_id in PackedCorpus.list_dssp_dir():
+                filename = os.path.abspath(ReadDSSP.get_filename(pdb_id=pdb_id))
+                try:
+                    stat = ReadDSSP.stat(filename)
+                except OSError as err:
+                    logger.info(f'{err.__repr__()}: skipping {pdb_id} in the manifest')
+                    continue
+                row = rows.get(pdb_id)
+                if row is not None and (str(self.filenames[row]), int(self.sizes[row]), int(self.mtimes_ns[row])) \
+                        == (filename, stat.st_size, stat.st_mtime_ns):
+                    records.append((pdb_id, filename, stat.st_size, stat.st_mtime_ns, int(self.n_chains[row]),
+                                    int(self.n_residues[row]), self.category_counts[row], str(self.errors[row])))
+                else:
+                    stale.append(len(records))
+                    records.append((pdb_id, filename, stat.st_size, stat.st_mtime_ns))
+            for position, summary in zip(stale, self._summarize([records[i][0] for i in stale], n_workers=n_workers)):
+                records[position] += summary
+        self.n_rescanned = len(stale)
+        Instrumentation.count('manifest_files_read', len(stale))
+        self._set_records(records=records)
+        logger.info(f'Scanned {len(self)} PDB IDs of the DSSP library, read {self.n_rescanned} new or changed files')
+
+    def _summarize(self, pdb_ids: list, n_workers: int):
+        if n_workers <= 1 or len(pdb_ids) <= 1:
+            return (summarize_dssp_file(pdb_id=pdb_id, n_categories=len(self.categories)) for pdb_id in pdb_ids)
+        n_workers = min(n_workers, len(pdb_ids))
+        chunksize = max(1, len(pdb_ids) // (n_workers * 4))
+        logger.info(f'Reading {len(pdb_ids)} DSSP files for the manifest with {n_workers} workers')
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            return list(executor.map(
+                summarize_dssp_file, pdb_ids, [len(self.categories)] * len(pdb_ids), chunksize=chunksize
+            ))
+
+    def _set_records(self, records: list) -> None:
+        """Sets the columns from records of (PDB ID, filename, size, mtime_ns, chains, residues, category
+        counts, error)."""
+        columns = list(zip(*records)) or [()] * len(self.columns)
+        self.pdb_ids = np.array(columns[0], dtype=str)
+        self.filenames = np.array(columns[1], dtype=str)
+        self.sizes = np.array(columns[2], dtype=np.int64)
+        self.mtimes_ns = np.array(columns[3], dtype=np.int64)
+        self.n_chains = np.array(columns[4], dtype=np.int32)
+        self.n_residues = np.array(columns[5], dtype=np.int64)
+        self.category_counts = np.array(columns[6], dtype=np.int64).reshape(-1, len(self.categories))
+        self.errors = np.array(columns[7], dtype=str)
+
+    def get_fractions(self) -> np.ndarray:
+        """Returns the fraction of the residues of each protein (rows) in each category (columns)."""
+        return self.category_counts / np.maximum(self.n_residues, 1)[:, np.newaxis]
+
+    def get_record(self, pdb_id: str) -> dict:
+        """Returns the entry of PDB ID as a dictionary; raises KeyError if it is not in the manifest."""
+        rows = np.flatnonzero(self.pdb_ids == pdb_id)
+        if len(rows) == 0:
+            raise KeyError(f'{pdb_id} is not in the manifest {self.path}')
+        row = rows[0]
+        return {
+            'pdb_id': pdb_id, 'filename': str(self.filenames[row]), 'size': int(self.sizes[row]),
+            'mtime_ns': int(self.mtimes_ns[row]), 'n_chains': int(self.n_chains[row]),
+            'n_residues': int(self.n_residues[row]),
+            'fractions': dict(zip(self.categories, self.get_fractions()[row].tolist())), 'error': str(self.errors[row])
+        }
+
+    def select(self, pdb_ids: list = None, min_residues: int = 1, max_residues: int = None,
+               min_fractions: dict = None, max_fractions: dict = None, n_proteins: int = None, seed: int = 1) -> list:
+        """Returns the PDB IDs of pdb_ids (default: all of the manifest) that were read without an error and
+        have from min_residues to max_residues residues, and at least min_fractions and at most max_fractions
+        of their residues in the categories of target.csv, e.g. {'a': 0.3}. A PDB ID with a chain suffix is
+        judged by its whole file. With n_proteins, a random sample of that many, drawn with seed, is returned.
+        The PDB IDs keep their order."""
+        keep = (self.errors == '') & (self.n_residues >= max(min_residues, 1))
+        if max_residues is not None:
+            keep &= self.n_residues <= max_residues
+        fractions = self.get_fractions()
+        for bounds, compare in ((min_fractions, np.greater_equal), (max_fractions, np.less_equal)):
+            for category, fraction in (bounds or {}).items():
+                if category not in self.categories:
+                    raise ValueError(f'Unknown category {category}; the categories are {", ".join(self.categories)}')
+                keep &= compare(fractions[:, self.categories.index(category)], fraction)
+
+        if pdb_ids is None:
+            selected = self.pdb_ids[keep].tolist()
+        else:
+            kept = set(self.pdb_ids[keep].tolist())
+            known = set(self.pdb_ids.tolist())
+            pdb_ids = [ReadDSSP.normalize_pdb_id(pdb_id) for pdb_id in pdb_ids]
+            missing = [pdb_id for pdb_id in pdb_ids if ReadDSSP.split_pdb_id(pdb_id=pdb_id)[0] not in known]
+            if missing:
+                logger.info(f'{len(missing)} PDB IDs are not in the manifest, e.g. {", ".join(missing[:5])}')
+            selected = [pdb_id for pdb_id in pdb_ids if ReadDSSP.split_pdb_id(pdb_id=pdb_id)[0] in kept]
+        if n_proteins is not None and n_proteins < len(selected):
+            sample = np.sort(np.random.default_rng(seed).choice(len(selected), size=n_proteins, replace=False))
+            selected = [selected[i] for i in sample.tolist()]
+        logger.info(f'Selected {len(selected)} PDB IDs from the manifest {self.path}')
+        return selected
+
+    def format_summary(self) -> str:
+        """Returns the number of proteins, residues and failed files and the mean category fractions."""
+        ok = self.errors == ''
+        n_residues = int(self.n_residues[ok].sum())
+        totals = self.category_counts[ok].sum(axis=0) / max(n_residues, 1)
+        fractions = ', '.join(f'{category} {fraction:.3f}' for category, fraction in zip(self.categories, totals))
+        return (f'{len(self)} PDB IDs, {int(ok.sum())} readable, {int((ok & (self.n_residues == 0)).sum())} without '
+                f'residues; {n_residues} residues ({fractions}); {self.n_rescanned} files read by the last scan')
+
+
+def summarize_dssp_file(pdb_id: str, n_categories: int) -> tuple:
+    """Returns (chains, residues, residues per category, error) of the DSSP file of PDB ID; the error is ''
+    if the file was read. Runs in worker processes of DsspManifest.scan."""
+    try:
+        (_, category_codes, _), index = ReadDSSP.read_with_index(pdb_id=pdb_id)
+    except Exception as err:
+        return 0, 0, np.zeros(n_categories, dtype=np.int64), f'{type(err).__name__}: {err}'
+    counts = np.bincount(category_codes, minlength=n_categories)[:n_categories]
+    return len(index), len(category_codes), counts, ''
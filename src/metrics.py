@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+import logging
+import numpy as np
+from src.tables import Target
+
+logger = logging.getLogger(__name__)
+
+
+class StructureMetrics:
+    """Evaluation metrics of secondary structure predictions, accumulated over any number of proteins:
+    Q3, per-class precision, recall and F1, the confusion matrix and the segment overlap score SOV
+    (SOV'99, Zemla et al., 1999).
+
+    Labels are one-hot rows, as made by WindowEncoder and predicted by the inference engine, or class
+    columns. A predicted row without exactly one class is counted in an explicit 'no class' column of the
+    confusion matrix; it is a wrong prediction for Q3 and breaks segments for SOV. Observed rows without a
+    class, such as residues without a structure label, are not scored and counted in n_unlabeled.
+
+    update() works on whole label arrays; the groups of many proteins can be passed at once with the
+    number of groups of each protein, so segments never run across proteins. The counts are integers and
+    sums, so the result does not depend on how the proteins are split into updates. SOV is pooled: the
+    scores and normalisation lengths of all proteins and classes are added up before dividing."""
+
+    def __init__(self, categories: list = None):
+        if categories is None:
+            Target.get_table()
+            categories = sorted(Target.mapping, key=Target.mapping.get)
+        self.categories = list(categories)
+        self.n_classes = len(self.categories)
+        self.no_class = self.n_classes  # column of predictions without exactly one class
+        # Rows are observed classes, columns predicted classes and 'no class'.
+        self.confusion = np.zeros((self.n_classes, self.n_classes + 1), dtype=np.int64)
+        self.sov_scores = np.zeros(self.n_classes, dtype=np.float64)
+        self.sov_lengths = np.zeros(self.n_classes, dtype=np.int64)
+        self.n_proteins: int = 0
+        self.n_unlabeled: int = 0
+
+    @staticmethod
+    def to_classes(Y: np.ndarray) -> np.ndarray:
+        """Returns the class column of each one-hot row; rows without exactly one class get the number of
+        columns. One-dimensional class columns are returned unchanged."""
+        Y = np.asarray(Y)
+        if Y.ndim == 1:
+            return Y.astype(np.int64, copy=False)
+        is_single = np.count_nonzero(Y, axis=1) == 1
+        return np.where(is_single, np.argmax(Y, axis=1), Y.shape[1])
+
+    def update(self, Y_true: np.ndarray, Y_pred: np.ndarray, lengths=None) -> None:
+        """Adds observed and predicted labels. Without lengths they are the groups of one protein; with
+        lengths they are the concatenated groups of len(lengths) proteins."""
+        true_classes = self.to_classes(Y_true)
+        pred_classes = self.to_classes(Y_pred)
+        if len(true_classes) != len(pred_classes):
+            raise ValueError(f'Got {len(true_classes)} observed and {len(pred_classes)} predicted labels')
+        lengths = np.asarray([len(true_classes)] if lengths is None else lengths, dtype=np.int64)
+        if lengths.sum() != len(true_classes):
+            raise ValueError(f'The lengths add up to {lengths.sum()} groups, not {len(true_classes)}')
+        is_labeled = true_classes < self.n_classes
+        self.n_proteins += len(lengths)
+        self.n_unlabeled += int(len(true_classes) - is_labeled.sum())
+        self.confusion += np.bincount(
+            true_classes[is_labeled] * (self.n_classes + 1) + pred_classes[is_labeled], minlength=self.confusion.size
+        ).reshape(self.confusion.shape)
+        protein_starts = np.cumsum(lengths) - lengths
+        true_segments = self.get_segments(true_classes, protein_starts)
+        pred_segments = self.get_segments(pred_classes, protein_starts)
+        for category in range(self.n_classes):
+            score, length = self.segment_overlap(
+                true_segments=[segments[true_segments[2] == category] for segments in true_segments[:2]],
+                pred_segments=[segments[pred_segments[2] == category] for segments in pred_segments[:2]]
+            )
+            self.sov_scores[category] += score
+            self.sov_lengths[category] += length
+
+    @staticmethod
+    def get_segments(classes: np.ndarray, protein_starts: np.ndarray) -> tuple:
+        """Returns start, stop and class of the runs of equal classes; runs also end at protein starts."""
+        is_start = np.ones(len(classes), dtype=bool)
+        is_start[1:] = classes[1:] != classes[:-1]
+        is_start[protein_starts[protein_starts < len(classes)]] = True
+        starts = np.flatnonzero(is_start)
+        stops = np.append(starts[1:], len(classes))
+        return starts, stops, classes[starts]
+
+    @staticmethod
+    def segment_overlap(true_segments: list, pred_segments: list) -> tuple:
+        """Returns the SOV'99 score and normalisation length of the observed and predicted segments of one
+        class, each given as sorted arrays of starts and stops. Every pair of overlapping segments scores
+        (minov + delta) / maxov * len(observed segment); observed segments without overlap only add to
+        the normalisation length."""
+        true_starts, true_stops = true_segments
+        pred_starts, pred_stops = pred_segments
+        # Segments of one class are disjoint and sorted, so the predicted segments overlapping an observed
+        # segment are a contiguous range [first, last).
+        first = np.searchsorted(pred_stops, true_starts, side='right')
+        last = np.searchsorted(pred_starts, true_stops, side='left')
+        n_pairs = np.maximum(last - first, 0)
+        true_lengths = true_stops - true_starts
+        length = int(true_lengths[n_pairs == 0].sum())
+        if not n_pairs.any():
+            return 0., length
+        true_index = np.repeat(np.arange(len(true_starts)), n_pairs)
+        pred_index = np.arange(n_pairs.sum()) - np.repeat(np.cumsum(n_pairs) - n_pairs - first, n_pairs)
+        t_start, t_stop = true_starts[true_index], true_stops[true_index]
+        p_start, p_stop = pred_starts[pred_index], pred_stops[pred_index]
+        min_overlap = np.minimum(t_stop, p_stop) - np.maximum(t_start, p_start)
+        max_overlap = np.maximum(t_stop, p_stop) - np.minimum(t_start, p_start)
+        pair_lengths = t_stop - t_start
+        delta = np.minimum.reduce([
+            max_overlap - min_overlap, min_overlap, pair_lengths // 2, (p_stop - p_start) // 2
+        ])
+        score = float(((min_overlap + delta) / max_overlap * pair_lengths).sum())
+        return score, length + int(pair_lengths.sum())
+
+    @property
+    def n_groups(self) -> int:
+        return int(self.confusion.sum())
+
+    @property
+    def q3(self) -> float:
+        """Fraction of groups whose class is predicted correctly."""
+        return float(np.trace(self.confusion[:, :self.n_classes]) / self.n_groups) if self.n_groups else 0.
+
+    @property
+    def no_class_fraction(self) -> float:
+        """Fraction of groups predicted with no or several classes."""
+        return float(self.confusion[:, self.no_class].sum() / self.n_groups) if self.n_groups else 0.
+
+    @property
+    def precision(self) -> np.ndarray:
+        correct = np.diag(self.confusion[:, :self.n_classes])
+        predicted = self.confusion[:, :self.n_classes].sum(axis=0)
+        return np.divide(correct, predicted, out=np.zeros(self.n_classes), where=predicted > 0)
+
+    @property
+    def recall(self) -> np.ndarray:
+        """Recall per class; groups predicted with no class count as missed."""
+        correct = np.diag(self.confusion[:, :self.n_classes])
+        observed = self.confusion.sum(axis=1)
+        return np.divide(correct, observed, out=np.zeros(self.n_classes), where=observed > 0)
+
+    @property
+    def f1(self) -> np.ndarray:
+        precision, recall = self.precision, self.recall
+        total = precision + recall
+        return np.divide(2 * precision * recall, total, out=np.zeros(self.n_classes), where=total > 0)
+
+    @property
+    def sov(self) -> float:
+        """Segment overlap score of all classes, in percent."""
+        total = self.sov_lengths.sum()
+        return float(100 * self.sov_scores.sum() / total) if total else 0.
+
+    @property
+    def sov_per_class(self) -> np.ndarray:
+        return np.divide(
+            100 * self.sov_scores, self.sov_lengths, out=np.zeros(self.n_classes), where=self.sov_lengths > 0
+        )
+
+    def get_report(self, segments: bool = True) -> dict:
+        """Returns the metrics as a JSON-serialisable dictionary. Without segments, the number of proteins
+        and SOV are left out, for groups that are not in the order of their proteins, such as a shuffled
+        test split."""
+        report = {
+            'n_proteins': self.n_proteins,
+            'n_groups': self.n_groups,
+            'n_unlabeled': self.n_unlabeled,
+            'q3': round(self.q3, 4),
+            'sov': round(self.sov, 2),
+            'no_class_fraction': round(self.no_class_fraction, 4),
+            'classes': {
+                category: {
+                    'precision': round(float(self.precision[i]), 4),
+                    'recall': round(float(self.recall[i]), 4),
+                    'f1': round(float(self.f1[i]), 4),
+                    'sov': round(float(self.sov_per_class[i]), 2),
+                    'support': int(self.confusion[i].sum()),
+                } for i, category in enumerate(self.categories)
+            },
+            'confusion_matrix': self.confusion.tolist(),
+        }
+        if not segments:
+            del report['n_proteins'], report['sov']
+            for scores in report['classes'].values():
+                del scores['sov']
+        return report
+
+    def format_report(self, segments: bool = True) -> str:
+        """Returns the metrics as a table for the terminal and the log; see get_report for segments."""
+        structures = {abbreviation: structure for structure, abbreviation in Target.sec_structure.items()}
+        names = [structures.get(category, category) for category in self.categories]
+        width = max(len(name) for name in names + ['no class'])
+        summary = f'{self.n_groups} groups: Q3 {self.q3:.4f}, '
+        if segments:
+            summary = f'{self.n_proteins} proteins, {self.n_groups} groups: Q3 {self.q3:.4f}, SOV {self.sov:.2f}, '
+        lines = [
+            f'{summary}no class predicted for {self.no_class_fraction:.2%}',
+            f'{"":<{width}} {"precision":>9} {"recall":>9} {"f1":>9} ' + (f'{"SOV":>9} ' if segments else '')
+            + f'{"support":>9}',
+        ]
+        for i, name in enumerate(names):
+            sov = f'{self.sov_per_class[i]:>9.2f} ' if segments else ''
+            lines.append(f'{name:<{width}} {self.precision[i]:>9.4f} {self.recall[i]:>9.4f} {self.f1[i]:>9.4f} '
+                         f'{sov}{self.confusion[i].sum():>9}')
+        lines.append('CONFUSION MATRIX (rows observed, columns predicted)')
+        lines.append(f'{"":<{width}} ' + ' '.join(f'{name:>{width}}' for name in names + ['no class']))
+        for i, name in enumerate(names):
+            lines.append(f'{name:<{width}} ' + ' '.join(f'{count:>{width}}' for count in self.confusion[i]))
+        return '\n'.join(lines)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import json
+import shutil
+import logging
+import datetime
+import numpy as np
+from src.instrumentation import Instrumentation
+from src.settings import Settings
+from src.tables import AminoAcid, Target
+
+logger = logging.getLogger(__name__)
+
+
+class ModelArtifact:
+    """A trained network stored as a directory: meta.json with the window length, the amino acid and
+    target tables, the network architecture and training metadata, and one .npy file per weight matrix
+    and bias vector. Only the network is stored, so file size and load time do not depend on the
+    amount of training data; the weights are memory-mapped on load.
+
+    pdb_ids.txt lists the proteins the network was trained on, so training can be continued on new
+    proteins only. An artifact made that way has the next version number, and its lineage lists its
+    ancestors; the artifact it replaces is kept in a directory with the suffix .v<version>."""
+    format_version: int = 1
+    meta_filename: str = 'meta.json'
+    pdb_ids_filename: str = 'pdb_ids.txt'
+    default_name: str = 'neural_net'
+    legacy_filename: str = 'neural_net.model'
+    # Versions of scikit-learn whose private MLPClassifier state to_classifier sets up, from the first up to
+    # but not including the second. Keep in line with requirements.txt and test the new bound when raising it.
+    sklearn_versions: tuple = ((1, 0, 2), (1, 10))
+
+    def __init__(self, coefs: list, intercepts: list, window_length: int, amino_acids: dict, targets: dict,
+                 activation: str = 'relu', out_activation: str = 'logistic', metadata: dict = None,
+                 pdb_ids: list = None, version: int = 1, lineage: list = None, saved_at: str = None,
+                 sklearn_version: str = None):
+        self.coefs = coefs
+        self.intercepts = intercepts
+        self.window_length = window_length
+        self.amino_acids = amino_acids
+        self.targets = targets
+        self.activation = activation
+        self.out_activation = out_activation
+        self.metadata: dict = metadata if metadata is not None else {}
+        self.pdb_ids: list = pdb_ids  # proteins the network was trained on; None if not recorded
+        self.version: int = version
+        self.lineage: list = lineage if lineage is not None else []
+        self.saved_at: str = saved_at
+        self.sklearn_version: str = sklearn_version  # of the run that saved the artifact
+
+    @classmethod
+    def from_classifier(cls, classifier, window_length: int, amino_acids: dict, targets: dict,
+                        metadata: dict = None, pdb_ids: list = None):
+        return cls(
+            coefs=list(classifier.coefs_), intercepts=list(classifier.intercepts_), window_length=window_length,
+            amino_acids=dict(amino_acids), targets=dict(targets), activation=classifier.activation,
+            out_activation=classifier.out_activation_, metadata=metadata, pdb_ids=pdb_ids
+        )
+
+    @classmethod
+    def from_training(cls, training):
+        """Returns the artifact of the network of a Training instance, with its training metadata and
+        proteins. If the training continued an artifact, the result is the next version of it."""
+        encoder = training.encoder
+        artifact = cls.from_classifier(
+            classifier=training.model, window_length=encoder.window_length, amino_acids=encoder.amino_acids,
+            targets=encoder.targets, metadata=training.get_metadata(), pdb_ids=training.get_trained_pdb_lst()
+        )
+        if training.parent is not None:
+            artifact.derive_from(parent=training.parent)
+        return artifact
+
+    def derive_from(self, parent) -> None:
+        """Makes the artifact the next version of parent: the proteins of parent are added to its training
+        set and parent is added to its lineage."""
+        self.version = parent.version + 1
+        self.lineage = parent.lineage + [parent.get_summary()]
+        self.pdb_ids = list(dict.fromkeys((parent.pdb_ids or []) + (self.pdb_ids or [])))
+
+    def get_summary(self) -> dict:
+        """Returns the entry of the artifact in the lineage of the artifacts derived from it."""
+        return {
+            'version': self.version,
+            'saved_at': self.saved_at,
+            'n_proteins': len(self.pdb_ids) if self.pdb_ids is not None else None,
+            'n_new_proteins': self.metadata.get('n_proteins'),
+            'validation_q3': self.metadata.get('validation', {}).get('q3'),
+        }
+
+    def to_classifier(self, **params):
+        """Returns an MLPClassifier that predicts with copies of the stored weights, as if it had been
+        fitted on one-hot encoded labels; params are passed to MLPClassifier. Training can be continued
+        with partial_fit. Prediction does not need it; see InferenceEngine.from_artifact.
+
+        The classifier is rebuilt by setting the state that fit would set, including private attributes,
+        so ValueError is raised if the installed scikit-learn, or the one that saved the artifact, is not
+        in the range of sklearn_versions."""
+        import sklearn
+        from sklearn.neural_network import MLPClassifier
+        from sklearn.preprocessing import LabelBinarizer
+        self.check_sklearn_version(version=sklearn.__version__, source='The installed scikit-learn is')
+        if self.sklearn_version is not None:
+            self.check_sklearn_version(version=self.sklearn_version, source='The model was saved with scikit-learn')
+        n_outputs = len(self.intercepts[-1])
+        classifier = MLPClassifier(
+            hidden_layer_sizes=tuple(len(intercept) for intercept in self.intercepts[:-1]),
+            activation=self.activation, **params
+        )
+        classifier.coefs_ = [np.array(coef) for coef in self.coefs]
+        classifier.intercepts_ = [np.array(intercept) for intercept in self.intercepts]
+        classifier.n_layers_ = len(self.coefs) + 1
+        classifier.n_outputs_ = n_outputs
+        classifier.out_activation_ = self.out_activation
+        classifier.n_features_in_ = self.coefs[0].shape[0]
+        classifier._label_binarizer = LabelBinarizer().fit(np.eye(n_outputs, dtype=int))
+        classifier.classes_ = classifier._label_binarizer.classes_
+        # State of the stochastic solvers, which MLPClassifier only sets up when it initialises the weights.
+        classifier.t_ = 0
+        classifier.loss_curve_ = []
+        classifier._no_improvement_count = 0
+        classifier.best_loss_ = np.inf
+        classifier.validation_scores_ = None
+        classifier.best_validation_score_ = None
+        classifier._best_coefs = [coef.copy() for coef in classifier.coefs_]
+        classifier._best_intercepts = [intercept.copy() for intercept in classifier.intercepts_]
+        return classifier
+
+    @classmethod
+    def check_sklearn_version(cls, version: str, source: str) -> None:
+        """Raise ValueError if to_classifier does not support scikit-learn version."""
+        first, stop = cls.sklearn_versions
+        if not first <= tuple(int(number) for number in re.findall(r'\d+', version)[:3]) < stop:
+            raise ValueError(f'{source} {version}, but continuing training supports scikit-learn '
+                             f'{".".join(map(str, first))} up to before {".".join(map(str, stop))}')
+
+    def save(self, path: str) -> None:
+        """Write the artifact to the directory path, replacing an existing artifact."""
+        with Instrumentation.stage('dump'):
+            self._save(path=path)
+        logger.info(f'Wrote model artifact to {path}')
+
+    def _save(self, path: str) -> None:
+        import sklearn
+        tmp_path = f'{path.rstrip(os.sep)}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for i, (coef, intercept) in enumerate(zip(self.coefs, self.intercepts)):
+            np.save(os.path.join(tmp_path, f'coef_{i}.npy'), np.ascontiguousarray(coef))
+            np.save(os.path.join(tmp_path, f'intercept_{i}.npy'), np.ascontiguousarray(intercept))
+        if self.pdb_ids is not None:
+            with open(os.path.join(tmp_path, self.pdb_ids_filename), 'w') as fp:
+                fp.writelines(f'{pdb_id}\n' for pdb_id in self.pdb_ids)
+        self.saved_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+        meta = {
+            'format_version': self.format_version,
+            'n_layers': len(self.coefs),
+            'window_length': self.window_length,
+            'amino_acids': self.amino_acids,
+            'targets': self.targets,
+            'activation': self.activation,
+            'out_activation': self.out_activation,
+            'metadata': self.metadata,
+            'version': self.version,
+            'lineage': self.lineage,
+            'saved_at': self.saved_at,
+            'sklearn_version': sklearn.__version__,
+        }
+        self.sklearn_version = sklearn.__version__
+        with open(os.path.join(tmp_path, self.meta_filename), 'w') as fp:
+            json.dump(meta, fp, indent=2)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """Read the artifact in the directory path. With mmap the weights are memory-mapped read-only."""
+        with Instrumentation.stage('load'):
+            return cls._load(path=path, mmap=mmap)
+
+    @classmethod
+    def _load(cls, path: str, mmap: bool = True):
+        with open(os.path.join(path, cls.meta_filename), 'r') as fp:
+            meta = json.load(fp)
+        if meta['format_version'] > cls.format_version:
+            raise ValueError(f'{path} has model format {meta["format_version"]}; '
+                             f'this version reads up to {cls.format_version}')
+        mmap_mode = 'r' if mmap else None
+        coefs, intercepts = [], []
+        for i in range(meta['n_layers']):
+            coefs.append(np.load(os.path.join(path, f'coef_{i}.npy'), mmap_mode=mmap_mode))
+            intercepts.append(np.load(os.path.join(path, f'intercept_{i}.npy'), mmap_mode=mmap_mode))
+        pdb_ids = None
+        if os.path.exists(os.path.join(path, cls.pdb_ids_filename)):
+            with open(os.path.join(path, cls.pdb_ids_filename), 'r') as fp:
+                pdb_ids = [line.strip() for line in fp if line.strip()]
+        return cls(
+            coefs=coefs, intercepts=intercepts, window_length=meta['window_length'],
+            amino_acids=meta['amino_acids'], targets=meta['targets'], activation=meta['activation'],
+            out_activation=meta['out_activation'], metadata=meta['metadata'], pdb_ids=pdb_ids,
+            version=meta.get('version', 1), lineage=meta.get('lineage', []), saved_at=meta.get('saved_at'),
+            sklearn_version=meta.get('sklearn_version')
+        )
+
+    @classmethod
+    def keep_version(cls, path: str) -> str:
+        """Copies the artifact in the directory path to path.v<version>, unless that exists, so it is kept
+        when path is replaced by a newer version. Returns the directory of the copy."""
+        with open(os.path.join(path, cls.meta_filename), 'r') as fp:
+            version = json.load(fp).get('version', 1)
+        version_path = f'{path.rstrip(os.sep)}.v{version}'
+        if not os.path.exists(version_path):
+            shutil.copytree(path, version_path)
+            logger.info(f'Kept version {version} of the model in {version_path}')
+        return version_path
+
+    def verify_tables(self, amino_acids: dict, targets: dict) -> None:
+        """Raise ValueError if the model was trained with different amino acid or target tables."""
+        if dict(amino_acids) != self.amino_acids or dict(targets) != self.targets:
+            raise ValueError('The amino acid or target table differs from the one the model was trained with')
+
+    @classmethod
+    def migrate(cls, legacy_filename: str, path: str):
+        """Convert a pickled Training instance, as written by earlier versions, into an artifact. The
+        window length and tables are those of the current settings, which the pickle was made with."""
+        from joblib import load
+        training = load(filename=legacy_filename)
+        encoder = getattr(training, 'encoder', None)
+        window_length = encoder.window_length if encoder is not None else int(Settings.window_length)
+        metadata = {
+            'dataset_type': getattr(training, 'dataset_type', None),
+            'n_proteins': len(getattr(training, 'pdb_lst', [])),
+            'migrated_from': os.path.abspath(legacy_filename),
+        }
+        AminoAcid.get_table()
+        Target.get_table()
+        artifact = cls.from_classifier(
+            classifier=training.model, window_length=window_length, amino_acids=AminoAcid.mapping,
+            targets=Target.mapping, metadata=metadata
+        )
+        artifact.save(path=path)
+        logger.info(f'Migrated {legacy_filename} to {path}')
+        return artifact
+
+    @classmethod
+    def get_default_path(cls) -> str:
+        return os.path.join(Settings.model_path, cls.default_name)
+
+    @classmethod
+    def load_default(cls, mmap: bool = True):
+        """Load the artifact in ModelPath, migrating a legacy neural_net.model there on first use."""
+        path = cls.get_default_path()
+        legacy_filename = os.path.join(Settings.model_path, cls.legacy_filename)
+        if not os.path.exists(os.path.join(path, cls.meta_filename)) and os.path.exists(legacy_filename):
+            logger.info(f'Found legacy model {legacy_filename}; migrating it to {path}')
+            cls.migrate(legacy_filename=legacy_filename, path=path)
+        return cls.load(path=path, mmap=mmap)
@@ -1,26 +1,43 @@
 #!/usr/bin/env python3
 
-from sklearn.neural_network import MLPClassifier
-from src.residue import Residue
+from src.inference import InferenceEngine
+from src.metrics import StructureMetrics
+from src.prediction_cache import PredictionCache
+from src.residue import Residue, ResidueFactory
+from src.settings import Settings
+from src.tables import Target
 import numpy as np
+import json
+import collections
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class Predict:
-    def __init__(self, pdb_id: str, model: MLPClassifier):
+    def __init__(self, pdb_id: str, model, feature_format: str = Settings.feature_format,
+                 window_length: int = int(Settings.window_length), cache: PredictionCache = None):
         self.pdb_id = pdb_id
-        self.model = model
+        # Fitted MLPClassifiers are run by the float32 inference engine.
+        self.model = InferenceEngine.from_model(model)
+        # Predictions of sequences seen before are taken from the prediction cache unless it is disabled.
+        self.cache = PredictionCache.for_model(self.model, cache=cache)
+        self.feature_format = feature_format
+        self.window_length = window_length
         self.X_data: np.ndarray = None
         self.Y_data: np.ndarray = None
         self.Y_data_pred: np.ndarray = None
         self.n_samples = None
 
     def predict(self):
+        """Predicts the structure of the protein; raises ValueError if it has no residues to predict, and
+        FileNotFoundError or ValueError if it cannot be read."""
         logger.info(f'Predicting structure of {self.pdb_id} using {self.model.__repr__()}')
-        residue = Residue(pdb_id=self.pdb_id)
+        residue = Residue(pdb_id=self.pdb_id, window_length=self.window_length, feature_format=self.feature_format)
         residue.set_residue_and_structure()
+        if residue.residue_count == 0:
+            raise ValueError(f'{self.pdb_id} has no residues to predict')
         residue.get_category_frequencies()
         residue.get_X_and_Y_arrays()
         # Print secondary structure fractions:
@@ -30,18 +47,288 @@ class Predict:
         print(f'coil: {round(residue.category_frequencies["c"], 2) * 100}')
         self.X_data = residue.X_data
         self.Y_data = residue.Y_data
-        self.Y_data_pred = self.model.predict(self.X_data)
-
-    def accuracy(self):
-        predicate_arr: list[bool] = []
-        self.n_samples = self._get_n_samples()
-        for i in range(self.n_samples):
-            predicate_arr.append(all(self.Y_data[i] == self.Y_data_pred[i]))
-        hits: int = sum(predicate_arr)
-        perc_correct: float = round(((hits / self.n_samples) * 100), 2)
-        msg = f'Model correctly predicted structure for {self.pdb_id} by {perc_correct}%'
+        key = get_residue_key(model=self.model, residue=residue) if self.cache is not None else None
+        self.Y_data_pred = self.cache.get(key) if key is not None else None
+        if self.Y_data_pred is None:
+            self.Y_data_pred = self.model.predict(residue.encoder.get_model_input(self.model, self.X_data))
+            if key is not None:
+                self.cache.put(key, self.Y_data_pred)
+
+    def accuracy(self) -> StructureMetrics:
+        """Prints and returns Q3 and the other metrics of the prediction over all groups of the protein."""
+        metrics = StructureMetrics()
+        metrics.update(Y_true=self.Y_data, Y_pred=self.Y_data_pred)
+        self.n_samples = metrics.n_groups
+        perc_correct: float = round(metrics.q3 * 100, 2)
+        msg = f'Model correctly predicted structure for {self.pdb_id} by {perc_correct}% (SOV {metrics.sov:.2f})'
         logger.info(msg=msg)
         print(msg)
+        return metrics
+
+
+class BatchPredict:
+    """Predicts the structure of many proteins with one model. Window codes of consecutive proteins are
+    packed into batches of at least batch_size groups, so the model is called once per batch instead of
+    once per protein. Per-protein results are written as JSON lines as soon as their batch is predicted.
+    Proteins whose sequence is in the prediction cache or repeats an earlier protein of the batch, such as
+    the chains of homo-oligomers, are not passed to the model."""
+
+    def __init__(self, pdb_id_lst: list, model, batch_size: int = Settings.predict_batch_size,
+                 read_seq=None, n_workers: int = Settings.workers, window_length: int = int(Settings.window_length),
+                 cache: PredictionCache = None):
+        self.pdb_id_lst = pdb_id_lst
+        self.model = InferenceEngine.from_model(model)
+        self.cache = PredictionCache.for_model(self.model, cache=cache)
+        self.batch_size = batch_size
+        self.read_seq = read_seq
+        self.n_workers = n_workers
+        self.encoder = Residue.get_encoder(window_length=window_length)
+        self.errors: list = []
+        self.metrics = StructureMetrics(categories=sorted(self.encoder.targets, key=self.encoder.targets.get))
+        self.n_proteins: int = 0
+        self.n_residues: int = 0
+        self.elapsed: float = 0.
+
+    def predict(self, fp) -> None:
+        """Predict all proteins and write one JSON object per protein to the file object fp. Proteins
+        that cannot be read are written with their error instead of results."""
+        logger.info(f'Predicting structure of {len(self.pdb_id_lst)} proteins using {self.model.__repr__()}')
+        start = time.perf_counter()
+        for result in self.iter_results():
+            fp.write(json.dumps(result) + '\n')
+        for error in self.errors:
+            fp.write(json.dumps({'pdb_id': error.pdb_id, 'error': f'{error.exception}: {error.message}'}) + '\n')
+        self.elapsed = time.perf_counter() - start
+        logger.info(f'Predicted {self.n_proteins} proteins ({self.n_residues} residues) in {self.elapsed:.2f} s: '
+                    f'{self.proteins_per_second:.1f} proteins/s, {self.residues_per_second:.0f} residues/s')
+        logger.info(f'Metrics of all predicted proteins:\n{self.metrics.format_report()}')
+
+    def iter_results(self):
+        """Yields the result dictionary of each protein, in the order of the PDB IDs."""
+        factory = ResidueFactory(
+            pdb_id_lst=self.pdb_id_lst, feature_format='codes', read_seq=self.read_seq, n_workers=self.n_workers,
+            window_length=self.encoder.window_length
+        )
+        residues, n_groups = [], 0
+        for residue in factory.iterate():
+            residues.append(residue)
+            n_groups += len(residue.X_data)
+            if n_groups >= self.batch_size:
+                yield from self.predict_batch(residues=residues)
+                residues, n_groups = [], 0
+        if residues:
+            yield from self.predict_batch(residues=residues)
+        self.errors = factory.errors
+
+    def predict_batch(self, residues: list):
+        """Predicts the groups of several proteins with a single model call and yields their results. The
+        groups of proteins found in the prediction cache are not predicted again."""
+        lengths = [len(residue.X_data) for residue in residues]
+        stops = np.cumsum(lengths, dtype=np.int64)
+        starts = stops - lengths
+        predictions = np.zeros((sum(lengths), self.encoder.n_output_units), dtype=np.uint8)
+        missing = []  # (residue, start, stop, key) of the proteins the model predicts
+        repeats = []  # (start, stop, start of the earlier protein of the batch with the same sequence)
+        first_starts = {}  # cache key: start of the protein of the batch that is predicted
+        for residue, start, stop in zip(residues, starts.tolist(), stops.tolist()):
+            key = get_residue_key(model=self.model, residue=residue) if self.cache is not None else None
+            if key in first_starts:
+                repeats.append((start, stop, first_starts[key]))
+                self.cache.count_repeat()
+                continue
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None and len(cached) == stop - start:
+                predictions[start:stop] = cached
+                continue
+            missing.append((residue, start, stop, key))
+            if key is not None:
+                first_starts[key] = start
+        X_codes = np.concatenate([residue.X_data for residue, _, _, _ in missing]) if missing else []
+        if len(X_codes):
+            predicted = self.model.predict(self.encoder.get_model_input(self.model, X_codes))
+            offset = 0
+            for _, start, stop, key in missing:
+                predictions[start:stop] = predicted[offset:offset + stop - start]
+                offset += stop - start
+                if key is not None:
+                    self.cache.put(key, predictions[start:stop])
+        for start, stop, first_start in repeats:
+            predictions[start:stop] = predictions[first_start:first_start + stop - start]
+        self.metrics.update(
+            Y_true=np.concatenate([residue.Y_data for residue in residues]), Y_pred=predictions,
+            lengths=[len(residue.X_data) for residue in residues]
+        )
+        start = 0
+        for residue in residues:
+            stop = start + len(residue.X_data)
+            self.n_proteins += 1
+            self.n_residues += residue.residue_count
+            yield self.get_result(residue=residue, Y_data_pred=predictions[start:stop])
+            start = stop
+
+    def get_result(self, residue: Residue, Y_data_pred: np.ndarray) -> dict:
+        """Returns Q3 and SOV of a protein, computed by StructureMetrics over its labeled groups as by
+        Predict.accuracy, and the observed and predicted fractions of each secondary structure class.
+        Groups whose prediction is not exactly one class count towards no predicted class."""
+        metrics = StructureMetrics(categories=self.metrics.categories)
+        metrics.update(Y_true=residue.Y_data, Y_pred=Y_data_pred)
+        n_groups = metrics.n_groups
+        predicted_counts = metrics.confusion[:, :metrics.n_classes].sum(axis=0)
+        categories = list(Target.sec_structure.values())
+        return {
+            'pdb_id': residue.pdb_id,
+            'residues': residue.residue_count,
+            'groups': n_groups,
+            'q3': round(metrics.q3, 4) if n_groups else None,
+            'sov': round(metrics.sov, 2) if n_groups else None,
+            'frequencies': {
+                category: round(residue.category_frequencies[category], 4) for category in categories
+            },
+            'predicted_frequencies': {
+                category: round(int(predicted_counts[self.encoder.targets[category]]) / n_groups, 4)
+                if n_groups else 0. for category in categories
+            },
+        }
+
+    @property
+    def proteins_per_second(self) -> float:
+        return self.n_proteins / self.elapsed if self.elapsed else 0.
+
+    @property
+    def residues_per_second(self) -> float:
+        return self.n_residues / self.elapsed if self.elapsed else 0.
+
+
+class SequencePredict:
+    """Predicts the secondary structure of sequences without known structure, e.g. the records of a
+    FASTA file. Every residue gets one window, aligned like the training windows and padded beyond the
+    ends of the sequence. Windows of consecutive sequences are copied into a fixed-size buffer and
+    predicted whenever it is full, so memory stays flat no matter how many sequences are streamed.
+    Each residue is assigned the class with the highest predicted probability.
+
+    Sequences found in the prediction cache, and repeats of a sequence whose windows are still in the
+    buffer, are answered without predicting their windows."""
+    structure_labels: dict = {'a': 'H', 'b': 'E', 'c': 'C'}
+
+    def __init__(self, model, batch_size: int = Settings.predict_batch_size,
+                 window_length: int = int(Settings.window_length), cache: PredictionCache = None):
+        self.model = InferenceEngine.from_model(model)
+        self.cache = PredictionCache.for_model(self.model, cache=cache)
+        self.batch_size = batch_size
+        self.encoder = Residue.get_encoder(window_length=window_length)
+        self.label_lookup = np.empty(self.encoder.n_output_units, dtype=np.uint8)
+        for category, label in self.structure_labels.items():
+            self.label_lookup[self.encoder.targets[category]] = ord(label)
+        self.n_sequences: int = 0
+        self.n_residues: int = 0
+        self.elapsed: float = 0.
+
+    def predict(self, records, fp) -> None:
+        """Predicts (name, sequence) records and writes the H/E/C string of each record in FASTA format
+        to the file object fp as soon as the batch holding its last residue is predicted."""
+        start = time.perf_counter()
+        for name, structure in self.iter_predictions(records=records):
+            fp.write(f'>{name}\n{structure}\n')
+        self.elapsed = time.perf_counter() - start
+        logger.info(f'Predicted {self.n_sequences} sequences ({self.n_residues} residues) in {self.elapsed:.2f} s: '
+                    f'{self.residues_per_second:.0f} residues/s')
+
+    def iter_predictions(self, records):
+        """Yields (name, H/E/C string) of each record, in the order of the records."""
+        X_codes = np.empty((self.batch_size, self.encoder.window_length), dtype=np.uint8)
+        n_rows = 0
+        # Records with residues in the buffer or not yet yielded: [name, length, predicted parts, cache key,
+        # earlier pending record of the same sequence]. Only records whose windows are predicted have a key.
+        pending = collections.deque()
+        in_flight = {}  # cache key: pending record whose windows are predicted
+        for name, sequence in records:
+            aa_codes = self.encoder.encode_labels(sequence, self.encoder.input_lookup)
+            key = self.get_key(aa_codes=aa_codes) if self.cache is not None else None
+            if key is not None:
+                if key in in_flight:
+                    pending.append([name, len(aa_codes), None, None, in_flight[key]])
+                    self.cache.count_repeat()
+                    continue
+                cached = self.cache.get(key)
+                if cached is not None:
+                    pending.append([name, len(aa_codes), [cached.tobytes().decode('ascii')], None, None])
+                    if len(pending) == 1:
+                        yield from self._pop_complete(pending=pending, in_flight=in_flight)
+                    continue
+            windows = self.encoder.get_residue_window_codes(aa_codes)
+            pending.append([name, len(windows), [], key, None])
+            if key is not None:
+                in_flight[key] = pending[-1]
+            start = 0
+            while start < len(windows):
+                n_copy = min(self.batch_size - n_rows, len(windows) - start)
+                X_codes[n_rows:n_rows + n_copy] = windows[start:start + n_copy]
+                n_rows += n_copy
+                start += n_copy
+                if n_rows == self.batch_size:
+                    yield from self._flush(X_codes=X_codes, pending=pending, in_flight=in_flight)
+                    n_rows = 0
+        yield from self._flush(X_codes=X_codes[:n_rows], pending=pending, in_flight=in_flight)
+
+    def _flush(self, X_codes: np.ndarray, pending: collections.deque, in_flight: dict):
+        """Predicts the buffered windows, hands the labels to the pending records in order and yields the
+        records that are complete."""
+        structure = self.predict_labels(X_codes=X_codes)
+        start = 0
+        for record in pending:
+            _, length, parts, _, source = record
+            if source is not None:
+                continue
+            n_missing = length - sum(len(part) for part in parts)
+            parts.append(structure[start:start + n_missing])
+            start += n_missing
+            if start >= len(structure):
+                break
+        yield from self._pop_complete(pending=pending, in_flight=in_flight)
+
+    def _pop_complete(self, pending: collections.deque, in_flight: dict):
+        """Yields the leading pending records whose labels are complete and caches those that were predicted.
+        A repeated sequence follows the record it repeats, which is therefore complete before it."""
+        while pending and (pending[0][4] is not None or sum(len(part) for part in pending[0][2]) == pending[0][1]):
+            record = pending.popleft()
+            name, length, parts, key, source = record
+            structure = ''.join(source[2] if source is not None else parts)
+            if key is not None:
+                self.cache.put(key, np.frombuffer(structure.encode('ascii'), dtype=np.uint8))
+                if in_flight.get(key) is record:
+                    del in_flight[key]
+            self.n_sequences += 1
+            self.n_residues += length
+            yield name, structure
+
+    def get_key(self, aa_codes: np.ndarray, chains: np.ndarray = None) -> str:
+        """Returns the prediction cache key of the H/E/C string of a sequence, or of a protein whose windows
+        do not cross chains."""
+        return PredictionCache.get_key(
+            fingerprint=self.model.fingerprint, window_length=self.encoder.window_length, kind='structure',
+            aa_codes=aa_codes, chains=chains
+        )
+
+    def predict_labels(self, X_codes: np.ndarray) -> str:
+        """Returns the H/E/C label of each window."""
+        if len(X_codes) == 0:
+            return ''
+        X_data = self.encoder.get_model_input(self.model, X_codes)
+        if hasattr(self.model, 'predict_classes'):
+            classes = self.model.predict_classes(X_data)
+        else:
+            classes = np.argmax(self.model.predict_proba(X_data), axis=1)
+        return self.label_lookup[classes].tobytes().decode('ascii')
+
+    @property
+    def residues_per_second(self) -> float:
+        return self.n_residues / self.elapsed if self.elapsed else 0.
+
 
-    def _get_n_samples(self):
-        return len(self.Y_data) - 1
+def get_residue_key(model, residue: Residue) -> str:
+    """Returns the prediction cache key of the one-hot labels of the groups of a protein, which depend on
+    its amino acid codes and chains."""
+    return PredictionCache.get_key(
+        fingerprint=model.fingerprint, window_length=residue.encoder.window_length, kind='labels',
+        aa_codes=residue.aa_codes, chains=residue.chains
+    )
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+import os
+import logging
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from src.files import atomic_write
+from src.instrumentation import Instrumentation
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """Cache of the predictions of whole sequences, so that identical chains, resubmitted proteins and
+    common domains are predicted by the network once. An entry is keyed by a hash of the fingerprint of
+    the model, the window length, the kind of prediction and the amino acid codes and chains of the
+    sequence. The fingerprint is a hash of the weights, so entries of a model that has been retrained or
+    replaced are never used again; they age out of the cache like any other unused entry.
+
+    Entries are kept in memory, least recently used first out once they exceed memory_max_bytes. With a
+    disk_path, entries are also written there as .npy files and read back by later runs; accessing an
+    entry refreshes its modification time, and the least recently used files are removed once the
+    directory grows beyond disk_max_bytes. The cache can be shared by the threads of a server."""
+    entry_extension: str = '.npy'
+    default = None
+
+    def __init__(self, memory_max_bytes: int = None, disk_path: str = Settings.prediction_cache_path,
+                 disk_max_bytes: int = None):
+        if memory_max_bytes is None:
+            memory_max_bytes = int(Settings.prediction_cache_memory_megabytes * 1024 ** 2)
+        if disk_max_bytes is None:
+            disk_max_bytes = int(Settings.prediction_cache_disk_max_megabytes * 1024 ** 2)
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_path = disk_path or None
+        self.disk_max_bytes = disk_max_bytes
+        self.hits: int = 0
+        self.disk_hits: int = 0  # hits answered by the disk tier, included in hits
+        self.misses: int = 0
+        self.memory: OrderedDict = OrderedDict()
+        self.memory_bytes: int = 0
+        self._disk_size: int = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_default(cls):
+        """Returns the process-wide cache configured in settings.ini, or None if it is disabled."""
+        if not Settings.prediction_cache_enabled:
+            return None
+        if cls.default is None or cls.default.disk_path != (Settings.prediction_cache_path or None):
+            cls.default = cls(disk_path=Settings.prediction_cache_path)
+        return cls.default
+
+    @classmethod
+    def for_model(cls, model, cache=None):
+        """Returns cache, or the default cache if it is None, for a model with a fingerprint, such as an
+        InferenceEngine; returns None for other models, whose predictions are not cached."""
+        if getattr(model, 'fingerprint', None) is None:
+            return None
+        return cache if cache is not None else cls.get_default()
+
+    @staticmethod
+    def get_key(fingerprint: str, window_length: int, kind: str, aa_codes: np.ndarray,
+                chains: np.ndarray = None) -> str:
+        """Returns the hexadecimal key of the prediction of kind (e.g. 'classes' or 'labels') of a sequence
+        by the model with fingerprint."""
+        digest = hashlib.blake2b(f'{fingerprint}:{window_length}:{kind}:{len(aa_codes)}:'.encode(), digest_size=16)
+        digest.update(np.ascontiguousarray(aa_codes, dtype=np.uint8).data)
+        if chains is not None:
+            digest.update(np.ascontiguousarray(chains, dtype=np.uint8).data)
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """Returns the cached prediction of key, or None."""
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+        if value is None and self.disk_path is not None:
+            value = self._read(key=key)
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key=key, value=value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        Instrumentation.count('prediction_cache_hits' if value is not None else 'prediction_cache_misses')
+        return value
+
+    def count_repeat(self) -> None:
+        """Counts a sequence that is answered by the prediction of an identical sequence of the same batch
+        as a hit, although the prediction is not stored yet."""
+        with self._lock:
+            self.hits += 1
+        Instrumentation.count('prediction_cache_hits')
+
+    def put(self, key: str, value: np.ndarray) -> None:
+        """Stores the prediction of key in memory and, with a disk_path, on disk. The array is copied, so
+        it may be a view of a larger batch."""
+        value = np.array(value)
+        value.flags.writeable = False
+        self._remember(key=key, value=value)
+        if self.disk_path is not None:
+            self._write(key=key, value=value)
+
+    def _remember(self, key: str, value: np.ndarray) -> None:
+        with self._lock:
+            previous = self.memory.pop(key, None)
+            if previous is not None:
+                self.memory_bytes -= previous.nbytes
+            self.memory[key] = value
+            self.memory_bytes += value.nbytes
+            while self.memory_bytes > self.memory_max_bytes and self.memory:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= evicted.nbytes
+
+    def _read(self, key: str):
+        entry_path = self.get_entry_path(key=key)
+        try:
+            value = np.load(entry_path, allow_pickle=False)
+            os.utime(entry_path)
+        except (OSError, ValueError):
+            return None
+        value.flags.writeable = False
+        return value
+
+    def _write(self, key: str, value: np.ndarray) -> None:
+        entry_path = self.get_entry_path(key=key)
+        try:
+            os.makedirs(self.disk_path, exist_ok=True)
+            previous_size = self._get_file_size(entry_path)
+            with atomic_write(entry_path) as fp:
+                np.save(fp, value, allow_pickle=False)
+        except OSError as err:
+            logger.info(f'{err.__repr__()}: could not write prediction cache entry {entry_path}')
+            return
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += self._get_file_size(entry_path) - previous_size
+            self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used files until the disk tier fits into disk_max_bytes; 0 means no limit."""
+        if self.disk_max_bytes <= 0:
+            return
+        if self._disk_size is None:
+            self._disk_size = sum(size for _, _, size in self._get_entries())
+        if self._disk_size <= self.disk_max_bytes:
+            return
+        for _, entry_path, size in sorted(self._get_entries()):
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            self._disk_size -= size
+            if self._disk_size <= self.disk_max_bytes:
+                break
+        logger.info(f'Evicted prediction cache entries in {self.disk_path}; size is now {self._disk_size} bytes')
+
+    def clear(self) -> None:
+        """Empties both tiers and resets the counters."""
+        with self._lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+            for _, entry_path, _ in self._get_entries():
+                os.remove(entry_path)
+            self._disk_size = 0
+        self.hits, self.disk_hits, self.misses = 0, 0, 0
+
+    def get_entry_path(self, key: str) -> str:
+        return os.path.join(self.disk_path, key) + self.entry_extension
+
+    def _get_entries(self) -> list[tuple]:
+        """Returns (last access, path, size) of all files of the disk tier."""
+        if self.disk_path is None:
+            return []
+        entries = []
+        try:
+            dir_entries = list(os.scandir(self.disk_path))
+        except FileNotFoundError:
+            return entries
+        for dir_entry in dir_entries:
+            if dir_entry.name.endswith(self.entry_extension):
+                stat = dir_entry.stat()
+                entries.append((stat.st_mtime_ns, dir_entry.path, stat.st_size))
+        return entries
+
+    @staticmethod
+    def _get_file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @property
+    def hit_rate(self) -> float:
+        n_lookups = self.hits + self.misses
+        return self.hits / n_lookups if n_lookups else 0.
+
+    def get_stats(self) -> dict:
+        """Returns the counters of the cache, e.g. for sizing it."""
+        return {
+            'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+            'hit_rate': round(self.hit_rate, 4), 'entries': len(self.memory), 'memory_bytes': self.memory_bytes
+        }
+
+    def format_stats(self) -> str:
+        return (f'Prediction cache: {self.hits} hits ({self.disk_hits} from disk), {self.misses} misses, hit rate '
+                f'{self.hit_rate:.1%}; {len(self.memory)} entries, {self.memory_bytes} bytes in memory')
@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 
 import os
+import re
+import bz2
+import gzip
+import lzma
 import logging
 import typing
+import numpy as np
 from enum import Enum
 from collections import namedtuple
+from src.archive import DsspArchive
+from src.instrumentation import Instrumentation
 from src.settings import Settings
+from src.tables import AminoAcid, Target
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +24,21 @@ class ReadDSSP:
     }
     structure_label_category_correspondence: dict = {'H': 'a', 'G': 'a', 'I': 'a', 'E': 'b'}
     header_line: str = '  #  RESIDUE AA STRUCTURE'
+    chain_pos: int = 11
     aa_pos_start: int = 12
     aa_pos_end: int = 14
     struc_pos_start: int = 14
     struc_pos_end: int = 17
     ResidueAndCategory = typing.NamedTuple('ResidueAndStruc', [('amino_acid', str), ('category', str)])
+    blank: np.ndarray = np.isin(np.arange(256), list(b' \t\r\n\x0b\x0c'))
+    aa_lookup: np.ndarray = None
+    aa_valid: np.ndarray = None
+    category_lookup: np.ndarray = None
+    # A PDB ID may carry the identifiers of the chains to read, as in 1abcB or 1abcAB.
+    chain_suffix = re.compile(r'(\d[0-9A-Za-z]{3})([0-9A-Za-z]+)')
+    chain_indexes: dict = {}  # filename: (size, mtime_ns, chain index) of the files read by chain
+    # DSSP files may be compressed; the suffix after DsspExtension selects the module that decompresses.
+    compressions: dict = {'.gz': gzip, '.bz2': bz2, '.xz': lzma}
 
     @classmethod
     def extract_info_from_line(cls, line: str) -> tuple:
@@ -46,27 +64,277 @@ class ReadDSSP:
     @classmethod
     def read(cls, pdb_id: str) -> list[namedtuple]:
         """Read DSSP file of PDB ID and return a list of (AA, structure label) tuples."""
-        residue_and_category_lst = []
+        aa_codes, category_codes = cls.read_arrays(pdb_id=pdb_id)
+        return cls.arrays_to_tuples(aa_codes=aa_codes, category_codes=category_codes)
+
+    @classmethod
+    def read_arrays(cls, pdb_id: str) -> tuple[np.ndarray, np.ndarray]:
+        """Read DSSP file of PDB ID in one bulk read and return arrays of amino acid codes (see
+        amino_acids.csv) and category codes (see target.csv) of the residues that pass the filter."""
+        return cls.read_chain_arrays(pdb_id=pdb_id)[:2]
+
+    @classmethod
+    def read_chain_arrays(cls, pdb_id: str, index: dict = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Like read_arrays, but also return the chain identifier of each residue as a byte. For a PDB ID
+        with a chain suffix only the lines of those chains are read, at the byte offsets of the chain
+        index of the file. The index is built by the first read by chain, or passed by the caller."""
+        pdb_id, chains = cls.split_pdb_id(pdb_id=pdb_id)
         filename = cls.get_filename(pdb_id=pdb_id)
-        # logger.info(f'filename: {filename}')
-        read_line = False
         try:
-            with open(filename, 'r') as fp:
-                for line in fp:
-                    if line.startswith(cls.header_line):
-                        read_line = True
-                        continue
-                    if read_line:
-                        aa, structure, tag = cls.extract_info_from_line(line=line)
-                        if tag.name == 'OKAY':
-                            cat = cls.dssp_structure_to_category(structure_label=structure)
-                            res_and_struc = cls.ResidueAndCategory(amino_acid=aa.strip().upper(), category=cat)
-                            residue_and_category_lst.append(res_and_struc)
+            if chains:
+                return cls.read_chains(filename=filename, chains=chains, index=index)
+            data = cls.read_file(filename=filename)
         except FileNotFoundError as err:
             logger.info(f'{err.__repr__()}: {filename} might be missing; also check path in settings.ini')
             raise err
 
-        return residue_and_category_lst
+        return cls.parse_chains(data=data)
+
+    @classmethod
+    def read_with_index(cls, pdb_id: str) -> tuple[tuple, dict]:
+        """Reads the whole DSSP file of PDB ID; returns its (amino acid codes, category codes, chains)
+        and its chain index."""
+        data = cls.read_file(filename=cls.get_filename(pdb_id=pdb_id))
+        return cls.parse_chains(data=data), cls.get_chain_index(data=data)
+
+    @classmethod
+    def read_file(cls, filename: str) -> bytes:
+        """Returns the content of a DSSP file, decompressed if its name ends with .gz, .bz2 or .xz. The
+        filename may refer to a member of a tar archive (see DsspArchive)."""
+        archive_path, member = DsspArchive.split_reference(filename)
+        with Instrumentation.stage('read'):
+            if member:
+                return cls.decompress(data=DsspArchive.get(archive_path).read_member(member), filename=member)
+            compression = cls.compressions.get(os.path.splitext(filename)[1])
+            with (compression.open if compression else open)(filename, 'rb') as fp:
+                return fp.read()
+
+    @classmethod
+    def decompress(cls, data: bytes, filename: str) -> bytes:
+        compression = cls.compressions.get(os.path.splitext(filename)[1])
+        return compression.decompress(data) if compression else data
+
+    @classmethod
+    def stat(cls, filename: str) -> os.stat_result:
+        """Returns the stat of a DSSP file, or of the archive that holds it."""
+        return os.stat(DsspArchive.split_reference(filename)[0])
+
+    @classmethod
+    def read_chains(cls, filename: str, chains: str, index: dict = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the codes of the residues of chains, in the order of the file. Only the byte ranges
+        of the chains are read and parsed. Without an index, the index kept from an earlier read of the
+        unchanged file is used; if there is none, the whole file is parsed once and its index kept."""
+        if index is None:
+            stat = cls.stat(filename)
+            size, mtime_ns, index = cls.chain_indexes.get(filename, (None, None, None))
+            if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                data = cls.read_file(filename=filename)
+                cls.chain_indexes[filename] = (stat.st_size, stat.st_mtime_ns, cls.get_chain_index(data=data))
+                return cls.select_chains(arrays=cls.parse_chains(data=data), chains=chains, filename=filename)
+        missing = [chain for chain in chains if chain not in index]
+        if missing:
+            raise ValueError(f'{filename} has no chain {", ".join(sorted(set(missing)))}')
+        # Lines of other chains inside a range are removed by select_chains.
+        ranges = sorted(set(index[chain] for chain in chains))
+        if cls.is_plain(filename):
+            with Instrumentation.stage('read'), open(filename, 'rb') as fp:
+                blocks = []
+                for start, stop in ranges:
+                    fp.seek(start)
+                    blocks.append(fp.read(stop - start))
+        else:
+            # Compressed files and archive members are decompressed as a whole; only the chains are parsed.
+            data = cls.read_file(filename=filename)
+            blocks = [data[start:stop] for start, stop in ranges]
+        Instrumentation.count('chain_index_reads')
+        return cls.select_chains(arrays=cls.parse_lines(data=b''.join(blocks)), chains=chains, filename=filename)
+
+    @classmethod
+    def split_pdb_id(cls, pdb_id: str) -> tuple[str, str]:
+        """Returns the PDB ID without its chain suffix and the chain identifiers of the suffix, '' if
+        there is none. Only IDs that start like a PDB ID, a digit and three letters or digits, have one."""
+        match = cls.chain_suffix.fullmatch(pdb_id)
+        if match is None:
+            return pdb_id, ''
+        return match.group(1), match.group(2)
+
+    @classmethod
+    def normalize_pdb_id(cls, pdb_id: str) -> str:
+        """Returns pdb_id with the PDB ID in lower case, as the DSSP files are named; chain identifiers are
+        case-sensitive and kept."""
+        pdb_id, chains = cls.split_pdb_id(pdb_id=pdb_id.strip())
+        return pdb_id.lower() + chains
+
+    @staticmethod
+    def select_chains(arrays: tuple, chains: str, filename: str = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the (amino acid codes, category codes, chains) of the residues of chains; all of them
+        if chains is empty. Raises ValueError if a chain has no residues, as PackedCorpus does."""
+        if not chains:
+            return arrays
+        aa_codes, category_codes, residue_chains = arrays
+        selected = np.frombuffer(chains.encode('ascii'), dtype=np.uint8)
+        missing = sorted(set(chr(chain) for chain in np.setdiff1d(selected, residue_chains).tolist()))
+        if missing:
+            raise ValueError(f'{filename or "The protein"} has no chain {", ".join(missing)}')
+        keep = np.isin(residue_chains, selected)
+        return aa_codes[keep], category_codes[keep], residue_chains[keep]
+
+    @classmethod
+    def get_chain_index(cls, data: bytes) -> dict:
+        """Returns the chain index of the content of a DSSP file: for each chain identifier, the byte
+        offsets of the start of its first residue line and of the end of its last one."""
+        lines = cls._get_lines(data=data)
+        if lines is None:
+            return {}
+        buffer, starts, ends = lines
+        chains = buffer[np.minimum(starts + cls.chain_pos, ends)]
+        index = {}
+        for chain in np.unique(chains[~cls.blank[chains]]).tolist():
+            rows = np.flatnonzero(chains == chain)
+            index[chr(chain)] = (int(starts[rows[0]]), int(ends[rows[-1]]) + 1)
+        return index
+
+    @classmethod
+    def parse(cls, data: bytes) -> tuple[np.ndarray, np.ndarray]:
+        """Return amino acid and category codes of the residue lines in the content of a DSSP file."""
+        return cls.parse_chains(data=data)[:2]
+
+    @classmethod
+    def parse_chains(cls, data: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return amino acid codes, category codes and chain identifiers of the residue lines in the
+        content of a DSSP file. Lines are located by their newlines and the fixed chain, amino acid and
+        structure columns of all lines are sliced at once; residues are kept under the same rules as in
+        extract_info_from_line. Parsed lines, kept residues and dropped lines are counted per reason."""
+        with Instrumentation.stage('parse'):
+            return cls._parse_chains(data=data)
+
+    @classmethod
+    def parse_lines(cls, data: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Like parse_chains, for data that holds residue lines only, such as a byte range of a chain."""
+        if not data.endswith(b'\n'):
+            data += b'\n'
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buffer == ord('\n'))
+        starts = np.concatenate(([0], newlines[:-1] + 1))
+        with Instrumentation.stage('parse'):
+            return cls._parse_lines(buffer=buffer, starts=starts, ends=newlines)
+
+    @classmethod
+    def _get_lines(cls, data: bytes) -> tuple:
+        """Returns the content as a byte array and the offsets of the start and the newline of each line
+        after the header line, or None if there is no header line."""
+        header_starts = cls._find_line_starts(data=data, prefix=cls.header_line.encode('ascii'))
+        if len(header_starts) == 0:
+            return None
+        if not data.endswith(b'\n'):
+            data += b'\n'
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buffer == ord('\n'))
+        starts = newlines[newlines > header_starts[0]][:-1] + 1
+        # Every line starting with the header is skipped, as in a line-by-line read.
+        starts = starts[~np.isin(starts, header_starts)]
+        ends = newlines[np.searchsorted(newlines, starts)]
+        return buffer, starts, ends
+
+    @classmethod
+    def _parse_chains(cls, data: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        lines = cls._get_lines(data=data)
+        if lines is None:
+            return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint8)
+        buffer, starts, ends = lines
+        return cls._parse_lines(buffer=buffer, starts=starts, ends=ends)
+
+    @classmethod
+    def _parse_lines(cls, buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> tuple:
+        cls.get_lookups()
+        # Gather the chain, amino acid and structure columns of all lines; past the end of a line, the
+        # position is clamped to its newline, which counts as blank.
+        positions = np.minimum(starts[:, None] + np.arange(cls.chain_pos, cls.struc_pos_end), ends[:, None])
+        chains = buffer[positions[:, 0]]
+        columns = buffer[positions[:, cls.aa_pos_start - cls.chain_pos:]]
+        blank = cls.blank[columns]
+        n_aa_columns = cls.aa_pos_end - cls.aa_pos_start
+
+        # Amino acid: the stripped field is a single one of the 20 amino acids.
+        aa_letter = np.where(blank[:, 0], columns[:, 1], columns[:, 0])
+        is_aa = (blank[:, 0] ^ blank[:, 1]) & cls.aa_valid[aa_letter]
+
+        # Structure: the stripped field is neither empty nor the discontinuity marker '!*'.
+        struc_field = columns[:, n_aa_columns:]
+        struc_nonblank = ~blank[:, n_aa_columns:]
+        n_nonblank = struc_nonblank.sum(axis=1)
+        rows = np.arange(len(starts))
+        first = np.argmax(struc_nonblank, axis=1)
+        last = struc_field.shape[1] - 1 - np.argmax(struc_nonblank[:, ::-1], axis=1)
+        is_discontinuity = (
+            (last - first == 1) & (struc_field[rows, first] == ord('!')) & (struc_field[rows, last] == ord('*'))
+        )
+        keep = is_aa & (n_nonblank > 0) & ~is_discontinuity
+        cls.count_lines(aa_letter=aa_letter, is_aa=is_aa, has_structure=n_nonblank > 0,
+                        is_discontinuity=is_discontinuity, keep=keep)
+
+        # Only single-letter structure labels map to a helix or strand; anything else is coil.
+        structure_letter = np.where(n_nonblank == 1, struc_field[rows, first], 0)
+        aa_codes = cls.aa_lookup[aa_letter[keep]]
+        category_codes = cls.category_lookup[structure_letter[keep]]
+        return aa_codes, category_codes, chains[keep]
+
+    @staticmethod
+    def count_lines(aa_letter: np.ndarray, is_aa: np.ndarray, has_structure: np.ndarray,
+                    is_discontinuity: np.ndarray, keep: np.ndarray) -> None:
+        """Counts parsed lines, kept residues and the lines dropped for each StructureTag reason."""
+        is_break = ~is_aa & (aa_letter == ord('!'))
+        Instrumentation.count('dssp_lines', len(keep))
+        Instrumentation.count('residues_kept', np.count_nonzero(keep))
+        dropped = {
+            StructureTag.CHAIN_BREAK: is_break,
+            StructureTag.NO_AA: ~is_aa & ~is_break,
+            StructureTag.NO_STRUCTURE: is_aa & ~has_structure,
+            StructureTag.DISCONTINUITY: is_aa & has_structure & is_discontinuity,
+        }
+        for tag, is_dropped in dropped.items():
+            Instrumentation.count(f'lines_dropped_{tag.name.lower()}', np.count_nonzero(is_dropped))
+
+    @staticmethod
+    def _find_line_starts(data: bytes, prefix: bytes) -> np.ndarray:
+        """Return the offsets of the lines in data that start with prefix."""
+        offsets = []
+        offset = data.find(prefix)
+        while offset >= 0:
+            if offset == 0 or data[offset - 1] == ord('\n'):
+                offsets.append(offset)
+            offset = data.find(prefix, offset + 1)
+        return np.array(offsets, dtype=np.int64)
+
+    @classmethod
+    def get_lookups(cls) -> None:
+        """Set byte-indexed tables that translate amino acid letters and DSSP structure labels into codes."""
+        if cls.aa_lookup is not None:
+            return
+        AminoAcid.get_table()
+        Target.get_table()
+        aa_lookup = np.full(256, AminoAcid.mapping['-'], dtype=np.uint8)
+        aa_valid = np.zeros(256, dtype=bool)
+        for aa in cls.aa_single_letter_abbreviations:
+            aa_lookup[ord(aa)] = AminoAcid.mapping[aa]
+            aa_valid[ord(aa)] = True
+        category_lookup = np.full(256, Target.mapping['c'], dtype=np.uint8)
+        for label, category in cls.structure_label_category_correspondence.items():
+            category_lookup[ord(label)] = Target.mapping[category]
+            category_lookup[ord(label.lower())] = Target.mapping[category]
+        cls.aa_valid = aa_valid
+        cls.category_lookup = category_lookup
+        cls.aa_lookup = aa_lookup
+
+    @classmethod
+    def arrays_to_tuples(cls, aa_codes: np.ndarray, category_codes: np.ndarray) -> list[namedtuple]:
+        """Return a list of (AA, category) tuples for arrays of amino acid and category codes."""
+        amino_acids = {code: aa for aa, code in AminoAcid.mapping.items()}
+        categories = {code: category for category, code in Target.mapping.items()}
+        return [
+            cls.ResidueAndCategory(amino_acid=amino_acids[aa], category=categories[category])
+            for aa, category in zip(aa_codes.tolist(), category_codes.tolist())
+        ]
 
     @classmethod
     def dssp_structure_to_category(cls, structure_label: str) -> str:
@@ -78,9 +346,25 @@ class ReadDSSP:
         else:
             return 'c'
 
-    @staticmethod
-    def get_filename(pdb_id: str) -> str:
-        return os.path.join(Settings.dssp_path, pdb_id) + Settings.dssp_extension
+    @classmethod
+    def get_filename(cls, pdb_id: str) -> str:
+        """Returns the DSSP file of PDB ID, a chain suffix ignored: the plain file in DsspPath if it
+        exists, else the first compressed one (.gz, .bz2, .xz), else a member of the archives in
+        DsspArchives. If there is none, the plain file is returned, to be reported as missing."""
+        name = cls.split_pdb_id(pdb_id=pdb_id)[0] + Settings.dssp_extension
+        filename = os.path.join(Settings.dssp_path, name)
+        names = [name] + [name + suffix for suffix in cls.compressions]
+        for candidate in names:
+            if os.path.isfile(os.path.join(Settings.dssp_path, candidate)):
+                return os.path.join(Settings.dssp_path, candidate)
+        if Settings.dssp_archives:
+            return DsspArchive.find(names=names) or filename
+        return filename
+
+    @classmethod
+    def is_plain(cls, filename: str) -> bool:
+        """Returns whether filename is an uncompressed file that can be read at any offset."""
+        return not DsspArchive.split_reference(filename)[1] and os.path.splitext(filename)[1] not in cls.compressions
 
     @classmethod
     def handle_exceptions(cls, line):
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import logging
+import numpy as np
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+from src.cache import DsspCache
+from src.instrumentation import Instrumentation
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Odd 64-bit constant that spreads k-mer codes over the hash space, so minimizers are not biased towards
+# the amino acids with the lowest codes.
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+class RedundancyFilter:
+    """Removes near-identical chains, such as the chains of homo-oligomers, mutants and repeated structures
+    of the same protein, from a list of PDB IDs. Every chain is sketched by the minimizers of its k-mers:
+    of each window of consecutive k-mers, the one with the smallest hash. Chains are then clustered
+    greedily, longest first: a chain joins the cluster of the representative that shares most of its
+    minimizers if that is at least identity ** kmer_length of them, the fraction of k-mers expected to
+    survive at that sequence identity, and founds a new cluster otherwise; identical chains always join.
+    Representatives are found through an inverted index from minimizers to the representatives that
+    contain them, so the cost grows with the number of chains and not with the number of pairs.
+
+    The non-redundant list names the representative chains with a chain suffix, as in 1abcA, or by the
+    PDB ID alone if the protein has one chain; it can be read like any list of PDB IDs."""
+
+    def __init__(self, identity: float = Settings.redundancy_identity,
+                 kmer_length: int = Settings.redundancy_kmer_length, window: int = Settings.redundancy_window,
+                 read_seq=None, n_workers: int = Settings.workers):
+        if not 1 <= kmer_length <= 8:
+            raise ValueError(f'The k-mer length has to be from 1 to 8, got {kmer_length}')
+        self.identity = identity
+        self.kmer_length = kmer_length
+        self.window = window
+        self.read_seq = read_seq  # source of residue codes, e.g. a PackedCorpus; DSSP files if None
+        self.n_workers = n_workers
+        self.chain_ids: list = []  # chains in the order of the PDB IDs
+        self.representatives: list = []  # chains that are kept, in the same order
+        self.clusters: dict = {}  # representative: chains of its cluster, the representative first
+        self.errors: list = []  # (PDB ID, error) of the proteins that could not be read
+
+    @property
+    def min_shared(self) -> float:
+        """Fraction of the minimizers of a chain that a representative of its cluster has to contain."""
+        return self.identity ** self.kmer_length
+
+    def run(self, pdb_ids: list) -> list:
+        """Returns the representatives of the chains of pdb_ids, in the order of pdb_ids."""
+        with Instrumentation.stage('sketch'):
+            sketches = self.sketch(pdb_ids=pdb_ids)
+        with Instrumentation.stage('cluster'):
+            self.cluster(sketches=sketches)
+        Instrumentation.count('redundant_chains', len(self.chain_ids) - len(self.representatives))
+        logger.info(f'Kept {len(self.representatives)} of {len(self.chain_ids)} chains of {len(pdb_ids)} PDB IDs at '
+                    f'identity {self.identity}; {len(self.errors)} PDB IDs could not be read')
+        return self.representatives
+
+    def sketch(self, pdb_ids: list) -> list:
+        """Returns (chain ID, amino acid codes, minimizers) of every chain of pdb_ids, read in n_workers
+        processes."""
+        pdb_ids = list(dict.fromkeys(pdb_ids))
+        args = [self.read_seq] * len(pdb_ids), [self.kmer_length] * len(pdb_ids), [self.window] * len(pdb_ids)
+        if self.n_workers > 1 and len(pdb_ids) > 1:
+            n_workers = min(self.n_workers, len(pdb_ids))
+            chunksize = max(1, len(pdb_ids) // (n_workers * 4))
+            logger.info(f'Sketching {len(pdb_ids)} PDB IDs with {n_workers} workers')
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = list(executor.map(sketch_protein, pdb_ids, *args, chunksize=chunksize))
+        else:
+            results = list(map(sketch_protein, pdb_ids, *args))
+        sketches, self.errors = [], []
+        for pdb_id, result in zip(pdb_ids, results):
+            if isinstance(result, str):
+                logger.info(f'{result}: skipping {pdb_id} in the redundancy filter')
+                self.errors.append((pdb_id, result))
+                continue
+            sketches.extend(result)
+        return sketches
+
+    def cluster(self, sketches: list) -> None:
+        """Clusters the chains of sketches, as returned by sketch, and sets representatives and clusters."""
+        self.chain_ids = [chain_id for chain_id, _, _ in sketches]
+        order = sorted(range(len(sketches)), key=lambda i: -len(sketches[i][1]))  # stable: ties keep their order
+        sequences: dict = {}  # amino acid codes of a representative: its position in sketches
+        postings: dict = {}  # minimizer: positions in sketches of the representatives that contain it
+        assignment = np.empty(len(sketches), dtype=np.int64)
+        for i in order:
+            _, aa_codes, minimizers = sketches[i]
+            sequence = aa_codes.tobytes()
+            representative = sequences.get(sequence)
+            if representative is None and len(minimizers):
+                shared = Counter()
+                for minimizer in minimizers.tolist():
+                    shared.update(postings.get(minimizer, ()))
+                if shared:
+                    candidate, n_shared = shared.most_common(1)[0]
+                    if n_shared >= self.min_shared * len(minimizers):
+                        representative = candidate
+            if representative is None:
+                representative = sequences[sequence] = i
+                for minimizer in minimizers.tolist():
+                    postings.setdefault(minimizer, []).append(i)
+            assignment[i] = representative
+
+        self.representatives = [self.chain_ids[i] for i in range(len(sketches)) if assignment[i] == i]
+        self.clusters = {chain_id: [chain_id] for chain_id in self.representatives}
+        for i in order:
+            if assignment[i] != i:
+                self.clusters[self.chain_ids[assignment[i]]].append(self.chain_ids[i])
+
+    def write(self, filepath: str) -> None:
+        """Writes the representatives one per line, the format Training.read_pdb_lst reads."""
+        with open(filepath, 'w') as fp:
+            fp.writelines(f'{chain_id}\n' for chain_id in self.representatives)
+        logger.info(f'Wrote {len(self.representatives)} non-redundant chains to {filepath}')
+
+    @staticmethod
+    def get_minimizers(aa_codes: np.ndarray, kmer_length: int, window: int) -> np.ndarray:
+        """Returns the sorted, distinct hashes of the minimizers of a sequence of amino acid codes: the
+        smallest k-mer hash of each window of window consecutive k-mers. A sequence with fewer than window
+        k-mers has one minimizer, none if it is shorter than kmer_length. A k-mer is packed into 64 bits,
+        one byte per code, so kmer_length is at most 8."""
+        if len(aa_codes) < kmer_length:
+            return np.zeros(0, dtype=np.uint64)
+        shifts = (8 * np.arange(kmer_length - 1, -1, -1)).astype(np.uint64)
+        kmers = np.bitwise_or.reduce(sliding_window_view(aa_codes.astype(np.uint64), kmer_length) << shifts, axis=1)
+        hashes = kmers * HASH_MULTIPLIER
+        hashes ^= hashes >> np.uint64(29)
+        if len(hashes) < window:
+            return hashes.min(keepdims=True)
+        return np.unique(sliding_window_view(hashes, window).min(axis=1))
+
+
+def sketch_protein(pdb_id: str, read_seq=None, kmer_length: int = Settings.redundancy_kmer_length,
+                   window: int = Settings.redundancy_window):
+    """Returns (chain ID, amino acid codes, minimizers) of each chain of PDB ID, or the error as a string if
+    the protein cannot be read. Runs in worker processes of RedundancyFilter."""
+    if read_seq is None:
+        read_seq = DsspCache.get_default()
+    try:
+        aa_codes, _, chains = read_seq.read_chain_arrays(pdb_id=pdb_id)
+    except Exception as err:
+        return f'{type(err).__name__}: {err}'
+    aa_codes, chains = np.asarray(aa_codes), np.asarray(chains)
+    base_id = ReadDSSP.split_pdb_id(pdb_id=pdb_id)[0]
+    boundaries = np.flatnonzero(chains[1:] != chains[:-1]) + 1
+    starts, stops = np.concatenate(([0], boundaries)), np.append(boundaries, len(chains))
+    identifiers = [chr(chain) for chain in chains[starts].tolist()] if len(chains) else []
+    # A protein with one chain, or whose chains cannot be named by a suffix, is named by its PDB ID.
+    use_suffix = len(set(identifiers)) > 1 and all(
+        ReadDSSP.split_pdb_id(pdb_id=base_id + identifier) == (base_id, identifier) for identifier in identifiers
+    )
+    sketches = {}
+    for identifier, start, stop in zip(identifiers, starts.tolist(), stops.tolist()):
+        chain_id = base_id + identifier if use_suffix else pdb_id
+        codes = aa_codes[start:stop] if chain_id not in sketches else np.concatenate(
+            (sketches[chain_id], aa_codes[start:stop])
+        )
+        sketches[chain_id] = codes
+    return [
+        (chain_id, np.ascontiguousarray(codes, dtype=np.uint8),
+         RedundancyFilter.get_minimizers(codes, kmer_length=kmer_length, window=window))
+        for chain_id, codes in sketches.items()
+    ]
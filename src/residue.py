@@ -1,34 +1,67 @@
 #!/usr/bin/env python3
 
-import csv
+import typing
 import numpy as np
 import logging
-from sklearn import preprocessing
+from concurrent.futures import ProcessPoolExecutor
 from src.read_dssp import ReadDSSP
+from src.cache import DsspCache
+from src.encoder import WindowEncoder
+from src.instrumentation import Instrumentation
 from src.settings import Settings
+from src.tables import AminoAcid, Target
 
 logger = logging.getLogger(__name__)
 
 class Residue:
-    def __init__(self, pdb_id: str = None, window_length: int = int(Settings.window_length)):
+    encoders: dict = {}
+
+    def __init__(self, pdb_id: str = None, window_length: int = int(Settings.window_length),
+                 feature_format: str = Settings.feature_format, read_seq=None):
         self.pdb_id: str = pdb_id
         self.window_length: int = window_length
+        self.feature_format: str = feature_format
         self.central_aa_pos = int(np.ceil(self.window_length / 2))
-        AminoAcid.get_table()
+        self.encoder = self.get_encoder(window_length=window_length)
         self.amino_acids = AminoAcid.mapping
-        Target.get_table()
         self.targets = Target.mapping
         self.is_setup: bool = False
-        self.read_seq = ReadDSSP
+        # Source of residue codes: the parsed-DSSP cache unless disabled in settings.ini.
+        self.read_seq = read_seq if read_seq is not None else DsspCache.get_default()
+        self.aa_codes: np.ndarray = None
+        self.category_codes: np.ndarray = None
+        self.chains: np.ndarray = None  # chain identifier of each residue; windows do not cross chains
         self.residue_and_structure: list[tuple] = []
         self.residue_count: int = 0
         self.category_frequencies: dict = {target: 0 for target in self.targets.keys()}
-        self.X_data: np.array = None
+        self.X_data = None
         self.Y_data: np.array = None
 
+    @property
+    def residue_and_structure(self) -> list[tuple]:
+        """List of (amino acid, category) tuples; built from the residue codes on first access."""
+        if self._residue_and_structure is None:
+            self._residue_and_structure = ReadDSSP.arrays_to_tuples(
+                aa_codes=self.aa_codes, category_codes=self.category_codes
+            )
+        return self._residue_and_structure
+
+    @residue_and_structure.setter
+    def residue_and_structure(self, residue_and_structure: list[tuple]) -> None:
+        self._residue_and_structure = residue_and_structure
+        self.aa_codes, self.category_codes = self.encoder.encode_sequence(residue_and_structure)
+
     def set_residue_and_structure(self) -> None:
-        self.residue_and_structure = self.read_seq.read(pdb_id=self.pdb_id)
-        self.residue_count = len(self.residue_and_structure)
+        self.set_codes(*self.read_seq.read_chain_arrays(pdb_id=self.pdb_id))
+
+    def set_codes(self, aa_codes: np.ndarray, category_codes: np.ndarray, chains: np.ndarray = None) -> None:
+        """Sets the amino acid and category codes and the chains of the residues, as returned by
+        ReadDSSP.read_chain_arrays."""
+        self.aa_codes = aa_codes
+        self.category_codes = category_codes
+        self.chains = chains
+        self._residue_and_structure = None
+        self.residue_count = len(aa_codes)
         self.is_setup = True
 
     def get_category_frequencies(self) -> None:
@@ -42,56 +75,37 @@ class Residue:
                 self.category_frequencies[category] = 0
 
     def _get_frequency(self, category: str) -> int:
-        count: int = 0
-        for residue in self.residue_and_structure:
-            if residue.category == category:
-                count += 1
-        return count
+        return int(np.count_nonzero(self.category_codes == self.targets[category]))
 
     def get_X_and_Y_arrays(self):
         """This constructs the X array that holds the features. Each row is of window length and
         referred to as a group. The number of groups in X corresponds to the number of residues in the
-        protein, minus the window length."""
+        protein, minus the window length. Group i holds the window of residues starting at
+        i - central_aa_pos and is labeled with the category of residue i; groups without a complete
+        window are all zeros. X is carried in the feature format of the residue."""
         if self.residue_count <= 0:
             return
-        input_group_units = np.array(list(self.amino_acids.keys()))
-        input_group_units_length = input_group_units.shape[0]
-
-        ouput_units = np.array(list(self.targets.keys()))
-
-        self.X_data = np.zeros((self.residue_count - self.window_length, self.window_length * input_group_units_length))
-        self.Y_data = np.zeros((self.residue_count - self.window_length, len(ouput_units)))
-        residue_counter = self.central_aa_pos # 0
-        first_iteration = True
-        while residue_counter < (self.residue_count - self.window_length):
-            start = residue_counter - self.central_aa_pos
-            stop = start + self.window_length
-            unit_index = 0
-            if first_iteration:
-                for idx in range(start, stop):
-                    current_aa = self.residue_and_structure[idx].amino_acid
-                    current_units = self.get_onehot_encoded_label(target_units=input_group_units, label=current_aa)
-
-                    x_start_range = unit_index * input_group_units_length
-                    x_end_range = x_start_range + input_group_units_length
-
-                    self.X_data[residue_counter][x_start_range:x_end_range] = current_units
-                    unit_index += 1
-                    first_iteration = False
-            else:
-                current_aa = self.residue_and_structure[idx].amino_acid
-                current_units = self.get_onehot_encoded_label(target_units=input_group_units, label=current_aa)
-
-                self.X_data[residue_counter] = np.append(
-                    self.X_data[residue_counter-1][input_group_units_length:],
-                    current_units
-                )
-            
-            # Get Y-data:
-            category = self.residue_and_structure[residue_counter].category
-            self.Y_data[residue_counter] = self.get_onehot_encoded_label(target_units=ouput_units, label=category)
-
-            residue_counter += 1
+        with Instrumentation.stage('encode'):
+            X_codes, Y_codes = self.encoder.get_window_codes(
+                aa_codes=self.aa_codes, category_codes=self.category_codes, chains=self.chains
+            )
+        self.set_X_and_Y(X_codes=X_codes, Y_codes=Y_codes)
+
+    def set_X_and_Y(self, X_codes: np.ndarray, Y_codes: np.ndarray) -> None:
+        """Sets X and Y from window codes, as returned by WindowEncoder.get_window_codes."""
+        self.X_data = self.encoder.format_X(X_codes, feature_format=self.feature_format)
+        self.Y_data = self.encoder.format_Y(Y_codes, feature_format=self.feature_format)
+
+    @classmethod
+    def get_encoder(cls, window_length: int = int(Settings.window_length)) -> WindowEncoder:
+        """Returns the encoder for a window length; encoders are shared by all residues of a process."""
+        if window_length not in cls.encoders:
+            AminoAcid.get_table()
+            Target.get_table()
+            cls.encoders[window_length] = WindowEncoder(
+                amino_acids=AminoAcid.mapping, targets=Target.mapping, window_length=window_length
+            )
+        return cls.encoders[window_length]
 
     def _get_numerical_val_for_amino_acid(self, index: int) -> int:
         """Returns numerical value for an amino acid as defined in amino_acids.csv."""
@@ -105,56 +119,96 @@ class Residue:
         return np.where(target_units == label, 1, 0)
 
 
+# Module level, so that worker processes can send it back.
+ResidueError = typing.NamedTuple(
+    'ResidueError', [('pdb_id', str), ('filename', str), ('exception', str), ('message', str)]
+)
+
+
 class ResidueFactory:
-    """Returns a dictionary of Residue instances for a list PDB IDs."""
-    def __init__(self, pdb_id_lst: list = None):
+    """Returns a dictionary of Residue instances for a list PDB IDs. With more than one worker, the
+    DSSP files are parsed and encoded in a process pool; workers send back compact code arrays and
+    the Residue instances are assembled in the calling process. PDB IDs that fail are reported in
+    errors instead of being returned."""
+    ResidueError = ResidueError
+
+    def __init__(self, pdb_id_lst: list = None, feature_format: str = Settings.feature_format, read_seq=None,
+                 n_workers: int = Settings.workers, window_length: int = int(Settings.window_length)):
         self.instance_names: list = pdb_id_lst
+        self.feature_format: str = feature_format
+        self.read_seq = read_seq
+        self.n_workers: int = n_workers
+        self.window_length: int = window_length
+        self.errors: list = []
 
     def construct(self) -> dict:
-        residues: dict = {}
-        for instance_name in self.instance_names:
-            try:
-                residue_instance = Residue(pdb_id=instance_name) 
-                residue_instance.set_residue_and_structure()
-                residue_instance.get_category_frequencies()
-                residue_instance.get_X_and_Y_arrays()
-                residues[instance_name] = residue_instance
-            except:
-                logger.info(f'Error creating residue {instance_name}')
+        return {residue.pdb_id: residue for residue in self.iterate()}
+
+    def iterate(self):
+        """Yields the Residue instances one at a time, in the order of the PDB IDs."""
+        self.errors = []
+        if self.n_workers > 1 and len(self.instance_names) > 1:
+            encoded = self._encode_parallel()
+        else:
+            encoded = (
+                encode_residue(pdb_id=name, read_seq=self.read_seq, window_length=self.window_length)
+                for name in self.instance_names
+            )
+
+        for result in encoded:
+            if isinstance(result, self.ResidueError):
+                logger.info(f'Error creating residue {result.pdb_id} from {result.filename}: '
+                            f'{result.exception}: {result.message}')
+                self.errors.append(result)
                 continue
-
-        return residues
-
-
-class AminoAcid:
-    mapping: dict = {}
-
-    @classmethod
-    def get_table(cls) -> None:
-        with open(Settings.amino_acids, 'r') as csvfile:
-            rows = csv.DictReader(csvfile)
-            for row in rows:
-                cls.mapping[row['Single-letter-abbreviation']] = int(row['Encoding'])
-
-
-class Target:
-    sec_structure: dict = {}
-    mapping: dict = {}
-    encoding: preprocessing.LabelEncoder
-    ohe2label: dict = {
-        (1, 0, 0): 'a',
-        (0, 1, 0): 'b',
-        (0, 0, 1): 'c'
-    }
-
-    @classmethod
-    def get_table(cls) -> None:
-        # Todo: check whether it is advantageous to use sklearn's LabelEncoder here
-        with open(Settings.target, 'r') as csvfile:
-            rows = csv.DictReader(csvfile)
-            for row in rows:
-                cls.sec_structure[row['Structure']] = row['Abbreviation']
-                cls.mapping[row['Abbreviation']] = int(row['Encoding'])
-        cls.encoding = preprocessing.LabelEncoder()
-        cls.encoding.fit(list(cls.mapping.keys()))
-
+            pdb_id, aa_codes, category_codes, X_codes, Y_codes, chains = result
+            residue_instance = Residue(
+                pdb_id=pdb_id, window_length=self.window_length, feature_format=self.feature_format,
+                read_seq=self.read_seq
+            )
+            residue_instance.set_codes(aa_codes=aa_codes, category_codes=category_codes, chains=chains)
+            residue_instance.get_category_frequencies()
+            residue_instance.set_X_and_Y(X_codes=X_codes, Y_codes=Y_codes)
+            yield residue_instance
+        if self.errors:
+            logger.info(f'Could not create {len(self.errors)} of {len(self.instance_names)} residues')
+
+    def _encode_parallel(self):
+        n_workers = min(self.n_workers, len(self.instance_names))
+        chunksize = max(1, len(self.instance_names) // (n_workers * 4))
+        logger.info(f'Encoding {len(self.instance_names)} PDB IDs with {n_workers} workers')
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            for result, snapshot in executor.map(
+                encode_residue_instrumented, self.instance_names, [self.read_seq] * len(self.instance_names),
+                [self.window_length] * len(self.instance_names), chunksize=chunksize
+            ):
+                Instrumentation.merge(snapshot)
+                yield result
+
+
+def encode_residue(pdb_id: str, read_seq=None, window_length: int = int(Settings.window_length)):
+    """Read and encode one PDB ID, or the chains of its chain suffix. Returns (PDB ID, amino acid codes,
+    category codes, X codes, Y codes, chains), or a ResidueFactory.ResidueError if that fails. Runs in
+    worker processes of ResidueFactory."""
+    if read_seq is None:
+        read_seq = DsspCache.get_default()
+    try:
+        aa_codes, category_codes, chains = read_seq.read_chain_arrays(pdb_id=pdb_id)
+        encoder = Residue.get_encoder(window_length=window_length)
+        with Instrumentation.stage('encode'):
+            X_codes, Y_codes = encoder.get_window_codes(aa_codes=aa_codes, category_codes=category_codes,
+                                                        chains=chains)
+    except Exception as err:
+        return ResidueFactory.ResidueError(
+            pdb_id=pdb_id, filename=read_seq.get_filename(pdb_id=pdb_id),
+            exception=type(err).__name__, message=str(err)
+        )
+    return pdb_id, np.asarray(aa_codes), np.asarray(category_codes), X_codes, Y_codes, np.asarray(chains)
+
+
+def encode_residue_instrumented(pdb_id: str, read_seq=None, window_length: int = int(Settings.window_length)):
+    """Like encode_residue, but also returns the Instrumentation record of the call, so that the worker
+    processes of ResidueFactory add their stage times and counters to those of the calling process."""
+    Instrumentation.reset()
+    result = encode_residue(pdb_id=pdb_id, read_seq=read_seq, window_length=window_length)
+    return result, Instrumentation.snapshot()
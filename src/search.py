@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+import time
+import logging
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.inference import InferenceEngine
+from src.instrumentation import Instrumentation
+from src.metrics import StructureMetrics
+from src.residue import Residue, ResidueFactory
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Proteins of the search as (amino acid codes, category codes, chains), and their window codes by window length.
+# Set once per process: in the calling process by HyperparameterSearch, in workers by the pool initializer.
+_dataset: dict = {'proteins': [], 'windows': {}}
+
+
+class HyperparameterSearch:
+    """Grid search over window lengths and network configurations. The proteins are parsed once into
+    amino acid and category codes; the window codes of each candidate window length are derived from
+    these codes, once per process. Every candidate is scored with k-fold cross-validation whose folds
+    are groups of whole proteins, so no protein is in the training and the test set of a fold. The
+    (candidate, fold) fits run in a process pool; the workers receive the codes once, when they start.
+
+    The leaderboard ranks the candidates by their mean Q3 over the folds. The best candidate is then
+    fitted on all proteins and kept in model, ready to be saved as a ModelArtifact."""
+
+    def __init__(self, pdb_lst: list, window_lengths: list = None, hidden_layer_sizes: list = None,
+                 alphas: list = None, n_folds: int = Settings.search_folds, max_iter: int = Settings.search_max_iter,
+                 feature_format: str = Settings.feature_format, read_seq=None, n_workers: int = Settings.workers):
+        self.pdb_lst: list = pdb_lst
+        self.window_lengths: list = window_lengths or Settings.search_window_lengths
+        self.hidden_layer_sizes: list = [tuple(sizes) for sizes in hidden_layer_sizes or Settings.search_hidden_layers]
+        self.alphas: list = alphas or Settings.search_alphas
+        self.n_folds = n_folds
+        self.max_iter = max_iter
+        self.feature_format = feature_format
+        self.read_seq = read_seq
+        self.n_workers = n_workers
+        self.pdb_ids: list = []  # PDB IDs that could be read
+        self.proteins: list = []
+        self.errors: list = []
+        self.results: list = []  # scores of each fit of a candidate on a fold
+        self.leaderboard: list = []
+        self.n_train_groups: int = 0
+        self.model = None
+        self.encoder = None
+
+    def load(self) -> None:
+        """Parses the proteins into amino acid codes, category codes and chains."""
+        factory = ResidueFactory(
+            pdb_id_lst=self.pdb_lst, feature_format='codes', read_seq=self.read_seq, n_workers=self.n_workers
+        )
+        self.pdb_ids, self.proteins = [], []
+        for residue in factory.iterate():
+            self.pdb_ids.append(residue.pdb_id)
+            self.proteins.append((residue.aa_codes, residue.category_codes, residue.chains))
+        self.errors = factory.errors
+        logger.info(f'Loaded {len(self.proteins)} of {len(self.pdb_lst)} proteins for the search')
+
+    def get_candidates(self) -> list[dict]:
+        return [
+            {'window_length': int(window_length), 'hidden_layer_sizes': list(sizes), 'alpha': float(alpha)}
+            for window_length, sizes, alpha in itertools.product(self.window_lengths, self.hidden_layer_sizes,
+                                                                 self.alphas)
+        ]
+
+    def get_folds(self) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Returns the indices of the training and test proteins of each fold. GroupKFold balances the
+        number of residues of the folds."""
+        from sklearn.model_selection import GroupKFold
+        if len(self.proteins) < self.n_folds:
+            raise ValueError(f'{self.n_folds} folds need at least {self.n_folds} proteins; '
+                             f'got {len(self.proteins)}')
+        lengths = [len(protein[0]) for protein in self.proteins]
+        groups = np.repeat(np.arange(len(self.proteins)), lengths)
+        folds = []
+        for train_rows, test_rows in GroupKFold(n_splits=self.n_folds).split(np.zeros(len(groups)), groups=groups):
+            folds.append((np.unique(groups[train_rows]), np.unique(groups[test_rows])))
+        return folds
+
+    def run(self) -> list[dict]:
+        """Cross-validates every candidate, ranks them and fits the best one on all proteins. Returns the
+        leaderboard."""
+        if not self.proteins:
+            self.load()
+        set_dataset(proteins=self.proteins)
+        folds = self.get_folds()
+        tasks = [
+            (candidate_index, fold_index, candidate, train_index, test_index)
+            for candidate_index, candidate in enumerate(self.get_candidates())
+            for fold_index, (train_index, test_index) in enumerate(folds)
+        ]
+        logger.info(f'Searching {len(tasks) // len(folds)} candidates with {len(folds)} folds '
+                    f'on {len(self.proteins)} proteins')
+        self.results = []
+        for result in self._evaluate(tasks=tasks):
+            self.results.append(result)
+            logger.info(f'Candidate {result["candidate"]}, fold {result["fold"] + 1}: Q3 {result["q3"]:.4f}, '
+                        f'SOV {result["sov"]:.2f}, fit in {result["fit_seconds"]:.2f} s')
+        self.leaderboard = self.rank(results=self.results)
+        best = self.leaderboard[0]
+        logger.info(f'Fitting the best candidate {best["candidate"]} on all {len(self.proteins)} proteins')
+        self.model, self.n_train_groups = fit_network(
+            candidate=best['candidate'], protein_index=np.arange(len(self.proteins)),
+            feature_format=self.feature_format, max_iter=self.max_iter
+        )
+        self.encoder = Residue.get_encoder(window_length=best['candidate']['window_length'])
+        return self.leaderboard
+
+    def _evaluate(self, tasks: list):
+        """Yields the result of each task; in a process pool with more than one worker."""
+        if self.n_workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield evaluate_candidate(*task, feature_format=self.feature_format, max_iter=self.max_iter)
+            return
+        n_workers = min(self.n_workers, len(tasks))
+        logger.info(f'Fitting {len(tasks)} networks with {n_workers} workers')
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=set_dataset, initargs=(self.proteins,)) as pool:
+            futures = [
+                pool.submit(evaluate_candidate_instrumented, *task, feature_format=self.feature_format,
+                            max_iter=self.max_iter)
+                for task in tasks
+            ]
+            for future in futures:
+                result, snapshot = future.result()
+                Instrumentation.merge(snapshot)
+                yield result
+
+    @staticmethod
+    def rank(results: list) -> list[dict]:
+        """Returns one entry per candidate with the mean and standard deviation of Q3 over the folds, the
+        mean SOV and the total fit time, best mean Q3 first."""
+        by_candidate: dict = {}
+        for result in results:
+            by_candidate.setdefault(result['candidate_index'], []).append(result)
+        leaderboard = []
+        for fold_results in by_candidate.values():
+            q3 = np.array([result['q3'] for result in fold_results])
+            leaderboard.append({
+                'candidate': fold_results[0]['candidate'],
+                'q3_mean': round(float(q3.mean()), 4),
+                'q3_std': round(float(q3.std()), 4),
+                'sov_mean': round(float(np.mean([result['sov'] for result in fold_results])), 2),
+                'fit_seconds': round(sum(result['fit_seconds'] for result in fold_results), 3),
+                'n_iter_mean': round(float(np.mean([result['n_iter'] for result in fold_results])), 1),
+                'n_folds': len(fold_results),
+            })
+        leaderboard.sort(key=lambda entry: -entry['q3_mean'])
+        for rank, entry in enumerate(leaderboard, start=1):
+            entry['rank'] = rank
+        return leaderboard
+
+    def format_leaderboard(self) -> str:
+        """Returns the leaderboard as a table for the terminal and the log."""
+        lines = [f'{"rank":>4} {"window":>6} {"hidden layers":>14} {"alpha":>8} {"Q3":>7} {"+/-":>7} {"SOV":>6} '
+                 f'{"iter":>6} {"fit [s]":>8}']
+        for entry in self.leaderboard:
+            candidate = entry['candidate']
+            hidden = ','.join(map(str, candidate['hidden_layer_sizes']))
+            lines.append(f'{entry["rank"]:>4} {candidate["window_length"]:>6} {hidden:>14} {candidate["alpha"]:>8.0e} '
+                         f'{entry["q3_mean"]:>7.4f} {entry["q3_std"]:>7.4f} {entry["sov_mean"]:>6.2f} '
+                         f'{entry["n_iter_mean"]:>6.0f} {entry["fit_seconds"]:>8.2f}')
+        return '\n'.join(lines)
+
+    def get_metadata(self) -> dict:
+        """Returns a description of the search that is stored with the best model."""
+        best = self.leaderboard[0]
+        return {
+            'dataset_type': 'search',
+            'feature_format': self.feature_format,
+            'solver': self.model.solver if self.model is not None else None,
+            'n_proteins': len(self.pdb_lst),
+            'n_failed_proteins': len(self.errors),
+            'n_train_groups': int(self.n_train_groups),
+            'search': {'n_folds': self.n_folds, 'max_iter': self.max_iter, 'best': best,
+                       'n_candidates': len(self.leaderboard)},
+        }
+
+
+def set_dataset(proteins: list) -> None:
+    """Sets the proteins the candidates are fitted on; the pool initializer of the search workers."""
+    _dataset['proteins'] = proteins
+    _dataset['windows'] = {}
+
+
+def get_windows(window_length: int) -> tuple[list, list]:
+    """Returns the window codes and one-hot labels of each protein of the dataset for window_length,
+    derived from the residue codes on first use in the process."""
+    if window_length not in _dataset['windows']:
+        encoder = Residue.get_encoder(window_length=window_length)
+        with Instrumentation.stage('encode'):
+            windows = [encoder.get_window_codes(aa_codes=aa_codes, category_codes=category_codes, chains=chains)
+                       for aa_codes, category_codes, chains in _dataset['proteins']]
+        _dataset['windows'][window_length] = (
+            [X_codes for X_codes, _ in windows], [encoder.expand_Y(Y_codes, dtype=np.uint8) for _, Y_codes in windows]
+        )
+    return _dataset['windows'][window_length]
+
+
+def fit_network(candidate: dict, protein_index: np.ndarray, feature_format: str, max_iter: int) -> tuple:
+    """Fits the multi-layer perceptron of candidate on the proteins of protein_index, with the solver
+    and activation of Training.train. Returns the classifier and the number of training groups."""
+    from sklearn.neural_network import MLPClassifier
+    X_codes_lst, Y_data_lst = get_windows(window_length=candidate['window_length'])
+    encoder = Residue.get_encoder(window_length=candidate['window_length'])
+    with Instrumentation.stage('concatenate'):
+        X_train, Y_train = encoder.build_arrays(
+            X_codes_lst=[X_codes_lst[i] for i in protein_index], Y_data_lst=[Y_data_lst[i] for i in protein_index],
+            feature_format=feature_format
+        )
+    classifier = MLPClassifier(
+        solver='lbfgs',
+        alpha=candidate['alpha'],
+        hidden_layer_sizes=tuple(candidate['hidden_layer_sizes']),
+        max_iter=max_iter,
+        activation='relu',
+        random_state=1
+    )
+    with Instrumentation.stage('fit'):
+        classifier.fit(encoder.get_estimator_input(X_train), Y_train)
+    return classifier, X_train.shape[0]
+
+
+def evaluate_candidate(candidate_index: int, fold_index: int, candidate: dict, train_index: np.ndarray,
+                       test_index: np.ndarray, feature_format: str, max_iter: int) -> dict:
+    """Fits candidate on the training proteins of a fold and scores it on the test proteins."""
+    start = time.perf_counter()
+    classifier, n_train_groups = fit_network(
+        candidate=candidate, protein_index=train_index, feature_format=feature_format, max_iter=max_iter
+    )
+    fit_seconds = time.perf_counter() - start
+    X_codes_lst, Y_data_lst = get_windows(window_length=candidate['window_length'])
+    encoder = Residue.get_encoder(window_length=candidate['window_length'])
+    engine = InferenceEngine.from_model(classifier)
+    with Instrumentation.stage('validate'):
+        X_test = np.concatenate([X_codes_lst[i] for i in test_index])
+        Y_test = np.concatenate([Y_data_lst[i] for i in test_index])
+        metrics = StructureMetrics(categories=sorted(encoder.targets, key=encoder.targets.get))
+        metrics.update(Y_true=Y_test, Y_pred=engine.predict(encoder.get_model_input(engine, X_test)),
+                       lengths=[len(X_codes_lst[i]) for i in test_index])
+    return {
+        'candidate_index': candidate_index, 'fold': fold_index, 'candidate': candidate,
+        'q3': metrics.q3, 'sov': metrics.sov, 'fit_seconds': fit_seconds, 'n_iter': int(classifier.n_iter_),
+        'n_train_groups': int(n_train_groups), 'n_test_groups': metrics.n_groups,
+    }
+
+
+def evaluate_candidate_instrumented(*args, **kwargs) -> tuple[dict, dict]:
+    """Like evaluate_candidate, but also returns the Instrumentation record of the call, for workers."""
+    Instrumentation.reset()
+    result = evaluate_candidate(*args, **kwargs)
+    return result, Instrumentation.snapshot()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+import re
+import json
+import queue
+import logging
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.cache import DsspCache
+from src.prediction_cache import PredictionCache
+from src.predict import SequencePredict
+from src.read_dssp import ReadDSSP
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Groups the windows of concurrent requests into one model call. A worker thread takes the first
+    waiting request, collects further requests until max_batch_size windows are queued or max_wait
+    seconds have passed, predicts all of them at once and resolves the future of every request with
+    its own labels."""
+
+    def __init__(self, predictor: SequencePredict, max_batch_size: int = Settings.server_max_batch_size,
+                 max_wait: float = Settings.server_max_wait_ms / 1000):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.n_batches: int = 0
+        self.n_requests: int = 0
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, X_codes: np.ndarray) -> Future:
+        """Queues the windows of one request; the future resolves to their H/E/C string."""
+        future = Future()
+        self.requests.put((X_codes, future))
+        return future
+
+    def predict(self, X_codes: np.ndarray, timeout: float = None) -> str:
+        return self.submit(X_codes=X_codes).result(timeout=timeout)
+
+    def close(self) -> None:
+        self.requests.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            batch, n_rows = [request], len(request[0])
+            deadline = time.monotonic() + self.max_wait
+            while n_rows < self.max_batch_size:
+                try:
+                    request = self.requests.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    self.requests.put(None)
+                    break
+                batch.append(request)
+                n_rows += len(request[0])
+            self._predict_batch(batch=batch)
+
+    def _predict_batch(self, batch: list) -> None:
+        try:
+            structure = self.predictor.predict_labels(X_codes=np.concatenate([X_codes for X_codes, _ in batch]))
+        except Exception as err:
+            for _, future in batch:
+                future.set_exception(err)
+            return
+        self.n_batches += 1
+        self.n_requests += len(batch)
+        start = 0
+        for X_codes, future in batch:
+            future.set_result(structure[start:start + len(X_codes)])
+            start += len(X_codes)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """HTTP server that keeps a model in memory and answers prediction requests. POST /predict takes a
+    JSON object with either a 'sequence' (and optional 'name') or a 'pdb_id' and returns its H/E/C
+    string; for a PDB ID the observed structure and the per-residue Q3 are included. GET /health
+    returns counters of the micro-batcher and the prediction cache. Each request is answered as soon as its
+    batch is predicted; sequences found in the prediction cache are answered without the batcher."""
+    daemon_threads = True
+    # Concurrent clients connect in bursts; the socketserver default of 5 pending connections resets them.
+    request_queue_size = 128
+
+    def __init__(self, model, host: str = Settings.server_host, port: int = Settings.server_port,
+                 max_batch_size: int = Settings.server_max_batch_size,
+                 max_wait: float = Settings.server_max_wait_ms / 1000, read_seq=None,
+                 window_length: int = int(Settings.window_length), cache: PredictionCache = None):
+        self.predictor = SequencePredict(model=model, window_length=window_length, cache=cache)
+        self.batcher = MicroBatcher(predictor=self.predictor, max_batch_size=max_batch_size, max_wait=max_wait)
+        self.read_seq = read_seq
+        super().__init__((host, port), PredictionRequestHandler)
+
+    def predict_sequence(self, sequence: str) -> str:
+        encoder = self.predictor.encoder
+        aa_codes = encoder.encode_labels(sequence.upper(), encoder.input_lookup)
+        return self.predict_codes(aa_codes=aa_codes)
+
+    def predict_codes(self, aa_codes: np.ndarray, chains: np.ndarray = None) -> str:
+        """Returns the H/E/C string of amino acid codes from the prediction cache, or predicts it through
+        the micro-batcher and caches it."""
+        cache = self.predictor.cache
+        key = self.predictor.get_key(aa_codes=aa_codes, chains=chains) if cache is not None else None
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            return cached.tobytes().decode('ascii')
+        structure = self.batcher.predict(
+            X_codes=self.predictor.encoder.get_residue_window_codes(aa_codes, chains=chains)
+        )
+        if key is not None:
+            cache.put(key, np.frombuffer(structure.encode('ascii'), dtype=np.uint8))
+        return structure
+
+    def predict_pdb_id(self, pdb_id: str) -> dict:
+        read_seq = self.read_seq if self.read_seq is not None else DsspCache.get_default()
+        aa_codes, category_codes, chains = read_seq.read_chain_arrays(pdb_id=pdb_id)
+        structure = self.predict_codes(aa_codes=np.asarray(aa_codes), chains=np.asarray(chains))
+        observed = self.predictor.label_lookup[np.asarray(category_codes)].tobytes().decode('ascii')
+        n_correct = sum(predicted == label for predicted, label in zip(structure, observed))
+        return {
+            'pdb_id': pdb_id, 'structure': structure, 'observed': observed,
+            'q3': round(n_correct / len(observed), 4) if observed else None
+        }
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.batcher.close()
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    server: PredictionServer
+    # A PDB ID with an optional chain suffix; anything else, such as a path, is rejected before a file is opened.
+    pdb_id_pattern = re.compile(r'[0-9][A-Za-z0-9]{3}[A-Za-z0-9]*')
+
+    def do_GET(self) -> None:
+        if self.path != '/health':
+            self._send_json(status=404, body={'error': f'unknown path {self.path}'})
+            return
+        batcher = self.server.batcher
+        cache = self.server.predictor.cache
+        self._send_json(status=200, body={
+            'status': 'ok', 'requests': batcher.n_requests, 'batches': batcher.n_batches,
+            'window_length': self.server.predictor.encoder.window_length,
+            'prediction_cache': cache.get_stats() if cache is not None else None
+        })
+
+    def do_POST(self) -> None:
+        if self.path != '/predict':
+            self._send_json(status=404, body={'error': f'unknown path {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            if 'sequence' in request:
+                body = {
+                    'name': request.get('name', ''),
+                    'structure': self.server.predict_sequence(sequence=request['sequence'])
+                }
+            elif 'pdb_id' in request:
+                body = self.server.predict_pdb_id(pdb_id=self.get_pdb_id(request['pdb_id']))
+            else:
+                raise ValueError("request needs a 'sequence' or a 'pdb_id'")
+        except FileNotFoundError as err:
+            self._send_json(status=404, body={'error': str(err)})
+            return
+        except (ValueError, TypeError, AttributeError, UnicodeError) as err:
+            self._send_json(status=400, body={'error': str(err)})
+            return
+        except OSError as err:
+            logger.info(f'{err.__repr__()}: could not answer {self.path}')
+            self._send_json(status=500, body={'error': f'cannot read the structure: {type(err).__name__}'})
+            return
+        self._send_json(status=200, body=body)
+
+    def get_pdb_id(self, pdb_id) -> str:
+        """Returns the normalized PDB ID of a request; raises ValueError if it is not a PDB ID with an
+        optional chain suffix."""
+        pdb_id = ReadDSSP.normalize_pdb_id(str(pdb_id))
+        if self.pdb_id_pattern.fullmatch(pdb_id) is None:
+            raise ValueError(f'{pdb_id[:20]!r} is not a PDB ID')
+        return pdb_id
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f'{self.address_string()} {format % args}')
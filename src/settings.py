@@ -1,19 +1,121 @@
 #!/usr/bin/env python3
 
+import os
 import configparser
 
 
-config = configparser.ConfigParser()
-config.read('settings.ini')
+def find_settings_file(filename: str = 'settings.ini') -> str:
+    """Returns settings.ini of the working directory if there is one, else the one of the repository, so
+    the scripts can be run from any directory."""
+    repository_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for directory in (os.getcwd(), repository_dir):
+        filepath = os.path.join(directory, filename)
+        if os.path.isfile(filepath):
+            return filepath
+    return os.path.join(repository_dir, filename)
 
 
-class Settings:
-    """Static class to read settings.ini"""
-    config = config
-    dssp_path = config.get(section='PATHS', option='DsspPath')
-    model_path = config.get(section='PATHS', option='ModelPath')
-    dssp_extension = config.get(section='PATHS', option='DsspExtension')
-    amino_acids = config.get(section='PATHS', option='AminoAcidTable')
-    target = config.get(section='LABELS', option='Target')
-    q_s_tab1 = config.get(section='TRAINING', option='Q_S_1') # table 1 from Qian & Sejnowsky, 1988
-    window_length = config.get(section='TRAINING', option='WindowLength')
+def get_path(config: configparser.ConfigParser, settings_file: str, section: str, option: str,
+             fallback: str = None) -> str:
+    """Returns a path of settings.ini; relative paths are relative to the directory of settings.ini."""
+    path = config.get(section=section, option=option, fallback=fallback)
+    if path is None or os.path.isabs(path):
+        return path
+    return os.path.normpath(os.path.join(os.path.dirname(settings_file), path))
+
+
+def get_paths(config: configparser.ConfigParser, settings_file: str, section: str, option: str) -> list:
+    """Returns a list of paths of settings.ini, separated by commas or newlines, resolved like get_path."""
+    value = config.get(section=section, option=option, fallback='')
+    paths = [path.strip() for line in value.splitlines() for path in line.split(',') if path.strip()]
+    return [path if os.path.isabs(path) else os.path.normpath(os.path.join(os.path.dirname(settings_file), path))
+            for path in paths]
+
+
+def read_settings(settings_file: str) -> dict:
+    """Returns the settings of the file settings_file by their attribute name of Settings."""
+    config = configparser.ConfigParser()
+    config.read(settings_file)
+
+    def path(section: str, option: str, fallback: str = None) -> str:
+        return get_path(config=config, settings_file=settings_file, section=section, option=option, fallback=fallback)
+
+    model_path = path(section='PATHS', option='ModelPath')
+    return {
+        'config': config,
+        'settings_file': settings_file,
+        'dssp_path': path(section='PATHS', option='DsspPath'),
+        'model_path': model_path,
+        'dssp_extension': config.get(section='PATHS', option='DsspExtension'),
+        'dssp_archives': get_paths(config=config, settings_file=settings_file, section='PATHS', option='DsspArchives'),
+        'manifest_path': path(section='PATHS', option='ManifestPath',
+                              fallback=os.path.join(model_path, 'manifest.npz')),
+        'amino_acids': path(section='PATHS', option='AminoAcidTable'),
+        'target': path(section='LABELS', option='Target'),
+        'q_s_tab1': path(section='TRAINING', option='Q_S_1'),  # table 1 from Qian & Sejnowsky, 1988
+        'window_length': config.get(section='TRAINING', option='WindowLength'),
+        'feature_format': config.get(section='TRAINING', option='FeatureFormat', fallback='dense'),
+        'workers': config.getint(section='TRAINING', option='Workers', fallback=1),
+        'epochs': config.getint(section='TRAINING', option='Epochs', fallback=10),
+        'batch_size': config.getint(section='TRAINING', option='BatchSize', fallback=1024),
+        'shuffle_buffer': config.getint(section='TRAINING', option='ShuffleBuffer', fallback=64),
+        'search_window_lengths': [
+            int(length)
+            for length in config.get(section='SEARCH', option='WindowLengths', fallback='9,13,17').split(',')
+        ],
+        'search_hidden_layers': [
+            [int(size) for size in sizes.split(',')]
+            for sizes in config.get(section='SEARCH', option='HiddenLayerSizes', fallback='5,3 10 20,10').split()
+        ],
+        'search_alphas': [
+            float(alpha) for alpha in config.get(section='SEARCH', option='Alphas', fallback='1e-5,1e-3').split(',')
+        ],
+        'search_folds': config.getint(section='SEARCH', option='Folds', fallback=3),
+        'search_max_iter': config.getint(section='SEARCH', option='MaxIter', fallback=500),
+        'redundancy_identity': config.getfloat(section='REDUNDANCY', option='Identity', fallback=0.9),
+        'redundancy_kmer_length': config.getint(section='REDUNDANCY', option='KmerLength', fallback=5),
+        'redundancy_window': config.getint(section='REDUNDANCY', option='Window', fallback=5),
+        'predict_batch_size': config.getint(section='PREDICTION', option='BatchSize', fallback=65536),
+        'inference_chunk_size': config.getint(section='PREDICTION', option='ChunkSize', fallback=4096),
+        'server_host': config.get(section='SERVER', option='Host', fallback='127.0.0.1'),
+        'server_port': config.getint(section='SERVER', option='Port', fallback=8000),
+        'server_max_batch_size': config.getint(section='SERVER', option='MaxBatchSize', fallback=8192),
+        'server_max_wait_ms': config.getfloat(section='SERVER', option='MaxWaitMs', fallback=2),
+        'prediction_cache_enabled': config.getboolean(section='PREDICTION_CACHE', option='Enabled', fallback=True),
+        'prediction_cache_memory_megabytes': config.getfloat(section='PREDICTION_CACHE', option='MemoryMegabytes',
+                                                             fallback=64),
+        # An empty DiskPath keeps the cache in memory only.
+        'prediction_cache_path': path(section='PREDICTION_CACHE', option='DiskPath', fallback='')
+        if config.get(section='PREDICTION_CACHE', option='DiskPath', fallback='') else '',
+        'prediction_cache_disk_max_megabytes': config.getfloat(section='PREDICTION_CACHE', option='DiskMaxMegabytes',
+                                                               fallback=256),
+        'cache_enabled': config.getboolean(section='CACHE', option='Enabled', fallback=True),
+        'cache_path': path(section='CACHE', option='CachePath', fallback=os.path.join(model_path, 'cache')),
+        'cache_max_megabytes': config.getfloat(section='CACHE', option='MaxMegabytes', fallback=1024),
+    }
+
+
+class LazySettings(type):
+    """Metaclass of Settings that reads settings.ini on the first access of a setting that is not set yet,
+    instead of when the module is imported."""
+
+    def __getattr__(cls, name: str):
+        if name.startswith('__') or cls.is_loaded:
+            raise AttributeError(f"type object '{cls.__name__}' has no attribute '{name}'")
+        cls.load()
+        return getattr(cls, name)
+
+
+class Settings(metaclass=LazySettings):
+    """Static class to read settings.ini. The file is found and parsed on the first access of a setting,
+    e.g. Settings.dssp_path; see read_settings for the settings."""
+    is_loaded: bool = False
+
+    @classmethod
+    def load(cls, settings_file: str = None) -> None:
+        """Reads settings_file, or settings.ini as found by find_settings_file. Settings that have been
+        assigned before, e.g. by a test or a benchmark, are kept."""
+        for name, value in read_settings(settings_file=settings_file or find_settings_file()).items():
+            if name not in cls.__dict__:
+                setattr(cls, name, value)
+        cls.is_loaded = True
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import csv
+from src.settings import Settings
+
+
+class LazyLabelEncoder:
+    """Class attribute that holds a LabelEncoder fitted on the keys of the mapping of its class. It is
+    built on first access, so reading the tables does not import scikit-learn."""
+
+    def __get__(self, instance, owner):
+        if owner._encoding is None:
+            from sklearn import preprocessing
+            if not owner.mapping:
+                owner.get_table()
+            owner._encoding = preprocessing.LabelEncoder()
+            owner._encoding.fit(list(owner.mapping.keys()))
+        return owner._encoding
+
+
+class AminoAcid:
+    mapping: dict = {}
+    _loaded_from: str = None
+
+    @classmethod
+    def get_table(cls) -> None:
+        """Reads the table once per process; later calls return at once unless AminoAcidTable changed."""
+        if cls._loaded_from == Settings.amino_acids:
+            return
+        with open(Settings.amino_acids, 'r') as csvfile:
+            rows = csv.DictReader(csvfile)
+            for row in rows:
+                cls.mapping[row['Single-letter-abbreviation']] = int(row['Encoding'])
+        cls._loaded_from = Settings.amino_acids
+
+
+class Target:
+    sec_structure: dict = {}
+    mapping: dict = {}
+    encoding = LazyLabelEncoder()
+    _encoding = None
+    _loaded_from: str = None
+    ohe2label: dict = {
+        (1, 0, 0): 'a',
+        (0, 1, 0): 'b',
+        (0, 0, 1): 'c'
+    }
+
+    @classmethod
+    def get_table(cls) -> None:
+        """Reads the table once per process; later calls return at once unless Target changed."""
+        # Todo: check whether it is advantageous to use sklearn's LabelEncoder here
+        if cls._loaded_from == Settings.target:
+            return
+        with open(Settings.target, 'r') as csvfile:
+            rows = csv.DictReader(csvfile)
+            for row in rows:
+                cls.sec_structure[row['Structure']] = row['Abbreviation']
+                cls.mapping[row['Abbreviation']] = int(row['Encoding'])
+        cls._loaded_from = Settings.target
+        cls._encoding = None
@@ -2,90 +2,305 @@
 
 import numpy as np
 import logging
-from sklearn.neural_network import MLPClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-from sklearn.metrics import multilabel_confusion_matrix
-from src.residue import ResidueFactory
+from src.residue import Residue, ResidueFactory
 from src.settings import Settings
 from src.residue import Target
+from src.encoder import WindowEncoder
+from src.inference import InferenceEngine
+from src.instrumentation import Instrumentation
+from src.metrics import StructureMetrics
 
 
 logger = logging.getLogger(__name__)
 
 
 class Training:
-    def __init__(self, dataset_type: str = 'q_s_tab1'):
+    def __init__(self, dataset_type: str = 'q_s_tab1', feature_format: str = Settings.feature_format, read_seq=None,
+                 n_workers: int = Settings.workers):
         self.dataset_type = dataset_type
-        self.X_data: np.ndarray = None
+        self.feature_format = feature_format
+        self.read_seq = read_seq  # source of residue codes, e.g. a PackedCorpus; DSSP files if None
+        self.n_workers = n_workers
+        self.errors: list = []
+        self.encoder: WindowEncoder = self.get_encoder()
+        self.X_data = None
         self.Y_data: np.ndarray = None
         self.pdb_lst: list = []
         self.classifier = None
         self.model = None
         self.n_hidden_units = 5
         self.n_hidden_layers = 3
+        self.max_iter = 2000  # iterations of the lbfgs solver in train()
         self.split_test_frac = 0.25  # fraction of data to be used for testing
-        self.X_train: np.ndarray = None
-        self.X_test: np.ndarray = None
+        self.X_train = None
+        self.X_test = None
         self.Y_train: np.ndarray = None
         self.Y_test: np.ndarray = None
+        self.n_epochs = Settings.epochs
+        self.batch_size = Settings.batch_size
+        self.shuffle_buffer = Settings.shuffle_buffer  # number of proteins whose groups are shuffled together
+        self.train_pdb_lst: list = []
+        self.test_pdb_lst: list = []
+        self.validation_scores: list = []
+        self.validation_report: dict = {}
+        self.n_train_groups: int = 0
+        self.parent = None  # ModelArtifact whose network train_continued continues
 
     def preprocess(self):
         """Fetch PDB IDs of the files to use in training. Load the DSSP data from each file,
-        process it, and append to data array."""
-        factory = ResidueFactory(pdb_id_lst=self.pdb_lst)
+        process it, and append to data array. Features are kept in the feature format of the training.
+        Proteins are first encoded as compact window codes; the data arrays are then allocated once
+        for all proteins and filled in place."""
+        factory = self.get_factory()
         data: dict = factory.construct()
+        self.errors = factory.errors
         logger.info(f'Preprocessing {len(data)} DSSP files...')
-        first = True
-        for obj in data.values():
-            if first:
-                self.X_data = obj.X_data
-                self.Y_data = obj.Y_data
-                first = False
-            else:
-                self.X_data = np.concatenate((self.X_data, obj.X_data))
-                self.Y_data = np.concatenate((self.Y_data, obj.Y_data))
+        if not data:
+            return
+        with Instrumentation.stage('concatenate'):
+            self.X_data, self.Y_data = self.encoder.build_arrays(
+                X_codes_lst=[obj.X_data for obj in data.values()],
+                Y_data_lst=[obj.Y_data for obj in data.values()],
+                feature_format=self.feature_format
+            )
+
+    def iter_chunks(self, chunk_size: int = None):
+        """Yields (X, Y) in the feature format of the training without building the whole data set.
+        Without a chunk size every chunk holds one protein, otherwise chunk_size groups (the last chunk
+        may be smaller)."""
+        factory = self.get_factory()
+        buffered_X, buffered_Y, n_buffered = [], [], 0
+        for residue in factory.iterate():
+            if chunk_size is None:
+                yield self.encoder.build_arrays([residue.X_data], [residue.Y_data], feature_format=self.feature_format)
+                continue
+            buffered_X.append(residue.X_data)
+            buffered_Y.append(residue.Y_data)
+            n_buffered += len(residue.X_data)
+            if n_buffered < chunk_size:
+                continue
+            X_codes, Y_data = np.concatenate(buffered_X), np.concatenate(buffered_Y)
+            n_full = n_buffered - n_buffered % chunk_size
+            for start in range(0, n_full, chunk_size):
+                stop = start + chunk_size
+                yield self.encoder.build_arrays(
+                    [X_codes[start:stop]], [Y_data[start:stop]], feature_format=self.feature_format
+                )
+            buffered_X, buffered_Y, n_buffered = [X_codes[n_full:]], [Y_data[n_full:]], n_buffered - n_full
+        if n_buffered:
+            yield self.encoder.build_arrays(buffered_X, buffered_Y, feature_format=self.feature_format)
+        self.errors = factory.errors
+
+    def get_factory(self, pdb_lst: list = None) -> ResidueFactory:
+        """Returns a factory that encodes the proteins of the training (or pdb_lst) as window codes."""
+        return ResidueFactory(
+            pdb_id_lst=self.pdb_lst if pdb_lst is None else pdb_lst, feature_format='codes',
+            read_seq=self.read_seq, n_workers=self.n_workers, window_length=self.encoder.window_length
+        )
 
     def train(self):
+        # scikit-learn is imported by the methods that use it, so reading PDB lists stays cheap.
+        from sklearn.neural_network import MLPClassifier
         logger.info(f'Training multi-layer perceptron with {self.n_hidden_layers}')
         self.classifier = MLPClassifier(
             solver='lbfgs',
             alpha=1e-5,
             hidden_layer_sizes=(self.n_hidden_units, self.n_hidden_layers),
-            max_iter=2000,
+            max_iter=self.max_iter,
             activation='relu',
             random_state=1,
             warm_start=True
         )
-        self.get_split_data()
-        self.model = self.classifier.fit(self.X_train, self.Y_train)
+        with Instrumentation.stage('split'):
+            self.get_split_data()
+        self.n_train_groups = self.X_train.shape[0]
+        with Instrumentation.stage('fit'):
+            self.model = self.classifier.fit(self.encoder.get_estimator_input(self.X_train), self.Y_train)
+        logger.info(f'Model: {self.model.__repr__()}')
+
+    def train_streaming(self):
+        """Train the multi-layer perceptron incrementally on shuffled minibatches, for data sets that do
+        not fit into memory. Proteins are split into a training and a held-out set; each epoch visits
+        the training proteins in random order, shuffle_buffer proteins at a time, and updates the
+        network with partial_fit on minibatches of batch_size groups. After each epoch the held-out
+        proteins are streamed through the network for validation. Memory use is bounded by the window
+        codes of shuffle_buffer proteins plus one expanded minibatch."""
+        from sklearn.neural_network import MLPClassifier
+        from sklearn.model_selection import train_test_split
+        logger.info(f'Streaming training of multi-layer perceptron for {self.n_epochs} epochs')
+        self.train_pdb_lst, self.test_pdb_lst = train_test_split(
+            self.pdb_lst, test_size=self.split_test_frac, random_state=1
+        )
+        self.classifier = MLPClassifier(
+            solver='adam',
+            alpha=1e-5,
+            hidden_layer_sizes=(self.n_hidden_units, self.n_hidden_layers),
+            activation='relu',
+            random_state=1
+        )
+        classes = np.arange(self.encoder.n_output_units)
+        rng = np.random.default_rng(1)
+        self.validation_scores = []
+        for epoch in range(self.n_epochs):
+            n_groups = 0
+            for X_codes, Y_batch in self.iter_minibatches(pdb_lst=self.train_pdb_lst, rng=rng):
+                X_batch = self.encoder.format_X(X_codes, feature_format=self.feature_format)
+                with Instrumentation.stage('fit'):
+                    self.classifier.partial_fit(self.encoder.get_estimator_input(X_batch), Y_batch, classes=classes)
+                n_groups += len(X_codes)
+            self.model = self.classifier
+            self.n_train_groups = n_groups
+            with Instrumentation.stage('validate'):
+                score = self.validate_streaming(pdb_lst=self.test_pdb_lst)
+            self.validation_scores.append(score)
+            logger.info(f'Epoch {epoch + 1}/{self.n_epochs}: trained on {n_groups} groups, '
+                        f'loss {self.classifier.loss_:.4f}, held-out accuracy {score:.4f}')
+        logger.info(f'Model: {self.model.__repr__()}')
+
+    def train_continued(self, artifact) -> bool:
+        """Continue training the network of a ModelArtifact on the proteins of pdb_lst that are not in its
+        training set; pdb_lst is reduced to those. They are encoded once, with parsed DSSP files from the
+        cache or corpus, and split into training and held-out proteins as in train_streaming(), so no
+        chain has windows on both sides; a single new protein is trained on without validation. The
+        network is updated with partial_fit on shuffled minibatches for n_epochs, so the cost depends on
+        the number of new proteins only. Returns False if no new protein could be encoded."""
+        from sklearn.model_selection import train_test_split
+        self.parent = artifact
+        if artifact.pdb_ids is None:
+            logger.info('The model does not record the proteins it was trained on; all proteins are new')
+        known = set(artifact.pdb_ids or [])
+        self.pdb_lst = [pdb_id for pdb_id in dict.fromkeys(self.pdb_lst) if pdb_id not in known]
+        logger.info(f'Continuing version {artifact.version} of the model on {len(self.pdb_lst)} new proteins')
+        if not self.pdb_lst:
+            return False
+        self.encoder = self.get_encoder(window_length=artifact.window_length)
+        factory = self.get_factory()
+        residues = list(factory.iterate())
+        self.errors = factory.errors
+        if not residues:
+            return False
+        with Instrumentation.stage('split'):
+            if len(residues) > 1:
+                train_residues, test_residues = train_test_split(
+                    residues, test_size=self.split_test_frac, random_state=1
+                )
+            else:
+                logger.info(f'{residues[0].pdb_id} is the only new protein; none is held out for validation')
+                train_residues, test_residues = residues, []
+            self.train_pdb_lst = [residue.pdb_id for residue in train_residues]
+            self.test_pdb_lst = [residue.pdb_id for residue in test_residues]
+        with Instrumentation.stage('concatenate'):
+            X_train, Y_train = self.encoder.build_arrays(
+                [residue.X_data for residue in train_residues], [residue.Y_data for residue in train_residues],
+                feature_format='codes'
+            )
+            X_test, self.Y_test = self.encoder.build_arrays(
+                [residue.X_data for residue in test_residues], [residue.Y_data for residue in test_residues],
+                feature_format='codes'
+            )
+            self.X_test = self.encoder.format_X(X_test, feature_format=self.feature_format)
+        self.n_train_groups = len(X_train)
+
+        self.classifier = artifact.to_classifier(solver='adam', alpha=1e-5, random_state=1)
+        classes = np.arange(self.encoder.n_output_units)
+        rng = np.random.default_rng(1)
+        for epoch in range(self.n_epochs):
+            order = rng.permutation(len(X_train))
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                X_batch = self.encoder.format_X(X_train[batch], feature_format=self.feature_format)
+                with Instrumentation.stage('fit'):
+                    self.classifier.partial_fit(self.encoder.get_estimator_input(X_batch), Y_train[batch],
+                                                classes=classes)
+            logger.info(f'Epoch {epoch + 1}/{self.n_epochs}: loss {self.classifier.loss_:.4f}')
+        self.model = self.classifier
         logger.info(f'Model: {self.model.__repr__()}')
+        return True
+
+    def iter_minibatches(self, pdb_lst: list, rng: np.random.Generator):
+        """Yields shuffled minibatches of (window codes, one-hot labels) from the proteins of pdb_lst."""
+        pdb_lst = [pdb_lst[i] for i in rng.permutation(len(pdb_lst))]
+        for first in range(0, len(pdb_lst), self.shuffle_buffer):
+            residues = list(self.get_factory(pdb_lst=pdb_lst[first:first + self.shuffle_buffer]).iterate())
+            if not residues:
+                continue
+            X_codes = np.concatenate([residue.X_data for residue in residues])
+            Y_data = np.concatenate([residue.Y_data for residue in residues])
+            order = rng.permutation(len(X_codes))
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                yield X_codes[batch], Y_data[batch]
+
+    def validate_streaming(self, pdb_lst: list) -> float:
+        """Returns Q3 of the proteins in pdb_lst, predicting one protein at a time from its window codes
+        with the inference engine. The full metrics are kept in validation_report."""
+        engine = InferenceEngine.from_model(self.model)
+        metrics = self.get_metrics()
+        for residue in self.get_factory(pdb_lst=pdb_lst).iterate():
+            if len(residue.X_data) == 0:
+                continue
+            predictions = engine.predict(self.encoder.get_model_input(engine, residue.X_data))
+            metrics.update(Y_true=residue.Y_data, Y_pred=predictions)
+        self.validation_report = metrics.get_report()
+        return metrics.q3
+
+    def validate_model(self) -> StructureMetrics:
+        """Prints and logs the metrics of the network on the test split. The split of train() is made of
+        shuffled groups of all proteins, so only group-level metrics are reported: Q3, per-class precision,
+        recall and F1 and the confusion matrix, but neither SOV nor a number of proteins. Returns None if
+        the test split is empty."""
+        if self.X_test is None or self.X_test.shape[0] == 0:
+            logger.info('No test split to validate the model on')
+            return None
+        with Instrumentation.stage('validate'):
+            engine = InferenceEngine.from_model(self.model)
+            predictions = engine.predict(self.encoder.get_model_input(engine, self.X_test))
+            metrics = self.get_metrics()
+            metrics.update(Y_true=self.Y_test, Y_pred=predictions)
+        self.validation_report = metrics.get_report(segments=False)
+        report = metrics.format_report(segments=False)
+        logger.info(f'Validation:\n{report}')
+        print(report)
+        return metrics
+
+    def get_metrics(self) -> StructureMetrics:
+        return StructureMetrics(categories=sorted(self.encoder.targets, key=self.encoder.targets.get))
 
-    def validate_model(self):
-        predictions = self.model.predict(self.X_test)
-        predictions, bugs = self.decode_onehot(classifications=predictions)
-        y_test = np.delete(self.Y_test, bugs, 0)
-        ground_truth, bugs = self.decode_onehot(classifications=y_test)
-        logger.info(f'{classification_report(ground_truth, predictions)}')
-        print(classification_report(ground_truth, predictions))
-        confusion_matrix = multilabel_confusion_matrix(ground_truth, predictions)
-        print('CONFUSION MATRICES')
-        print('Alpha helix:')
-        self.print_cm(confusion_matrix[:][0], labels=['Y', 'N'])
-        print('Beta sheet:')
-        self.print_cm(confusion_matrix[:][1], labels=['Y', 'N'])
-        print('Coil:')
-        self.print_cm(confusion_matrix[:][2], labels=['Y', 'N'])
-
-
-    def get_pdb_lst(self):
-        filepath = Settings.q_s_tab1
+
+    def get_metadata(self) -> dict:
+        """Returns a description of the training data and procedure that is stored with the model."""
+        return {
+            'dataset_type': self.dataset_type,
+            'feature_format': self.feature_format,
+            'solver': self.model.solver if self.model is not None else None,
+            'n_proteins': len(self.pdb_lst),
+            'n_failed_proteins': len(self.errors),
+            'n_train_groups': self.n_train_groups,
+            'n_test_proteins': len(self.test_pdb_lst),
+            'validation_scores': [float(score) for score in self.validation_scores],
+            'validation': self.validation_report,
+            'continued_from_version': self.parent.version if self.parent is not None else None,
+        }
+
+    def get_trained_pdb_lst(self) -> list:
+        """Returns the proteins the network was trained on: those of the training that could be encoded,
+        without the held-out proteins of streaming training."""
+        failed = {error.pdb_id for error in self.errors}
+        return [pdb_id for pdb_id in dict.fromkeys(self.train_pdb_lst or self.pdb_lst) if pdb_id not in failed]
+
+    def get_pdb_lst(self, filepath: str = None):
+        if filepath is None:
+            filepath = Settings.q_s_tab1
+        self.pdb_lst.extend(self.read_pdb_lst(filepath=filepath))
+
+    @staticmethod
+    def read_pdb_lst(filepath: str) -> list:
+        """Returns the PDB IDs in a file with one PDB ID per line."""
         with open(file=filepath, mode='r') as fp:
-            for line in fp.readlines():
-                line = line.strip('\n')
-                self.pdb_lst.append(line)
+            return [line.strip() for line in fp.readlines() if line.strip()]
 
     def get_classifier(self):
+        from sklearn.neural_network import MLPClassifier
         self.classifier = MLPClassifier(
             solver='lbfgs',
             alpha=1e-5,
@@ -96,7 +311,12 @@ class Training:
             warm_start=True
         )
 
+    @staticmethod
+    def get_encoder(window_length: int = int(Settings.window_length)) -> WindowEncoder:
+        return Residue.get_encoder(window_length=window_length)
+
     def get_split_data(self) -> None:
+        from sklearn.model_selection import train_test_split
         self.X_train, self.X_test, self.Y_train, self.Y_test = train_test_split(
             self.X_data,
             self.Y_data,
@@ -105,17 +325,12 @@ class Training:
         )
 
     def decode_onehot(self, classifications: np.ndarray) -> tuple[list, list]:
-        """Returns a list of character labels from encoded labels."""
-        out: list = []
-        bugs: list = []
-        # ToDo: there's a bug where tuple(classification) == (0, 0, 0) - use conditional breakpoint to verify
-        for i, classification in enumerate(classifications):
-            try:
-                out.append(Target.ohe2label[tuple(classification)])
-            except KeyError:
-                bugs.append(i)
-
-        return out, bugs
+        """Returns a list of character labels from encoded labels, and the indices of the rows that are
+        not exactly one class, such as the all-zero rows the network predicts when no output exceeds 0.5."""
+        labels = np.array([Target.ohe2label[key] for key in sorted(Target.ohe2label, reverse=True)])
+        classes = StructureMetrics.to_classes(classifications)
+        is_class = classes < len(labels)
+        return labels[classes[is_class]].tolist(), np.flatnonzero(~is_class).tolist()
 
 
     # Taken from: https://gist.github.com/zachguo/10296432
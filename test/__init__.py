@@ -0,0 +1,23 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+from src.settings import Settings
+
+
+class TemporaryDsspCache:
+    """Points the parsed-DSSP cache at a temporary directory for the tests of a module, so running the
+    tests leaves no entries in the CachePath of settings.ini. Use as setUpModule = cache.start and
+    tearDownModule = cache.stop."""
+
+    def __init__(self):
+        self.cache_path: str = None
+        self.patcher = None
+
+    def start(self) -> None:
+        self.cache_path = tempfile.mkdtemp()
+        self.patcher = patch.object(Settings, 'cache_path', new=self.cache_path)
+        self.patcher.start()
+
+    def stop(self) -> None:
+        self.patcher.stop()
+        shutil.rmtree(self.cache_path, ignore_errors=True)
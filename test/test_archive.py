@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import os
+import gzip
+import shutil
+import tarfile
+import tempfile
+import unittest
+from unittest.mock import patch, PropertyMock
+from src.archive import DsspArchive
+from src.corpus import PackedCorpus
+from src.read_dssp import ReadDSSP
+
+
+class TestDsspArchive(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dssp_path = os.path.join(self.tmp_dir, 'dssp')
+        self.index_path = os.path.join(self.tmp_dir, 'cache')
+        os.makedirs(os.path.join(self.tmp_dir, 'members', 'te'))
+        os.makedirs(self.dssp_path)
+        shutil.copy('./test/1tes.dssp', os.path.join(self.tmp_dir, 'members', 'te', '1tes.dssp'))
+        with open('./test/1tes.dssp', 'rb') as fp, \
+                gzip.open(os.path.join(self.tmp_dir, 'members', 'te', '2tes.dssp.gz'), 'wb') as gz_fp:
+            gz_fp.write(fp.read())
+        self.archive_path = os.path.join(self.tmp_dir, 'dssp.tar')
+        with tarfile.open(self.archive_path, 'w') as tar:
+            tar.add(os.path.join(self.tmp_dir, 'members'), arcname='dssp')
+        self.patchers = [
+            patch('src.settings.Settings.dssp_path', new_callable=PropertyMock, return_value=self.dssp_path),
+            patch('src.settings.Settings.dssp_archives', new_callable=PropertyMock, return_value=[self.archive_path]),
+            patch('src.settings.Settings.cache_path', new_callable=PropertyMock, return_value=self.index_path),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        DsspArchive.archives.clear()
+
+    def tearDown(self) -> None:
+        for patcher in self.patchers:
+            patcher.stop()
+        DsspArchive.archives.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_members(self):
+        archive = DsspArchive(self.archive_path)
+        self.assertEqual(sorted(archive.members), ['1tes.dssp', '2tes.dssp.gz'])
+        with open('./test/1tes.dssp', 'rb') as fp:
+            self.assertEqual(archive.read_member('1tes.dssp'), fp.read())
+        with self.assertRaises(FileNotFoundError):
+            archive.read_member('3tes.dssp')
+
+    def test_index_is_stored(self):
+        DsspArchive(self.archive_path)
+        self.assertTrue(os.path.isfile(DsspArchive(self.archive_path).get_index_filename()))
+        with patch.object(DsspArchive, 'build_index', side_effect=AssertionError('archive scanned')):
+            archive = DsspArchive(self.archive_path)
+        self.assertEqual(len(archive.members), 2)
+
+    def test_compressed_archive_is_rejected(self):
+        compressed_path = os.path.join(self.tmp_dir, 'dssp.tar.gz')
+        with tarfile.open(compressed_path, 'w:gz') as tar:
+            tar.add('./test/1tes.dssp', arcname='1tes.dssp')
+        with self.assertRaises(ValueError):
+            DsspArchive(compressed_path)
+
+    def test_read_dssp_from_archive(self):
+        expected = ReadDSSP.parse_chains(open('./test/1tes.dssp', 'rb').read())
+        for pdb_id in ('1tes', '2tes', '2tesB'):
+            filename = ReadDSSP.get_filename(pdb_id)
+            self.assertIn(DsspArchive.separator, filename)
+            observed = ReadDSSP.read_chain_arrays(pdb_id)
+            for observed_array, expected_array in zip(observed, ReadDSSP.select_chains(expected, pdb_id[4:])):
+                self.assertTrue((observed_array == expected_array).all())
+        self.assertEqual(PackedCorpus.list_dssp_dir(), ['1tes', '2tes'])
+
+
+if __name__ == '__main__':
+    unittest.main()
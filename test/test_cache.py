@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, PropertyMock
+from src.cache import DsspCache
+from src.read_dssp import ReadDSSP
+
+
+class TestDsspCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dssp_test_filename = '1tes'
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dssp_path = os.path.join(self.tmp_dir, 'dssp')
+        os.makedirs(self.dssp_path)
+        shutil.copy('./test/1tes.dssp', self.dssp_path)
+        self.cache = DsspCache(cache_path=os.path.join(self.tmp_dir, 'cache'), max_bytes=0)
+        self.patcher = patch('src.settings.Settings.dssp_path', new_callable=PropertyMock)
+        self.patcher.start().return_value = self.dssp_path
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_read_arrays_miss_then_hit(self):
+        expected_aa, expected_cat = ReadDSSP.read_arrays(self.dssp_test_filename)
+        for _ in range(2):
+            aa_codes, category_codes = self.cache.read_arrays(self.dssp_test_filename)
+            self.assertTrue((aa_codes == expected_aa).all())
+            self.assertTrue((category_codes == expected_cat).all())
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+        self.assertTrue(os.path.exists(self.cache.get_entry_path(self.dssp_test_filename)))
+
+    def test_hit_does_not_parse(self):
+        self.cache.read_arrays(self.dssp_test_filename)
+        with patch.object(ReadDSSP, 'read_chain_arrays', side_effect=AssertionError('parsed again')):
+            aa_codes, _ = self.cache.read_arrays(self.dssp_test_filename)
+        self.assertEqual(len(aa_codes), 506)
+
+    def test_changed_file_invalidates_entry(self):
+        self.cache.read_arrays(self.dssp_test_filename)
+        filename = ReadDSSP.get_filename(self.dssp_test_filename)
+        stat = os.stat(filename)
+        os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.cache.read_arrays(self.dssp_test_filename)
+        self.assertEqual((self.cache.misses, self.cache.hits), (2, 0))
+
+    def test_corrupt_entry_is_replaced(self):
+        os.makedirs(self.cache.cache_path)
+        with open(self.cache.get_entry_path(self.dssp_test_filename), 'wb') as fp:
+            fp.write(b'not an entry')
+        aa_codes, _ = self.cache.read_arrays(self.dssp_test_filename)
+        self.assertEqual(len(aa_codes), 506)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            self.cache.read_arrays('2bar')
+
+    def test_read_chain_from_entry_and_index(self):
+        _, _, chains = self.cache.read_chain_arrays(self.dssp_test_filename + 'B')
+        self.assertTrue((chains == ord('B')).all())
+        expected = ReadDSSP.select_chains(ReadDSSP.read_chain_arrays(self.dssp_test_filename), 'BD')
+        os.remove(self.cache.get_entry_path(self.dssp_test_filename))
+        with patch.object(ReadDSSP, 'read_with_index', side_effect=AssertionError('whole file parsed')):
+            observed = self.cache.read_chain_arrays(self.dssp_test_filename + 'BD')
+        for observed_array, expected_array in zip(observed, expected):
+            self.assertTrue((observed_array == expected_array).all())
+        self.cache.clear()
+        self.assertFalse(os.path.exists(self.cache.get_index_path(self.dssp_test_filename)))
+
+    def test_default_follows_settings(self):
+        cache_path = os.path.join(self.tmp_dir, 'default')
+        with patch('src.settings.Settings.cache_path', new_callable=PropertyMock, return_value=cache_path):
+            self.assertEqual(DsspCache.get_default().cache_path, cache_path)
+            DsspCache.get_default().read_arrays(self.dssp_test_filename)
+        self.assertTrue(os.path.exists(os.path.join(cache_path, self.dssp_test_filename + DsspCache.entry_extension)))
+
+    def test_missing_chain(self):
+        for _ in range(2):  # a miss, then a hit of the entry of the whole file
+            with self.assertRaises(ValueError):
+                self.cache.read_chain_arrays(self.dssp_test_filename + 'Z')
+        self.cache.read_arrays(self.dssp_test_filename)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_evict_least_recently_used(self):
+        for pdb_id in ('1aaa', '1bbb', '1ccc'):
+            shutil.copy('./test/1tes.dssp', os.path.join(self.dssp_path, pdb_id + '.dssp'))
+        self.cache.read_arrays('1aaa')
+        entry_size = os.path.getsize(self.cache.get_entry_path('1aaa'))
+        entry_size += os.path.getsize(self.cache.get_index_path('1aaa'))
+        self.cache.max_bytes = 2 * entry_size
+        self.cache.read_arrays('1bbb')
+        os.utime(self.cache.get_entry_path('1aaa'), ns=(0, 0))
+        os.utime(self.cache.get_entry_path('1bbb'), ns=(1, 1))
+        self.cache.read_arrays('1ccc')
+        self.assertFalse(os.path.exists(self.cache.get_entry_path('1aaa')))
+        self.assertFalse(os.path.exists(self.cache.get_index_path('1aaa')))
+        self.assertTrue(os.path.exists(self.cache.get_entry_path('1bbb')))
+        self.assertTrue(os.path.exists(self.cache.get_index_path('1bbb')))
+        self.assertTrue(os.path.exists(self.cache.get_entry_path('1ccc')))
+        self.assertEqual(self.cache._size, 2 * entry_size)
+
+    def test_evict_index_without_entry(self):
+        self.cache.read_arrays(self.dssp_test_filename)
+        os.remove(self.cache.get_entry_path(self.dssp_test_filename))
+        self.cache.max_bytes = 1
+        self.cache.evict()
+        self.assertEqual(os.listdir(self.cache.cache_path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from unittest.mock import patch, PropertyMock
+from src.corpus import PackedCorpus
+from src.read_dssp import ReadDSSP
+from src.residue import ResidueFactory
+
+
+class TestPackedCorpus(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dssp_path = os.path.join(self.tmp_dir, 'dssp')
+        os.makedirs(self.dssp_path)
+        for pdb_id in ('1tes', '2tes'):
+            shutil.copy('./test/1tes.dssp', os.path.join(self.dssp_path, pdb_id + '.dssp'))
+        self.corpus_path = os.path.join(self.tmp_dir, 'corpus')
+        self.patcher = patch('src.settings.Settings.dssp_path', new_callable=PropertyMock)
+        self.patcher.start().return_value = self.dssp_path
+        self.corpus = PackedCorpus.pack(corpus_path=self.corpus_path, pdb_ids=['1tes', '3foo', '2tes'], reader=ReadDSSP)
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        del self.corpus
+        shutil.rmtree(self.tmp_dir)
+
+    def test_pack_skips_missing(self):
+        self.assertEqual(self.corpus.pdb_ids, ['1tes', '2tes'])
+        self.assertEqual(len(self.corpus), 2)
+        self.assertFalse('3foo' in self.corpus)
+
+    def test_read_arrays(self):
+        expected_aa, expected_cat = ReadDSSP.read_arrays('1tes')
+        for pdb_id in ('1tes', '2tes'):
+            aa_codes, category_codes = self.corpus.read_arrays(pdb_id)
+            self.assertTrue((aa_codes == expected_aa).all())
+            self.assertTrue((category_codes == expected_cat).all())
+        self.assertIsInstance(self.corpus.aa_codes, np.memmap)
+
+    def test_read_missing(self):
+        with self.assertRaises(FileNotFoundError):
+            self.corpus.read_arrays('3foo')
+
+    def test_chain_spans(self):
+        spans = self.corpus.get_chain_spans('2tes')
+        self.assertEqual([chain for chain, _, _ in spans], ['A', 'B', 'C', 'D'])
+        self.assertEqual(spans[0][1], 506)
+        self.assertEqual(spans[-1][2], 1012)
+        _, _, chains = self.corpus.read_chain_arrays('2tes')
+        self.assertTrue((chains == ReadDSSP.read_chain_arrays('1tes')[2]).all())
+
+    def test_read_chain_suffix(self):
+        expected = ReadDSSP.select_chains(ReadDSSP.read_chain_arrays('1tes'), 'BD')
+        observed = self.corpus.read_chain_arrays('2tesBD')
+        for observed_array, expected_array in zip(observed, expected):
+            self.assertTrue((observed_array == expected_array).all())
+        aa_codes, _ = self.corpus.read_arrays('2tesC')
+        self.assertIsInstance(aa_codes, np.memmap)
+        self.assertTrue('2tesC' in self.corpus)
+        self.assertFalse('2tesE' in self.corpus)
+        self.assertFalse('2tesCZ' in self.corpus)
+        with self.assertRaises(ValueError):
+            self.corpus.read_arrays('2tesE')
+
+    def test_pickle_reopens_memmap(self):
+        corpus = pickle.loads(pickle.dumps(self.corpus))
+        self.assertEqual(corpus.pdb_ids, self.corpus.pdb_ids)
+        self.assertTrue((corpus.read_arrays('2tes')[0] == self.corpus.read_arrays('2tes')[0]).all())
+
+    def test_residue_factory_from_corpus(self):
+        factory = ResidueFactory(pdb_id_lst=['1tes', '2tes'], read_seq=self.corpus)
+        with patch.object(ReadDSSP, 'read_chain_arrays', side_effect=AssertionError('DSSP file read')):
+            residues = factory.construct()
+        self.assertEqual(list(residues.keys()), ['1tes', '2tes'])
+        self.assertEqual(residues['2tes'].residue_count, 506)
+
+
+if __name__ == '__main__':
+    unittest.main()
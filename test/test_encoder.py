@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import unittest
+import numpy as np
+from src.encoder import WindowEncoder
+from src.residue import AminoAcid, Target
+
+
+class TestWindowEncoder(unittest.TestCase):
+    def setUp(self) -> None:
+        AminoAcid.get_table()
+        Target.get_table()
+        self.encoder = WindowEncoder(amino_acids=AminoAcid.mapping, targets=Target.mapping, window_length=5)
+        self.aa_codes = self.encoder.encode_labels('ACDEFGHIKL', self.encoder.input_lookup)
+        self.category_codes = self.encoder.encode_labels('aaabbbccca', self.encoder.output_lookup)
+
+    def test_encode_labels(self):
+        self.assertEqual(list(self.aa_codes), [1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+        self.assertEqual(list(self.category_codes), [0, 0, 0, 1, 1, 1, 2, 2, 2, 0])
+
+    def test_encode_labels_unknown(self):
+        codes = self.encoder.encode_labels('AXB', self.encoder.input_lookup)
+        self.assertEqual(list(codes), [1, self.encoder.input_pad_code, self.encoder.input_pad_code])
+        codes = self.encoder.encode_labels('AÄ\ufffdC', self.encoder.input_lookup)
+        self.assertEqual(list(codes), [1, self.encoder.input_pad_code, self.encoder.input_pad_code, 2])
+
+    def test_get_window_codes(self):
+        X_codes, Y_codes = self.encoder.get_window_codes(self.aa_codes, self.category_codes)
+        self.assertEqual(X_codes.shape, (5, 5))
+        self.assertTrue((X_codes[:3] == self.encoder.input_pad_code).all())
+        self.assertEqual(list(X_codes[3]), [1, 2, 3, 4, 5])
+        self.assertEqual(list(X_codes[4]), [2, 3, 4, 5, 6])
+        self.assertEqual(list(Y_codes[3:]), [1, 1])
+
+    def test_get_window_codes_short_sequence(self):
+        X_codes, Y_codes = self.encoder.get_window_codes(self.aa_codes[:4], self.category_codes[:4])
+        self.assertEqual(X_codes.shape, (0, 5))
+        self.assertEqual(Y_codes.shape, (0,))
+
+    def test_get_residue_window_codes(self):
+        X_codes, _ = self.encoder.get_window_codes(self.aa_codes, self.category_codes)
+        windows = self.encoder.get_residue_window_codes(self.aa_codes)
+        self.assertEqual(windows.shape, (10, 5))
+        self.assertTrue((windows[3:5] == X_codes[3:5]).all())
+        pad = self.encoder.input_pad_code
+        self.assertEqual(list(windows[0]), [pad, pad, pad, 1, 2])
+        self.assertEqual(list(windows[9]), [7, 8, 9, 10, pad])
+        self.assertEqual(self.encoder.get_residue_window_codes(self.aa_codes[:0]).shape, (0, 5))
+
+    def test_window_codes_stop_at_chains(self):
+        chains = np.frombuffer(b'AAAAAABBBB', dtype=np.uint8)
+        X_codes, _ = self.encoder.get_window_codes(self.aa_codes, self.category_codes, chains=chains)
+        pad = self.encoder.input_pad_code
+        self.assertEqual(list(X_codes[3]), [1, 2, 3, 4, 5])
+        self.assertEqual(list(X_codes[4]), [2, 3, 4, 5, 6])
+        windows = self.encoder.get_residue_window_codes(self.aa_codes, chains=chains)
+        self.assertEqual(list(windows[5]), [3, 4, 5, 6, pad])
+        self.assertEqual(list(windows[6]), [pad, pad, pad, 7, 8])
+        self.assertTrue((windows[:5] == self.encoder.get_residue_window_codes(self.aa_codes)[:5]).all())
+
+    def test_expand(self):
+        X_codes, Y_codes = self.encoder.get_window_codes(self.aa_codes, self.category_codes)
+        X_data = self.encoder.expand_X(X_codes)
+        Y_data = self.encoder.expand_Y(Y_codes)
+        self.assertEqual(X_data.shape, (5, 5 * 21))
+        self.assertFalse(X_data[0].any())
+        self.assertEqual(X_data[3].sum(), 5)
+        self.assertEqual(X_data[3][1], 1)
+        self.assertEqual(list(Y_data[3]), [0, 1, 0])
+
+    def test_to_sparse(self):
+        X_codes, _ = self.encoder.get_window_codes(self.aa_codes, self.category_codes)
+        X_sparse = self.encoder.to_sparse(X_codes)
+        self.assertEqual(X_sparse.format, 'csr')
+        self.assertEqual(X_sparse.nnz, 2 * 5)
+        self.assertTrue((X_sparse.toarray() == self.encoder.expand_X(X_codes)).all())
+
+    def test_get_model_input(self):
+        X_codes, _ = self.encoder.get_window_codes(self.aa_codes, self.category_codes)
+
+        class CodesModel:
+            accepts_codes = True
+
+        self.assertIs(self.encoder.get_model_input(CodesModel(), X_codes), X_codes)
+        self.assertEqual(self.encoder.get_model_input(object(), X_codes).format, 'csr')
+
+    def test_format_X(self):
+        X_codes, _ = self.encoder.get_window_codes(self.aa_codes, self.category_codes)
+        self.assertIs(self.encoder.format_X(X_codes, feature_format='codes'), X_codes)
+        self.assertEqual(self.encoder.format_X(X_codes, feature_format='dense').dtype, np.float64)
+        with self.assertRaises(ValueError):
+            self.encoder.format_X(X_codes, feature_format='csc')
+
+    def test_get_estimator_input(self):
+        X_codes, _ = self.encoder.get_window_codes(self.aa_codes, self.category_codes)
+        X_sparse = self.encoder.get_estimator_input(X_codes)
+        self.assertEqual(X_sparse.format, 'csr')
+        X_dense = self.encoder.get_estimator_input(X_codes, accept_sparse=False)
+        self.assertTrue((X_dense == self.encoder.expand_X(X_codes)).all())
+        self.assertIs(self.encoder.get_estimator_input(X_dense), X_dense)
+
+    def test_concatenate(self):
+        X_codes, _ = self.encoder.get_window_codes(self.aa_codes, self.category_codes)
+        X_sparse = self.encoder.to_sparse(X_codes)
+        self.assertEqual(self.encoder.concatenate([X_sparse, X_sparse]).shape, (10, 5 * 21))
+        self.assertEqual(self.encoder.concatenate([X_codes, X_codes]).shape, (10, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import tempfile
+import unittest
+from src.fasta import ReadFasta
+
+
+class TestReadFasta(unittest.TestCase):
+    def setUp(self) -> None:
+        self.text = '>sp|P1|ONE first protein\nacdef\nGHIK*\n\n>two\n>three desc\nLMN\nPQ\n'
+
+    def test_iter_records(self):
+        records = list(ReadFasta.iter_records(fp=io.StringIO(self.text)))
+        self.assertEqual([record.name for record in records], ['sp|P1|ONE', 'two', 'three'])
+        self.assertEqual([record.sequence for record in records], ['ACDEFGHIK', '', 'LMNPQ'])
+
+    def test_iter_records_is_lazy(self):
+        records = ReadFasta.iter_records(fp=iter(['>a\n', 'AC\n', '>b\n']))
+        self.assertEqual(next(records), ReadFasta.FastaRecord(name='a', sequence='AC'))
+
+    def test_read(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, 'seqs.fasta')
+            with open(filepath, 'w') as fp:
+                fp.write(self.text)
+            self.assertEqual(len(list(ReadFasta.read(filepath=filepath))), 3)
+            with self.assertRaises(FileNotFoundError):
+                list(ReadFasta.read(filepath=os.path.join(tmp_dir, 'missing.fasta')))
+            with open(filepath, 'wb') as fp:
+                fp.write(b'>bad\nAC\xff\xc4D\n')
+            self.assertEqual(list(ReadFasta.read(filepath=filepath)), [('bad', 'AC\ufffd\ufffdD')])
+
+
+if __name__ == '__main__':
+    unittest.main()
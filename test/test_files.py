@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from src.files import atomic_write
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'entry')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_replaces_file(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(b'old')
+        with atomic_write(self.path) as fp:
+            fp.write(b'new')
+            with open(self.path, 'rb') as reader:
+                self.assertEqual(reader.read(), b'old')
+        with open(self.path, 'rb') as fp:
+            self.assertEqual(fp.read(), b'new')
+        self.assertEqual(os.listdir(self.tmp_dir), ['entry'])
+
+    def test_failed_write_leaves_no_file(self):
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.path) as fp:
+                fp.write(b'partial')
+                raise RuntimeError('write failed')
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
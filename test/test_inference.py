@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from sklearn.neural_network import MLPClassifier
+from src.inference import InferenceEngine
+from src.model_io import ModelArtifact
+from src.read_dssp import ReadDSSP
+from src.residue import Residue
+
+
+class TestInferenceEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        with open('./test/1tes.dssp', 'rb') as fp:
+            aa_codes, category_codes = ReadDSSP.parse(fp.read())
+        residue = Residue(pdb_id='1tes', feature_format='codes')
+        residue.set_codes(aa_codes=aa_codes, category_codes=category_codes)
+        residue.get_X_and_Y_arrays()
+        cls.encoder = residue.encoder
+        cls.X_codes = residue.X_data
+        cls.X_sparse = cls.encoder.to_sparse(residue.X_data)
+        cls.X_dense = cls.encoder.expand_X(residue.X_data)
+        # Sequence windows include partially padded rows that training windows do not have.
+        cls.X_residue_codes = cls.encoder.get_residue_window_codes(aa_codes)
+        cls.X_residues = cls.encoder.to_sparse(cls.X_residue_codes)
+        cls.classifiers = [
+            MLPClassifier(solver='lbfgs', hidden_layer_sizes=(5, 3), max_iter=200, random_state=1),
+            MLPClassifier(solver='adam', hidden_layer_sizes=(13, 13), max_iter=50, random_state=1),
+            MLPClassifier(solver='adam', hidden_layer_sizes=(8,), activation='tanh', max_iter=50, random_state=1),
+        ]
+        for classifier in cls.classifiers:
+            classifier.fit(cls.X_sparse, residue.Y_data)
+
+    def test_labels_match_classifier(self):
+        for classifier in self.classifiers:
+            engine = InferenceEngine.from_classifier(classifier)
+            for X in (self.X_sparse, self.X_dense, self.X_residues):
+                self.assertTrue((engine.predict(X) == classifier.predict(X)).all())
+                self.assertTrue(np.allclose(engine.predict_proba(X), classifier.predict_proba(X), atol=1e-5))
+                self.assertTrue((engine.predict_classes(X) == np.argmax(classifier.predict_proba(X), axis=1)).all())
+
+    def test_window_codes(self):
+        for classifier in self.classifiers:
+            engine = InferenceEngine.from_classifier(classifier)
+            for X_codes, X_sparse in ((self.X_codes, self.X_sparse), (self.X_residue_codes, self.X_residues)):
+                self.assertTrue(engine.is_codes(X_codes))
+                self.assertTrue((engine.predict(X_codes) == classifier.predict(X_sparse)).all())
+                self.assertTrue(np.allclose(engine.decision_function(X_codes), engine.decision_function(X_sparse),
+                                            atol=1e-5))
+
+    def test_embedding(self):
+        engine = InferenceEngine.from_classifier(self.classifiers[0])
+        embedding = engine.get_embedding(window_length=13)
+        n_units = self.encoder.n_input_units
+        self.assertEqual(embedding.shape, (13, n_units + 1, 5))
+        self.assertFalse(embedding[:, self.encoder.input_pad_code].any())
+        self.assertTrue((embedding[2, 4] == engine.coefs[0][2 * n_units + 4]).all())
+        with self.assertRaises(ValueError):
+            engine.get_embedding(window_length=12)
+
+    def test_chunk_size_does_not_change_results(self):
+        engine = InferenceEngine.from_classifier(self.classifiers[1])
+        logits = engine.decision_function(self.X_sparse)
+        engine.chunk_size = 7
+        self.assertTrue((engine.decision_function(self.X_sparse) == logits).all())
+        self.assertEqual(logits.dtype, np.float32)
+
+    def test_from_artifact(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'neural_net')
+            ModelArtifact.from_classifier(
+                classifier=self.classifiers[0], window_length=13, amino_acids=self.encoder.amino_acids,
+                targets=self.encoder.targets
+            ).save(path=path)
+            engine = InferenceEngine.from_artifact(ModelArtifact.load(path=path))
+            self.assertTrue((engine.predict(self.X_sparse) == self.classifiers[0].predict(self.X_sparse)).all())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_from_model(self):
+        engine = InferenceEngine.from_model(self.classifiers[0])
+        self.assertIsInstance(engine, InferenceEngine)
+        self.assertIs(InferenceEngine.from_model(engine), engine)
+        other = object()
+        self.assertIs(InferenceEngine.from_model(other), other)
+
+    def test_wrong_number_of_features(self):
+        engine = InferenceEngine.from_classifier(self.classifiers[0])
+        with self.assertRaises(ValueError):
+            engine.predict(np.zeros((2, 5), dtype=np.float32))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import tempfile
+import unittest
+import tracemalloc
+import numpy as np
+from src.instrumentation import Instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self) -> None:
+        Instrumentation.reset()
+
+    def tearDown(self) -> None:
+        Instrumentation.reset()
+
+    def test_stage(self):
+        for _ in range(2):
+            with Instrumentation.stage('parse'):
+                sum(range(1000))
+        record = Instrumentation.stages['parse']
+        self.assertEqual(record['calls'], 2)
+        self.assertGreater(record['seconds'], 0)
+        self.assertGreaterEqual(record['max_rss_bytes'], 0)
+        self.assertEqual(record['traced_peak_bytes'], 0)
+
+    def test_stage_records_on_error(self):
+        with self.assertRaises(ValueError):
+            with Instrumentation.stage('fit'):
+                raise ValueError
+        self.assertEqual(Instrumentation.stages['fit']['calls'], 1)
+
+    def test_nested_traced_peak(self):
+        tracemalloc.start()
+        try:
+            with Instrumentation.stage('outer'):
+                with Instrumentation.stage('inner'):
+                    array = np.ones(2 ** 20)  # 8 MiB
+                    del array
+                with Instrumentation.stage('after'):
+                    pass
+        finally:
+            tracemalloc.stop()
+        self.assertGreaterEqual(Instrumentation.stages['inner']['traced_peak_bytes'], 8 * 2 ** 20)
+        self.assertGreaterEqual(Instrumentation.stages['outer']['traced_peak_bytes'], 8 * 2 ** 20)
+        self.assertLess(Instrumentation.stages['after']['traced_peak_bytes'], 8 * 2 ** 20)
+
+    def test_count_and_merge(self):
+        with Instrumentation.stage('encode'):
+            pass
+        Instrumentation.count('residues_kept', 10)
+        snapshot = Instrumentation.snapshot()
+        Instrumentation.merge(snapshot)
+        self.assertEqual(Instrumentation.stages['encode']['calls'], 2)
+        self.assertEqual(Instrumentation.counters['residues_kept'], 20)
+        self.assertEqual(snapshot['counters']['residues_kept'], 10)
+
+    def test_write(self):
+        with Instrumentation.stage('predict'):
+            pass
+        Instrumentation.count('windows_predicted', 3)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            Instrumentation.write(filename=os.path.join(tmp_dir, 'metrics.json'))
+            with open(os.path.join(tmp_dir, 'metrics.json')) as fp:
+                self.assertEqual(json.load(fp), Instrumentation.snapshot())
+            Instrumentation.write(filename=os.path.join(tmp_dir, 'metrics.prom'))
+            with open(os.path.join(tmp_dir, 'metrics.prom')) as fp:
+                lines = fp.read().splitlines()
+        self.assertIn('pred_sec_struc_stage_calls_total{stage="predict"} 1', lines)
+        self.assertIn('pred_sec_struc_windows_predicted_total 3', lines)
+        self.assertIn('# TYPE pred_sec_struc_stage_seconds_total counter', lines)
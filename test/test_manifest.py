@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from unittest.mock import patch, PropertyMock
+from benchmarks.synthetic_dssp import SyntheticDSSP
+from src.manifest import DsspManifest, summarize_dssp_file
+from src.read_dssp import ReadDSSP
+
+
+class TestDsspManifest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.dssp_path = os.path.join(self.tmp_dir, 'dssp')
+        self.pdb_ids, _ = SyntheticDSSP(seed=3).write_dataset(directory=self.dssp_path, n_proteins=6)
+        self.manifest_path = os.path.join(self.tmp_dir, 'manifest.npz')
+        self.patchers = [
+            patch('src.settings.Settings.dssp_path', new_callable=PropertyMock, return_value=self.dssp_path),
+            patch('src.settings.Settings.dssp_archives', new_callable=PropertyMock, return_value=[]),
+            patch('src.settings.Settings.manifest_path', new_callable=PropertyMock, return_value=self.manifest_path),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self) -> None:
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_scanned(self, n_workers: int = 1) -> DsspManifest:
+        manifest = DsspManifest()
+        manifest.scan(n_workers=n_workers)
+        manifest.save()
+        return manifest
+
+    def test_scan(self):
+        manifest = self.get_scanned()
+        self.assertEqual(manifest.pdb_ids.tolist(), self.pdb_ids)
+        self.assertEqual(manifest.n_rescanned, 6)
+        for pdb_id in self.pdb_ids:
+            _, category_codes, chains = ReadDSSP.read_chain_arrays(pdb_id=pdb_id)
+            record = manifest.get_record(pdb_id)
+            self.assertEqual(record['n_residues'], len(category_codes))
+            self.assertEqual(record['n_chains'], len(np.unique(chains)))
+            self.assertEqual(record['error'], '')
+            self.assertAlmostEqual(record['fractions']['a'], np.mean(category_codes == 0))
+            self.assertAlmostEqual(sum(record['fractions'].values()), 1)
+
+    def test_parallel_scan(self):
+        serial = self.get_scanned()
+        parallel = self.get_scanned(n_workers=2)
+        for column in DsspManifest.columns:
+            np.testing.assert_array_equal(getattr(parallel, column), getattr(serial, column))
+
+    def test_rescan_reads_changed_files(self):
+        self.get_scanned()
+        os.remove(os.path.join(self.dssp_path, self.pdb_ids[0] + '.dssp'))
+        n_residues = SyntheticDSSP(seed=4).write(directory=self.dssp_path, pdb_id=self.pdb_ids[1], n_residues=30)
+        with open(os.path.join(self.dssp_path, 'empt.dssp'), 'w') as fp:
+            fp.write('no residues\n')
+        manifest = DsspManifest.open()
+        with patch('src.manifest.summarize_dssp_file', wraps=summarize_dssp_file) as summarize:
+            manifest.scan(n_workers=1)
+        self.assertEqual(sorted(call.kwargs['pdb_id'] for call in summarize.call_args_list),
+                         ['empt', self.pdb_ids[1]])
+        self.assertEqual(manifest.n_rescanned, 2)
+        self.assertNotIn(self.pdb_ids[0], manifest.pdb_ids.tolist())
+        self.assertEqual(manifest.get_record(self.pdb_ids[1])['n_residues'], n_residues)
+        self.assertEqual(manifest.get_record('empt')['n_residues'], 0)
+
+    def test_unreadable_file_is_recorded(self):
+        with open(os.path.join(self.dssp_path, 'bad1.dssp.gz'), 'wb') as fp:
+            fp.write(b'not gzip')
+        manifest = self.get_scanned()
+        self.assertTrue(manifest.get_record('bad1')['error'])
+        self.assertNotIn('bad1', manifest.select())
+        self.assertEqual(manifest.select(), self.pdb_ids)
+
+    def test_open(self):
+        with self.assertRaises(FileNotFoundError):
+            DsspManifest.open()
+        manifest = self.get_scanned()
+        stored = DsspManifest.open()
+        for column in DsspManifest.columns:
+            np.testing.assert_array_equal(getattr(stored, column), getattr(manifest, column))
+
+    def test_select(self):
+        manifest = self.get_scanned()
+        n_residues = dict(zip(manifest.pdb_ids.tolist(), manifest.n_residues.tolist()))
+        median = int(np.median(manifest.n_residues))
+        self.assertEqual(manifest.select(min_residues=median + 1),
+                         [pdb_id for pdb_id in self.pdb_ids if n_residues[pdb_id] > median])
+        self.assertEqual(manifest.select(max_residues=median),
+                         [pdb_id for pdb_id in self.pdb_ids if n_residues[pdb_id] <= median])
+        coil = dict(zip(manifest.pdb_ids.tolist(), manifest.get_fractions()[:, 2].tolist()))
+        threshold = float(np.median(list(coil.values())))
+        self.assertEqual(manifest.select(max_fractions={'c': threshold}),
+                         [pdb_id for pdb_id in self.pdb_ids if coil[pdb_id] <= threshold])
+        with self.assertRaises(ValueError):
+            manifest.select(min_fractions={'x': 0.1})
+
+        sample = manifest.select(n_proteins=3)
+        self.assertEqual(len(sample), 3)
+        self.assertEqual(sample, sorted(sample))
+        self.assertEqual(sample, manifest.select(n_proteins=3))
+        self.assertEqual(manifest.select(pdb_ids=[self.pdb_ids[2].upper(), 'nope', self.pdb_ids[0]]),
+                         [self.pdb_ids[2], self.pdb_ids[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import unittest
+import numpy as np
+from src.metrics import StructureMetrics
+
+CATEGORIES = ['a', 'b', 'c']
+
+
+def to_onehot(labels: str) -> np.ndarray:
+    return np.eye(3, dtype=np.uint8)[[CATEGORIES.index(label) for label in labels]]
+
+
+def get_sov(true_labels: str, pred_labels: str) -> float:
+    """SOV'99 of one protein, computed segment by segment."""
+    def segments(labels):
+        runs, start = [], 0
+        for i in range(1, len(labels) + 1):
+            if i == len(labels) or labels[i] != labels[start]:
+                runs.append((start, i, labels[start]))
+                start = i
+        return runs
+
+    score, length = 0., 0
+    for t_start, t_stop, category in segments(true_labels):
+        pairs = [(p_start, p_stop) for p_start, p_stop, pred_category in segments(pred_labels)
+                 if pred_category == category and p_start < t_stop and t_start < p_stop]
+        if not pairs:
+            length += t_stop - t_start
+        for p_start, p_stop in pairs:
+            min_overlap = min(t_stop, p_stop) - max(t_start, p_start)
+            max_overlap = max(t_stop, p_stop) - min(t_start, p_start)
+            delta = min(max_overlap - min_overlap, min_overlap, (t_stop - t_start) // 2, (p_stop - p_start) // 2)
+            score += (min_overlap + delta) / max_overlap * (t_stop - t_start)
+            length += t_stop - t_start
+    return 100 * score / length
+
+
+class TestStructureMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metrics = StructureMetrics(categories=CATEGORIES)
+
+    def test_q3_and_sov(self):
+        self.metrics.update(Y_true=to_onehot('cccaaaaacc'), Y_pred=to_onehot('cccaaacccc'))
+        self.assertAlmostEqual(self.metrics.q3, 0.8)
+        self.assertAlmostEqual(self.metrics.sov, 85.)
+        self.assertTrue(np.allclose(self.metrics.sov_per_class, [80., 0., 90.]))
+        self.assertTrue(np.allclose(self.metrics.precision, [1., 0., 5 / 7]))
+        self.assertTrue(np.allclose(self.metrics.recall, [0.6, 0., 1.]))
+        self.assertEqual(self.metrics.confusion.tolist(), [[3, 0, 2, 0], [0, 0, 0, 0], [0, 0, 5, 0]])
+
+    def test_no_class(self):
+        Y_pred = to_onehot('aaaabbbb')
+        Y_pred[2] = 0
+        Y_pred[5] = 1
+        self.metrics.update(Y_true=to_onehot('aaaabbbb'), Y_pred=Y_pred)
+        self.assertEqual(self.metrics.confusion[:, self.metrics.no_class].tolist(), [1, 1, 0])
+        self.assertAlmostEqual(self.metrics.q3, 6 / 8)
+        self.assertAlmostEqual(self.metrics.no_class_fraction, 2 / 8)
+        self.assertLess(self.metrics.sov, 100.)
+
+    def test_unlabeled_groups_are_not_scored(self):
+        Y_true = to_onehot('aaacc')
+        Y_true[1] = 0
+        self.metrics.update(Y_true=Y_true, Y_pred=to_onehot('abacc'))
+        self.assertEqual(self.metrics.n_unlabeled, 1)
+        self.assertEqual(self.metrics.n_groups, 4)
+        self.assertAlmostEqual(self.metrics.q3, 1.)
+        with self.assertRaises(ValueError):
+            self.metrics.update(Y_true=Y_true, Y_pred=Y_true[:2])
+
+    def test_matches_segment_by_segment_sov(self):
+        rng = np.random.default_rng(1)
+        proteins = []
+        for _ in range(20):
+            length = int(rng.integers(1, 60))
+            true_labels = ''.join(np.repeat(rng.choice(CATEGORIES, size=length), rng.integers(1, 6, size=length)))
+            pred_labels = ''.join(
+                label if rng.random() < 0.7 else rng.choice(CATEGORIES) for label in true_labels
+            )
+            proteins.append((true_labels, pred_labels))
+        for true_labels, pred_labels in proteins:
+            metrics = StructureMetrics(categories=CATEGORIES)
+            metrics.update(Y_true=to_onehot(true_labels), Y_pred=to_onehot(pred_labels))
+            self.assertAlmostEqual(metrics.sov, get_sov(true_labels, pred_labels))
+
+        # One update with all proteins gives the same totals as one update per protein.
+        for true_labels, pred_labels in proteins:
+            self.metrics.update(Y_true=to_onehot(true_labels), Y_pred=to_onehot(pred_labels))
+        metrics = StructureMetrics(categories=CATEGORIES)
+        metrics.update(
+            Y_true=to_onehot(''.join(true for true, _ in proteins)),
+            Y_pred=to_onehot(''.join(pred for _, pred in proteins)),
+            lengths=[len(true) for true, _ in proteins]
+        )
+        self.assertEqual(metrics.n_proteins, 20)
+        self.assertTrue((metrics.confusion == self.metrics.confusion).all())
+        self.assertAlmostEqual(metrics.sov, self.metrics.sov)
+
+    def test_class_columns_and_report(self):
+        self.metrics.update(Y_true=np.array([0, 0, 1, 2]), Y_pred=np.array([0, 1, 1, 2]))
+        report = self.metrics.get_report()
+        self.assertEqual(report['n_groups'], 4)
+        self.assertEqual(report['classes']['b']['support'], 1)
+        self.assertIn('no class', self.metrics.format_report())
+        group_report = self.metrics.get_report(segments=False)
+        self.assertNotIn('sov', group_report)
+        self.assertNotIn('n_proteins', group_report)
+        self.assertNotIn('sov', group_report['classes']['a'])
+        self.assertEqual(group_report['q3'], report['q3'])
+        self.assertNotIn('SOV', self.metrics.format_report(segments=False))
+
+    def test_empty(self):
+        self.metrics.update(Y_true=np.zeros((0, 3)), Y_pred=np.zeros((0, 3)))
+        self.assertEqual(self.metrics.q3, 0.)
+        self.assertEqual(self.metrics.sov, 0.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import sklearn
+from joblib import dump
+from unittest.mock import patch, PropertyMock
+from sklearn.neural_network import MLPClassifier
+from src.model_io import ModelArtifact
+from src.read_dssp import ReadDSSP
+from src.residue import Residue
+from src.training import Training
+
+
+class TestModelArtifact(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        with open('./test/1tes.dssp', 'rb') as fp:
+            aa_codes, category_codes = ReadDSSP.parse(fp.read())
+        residue = Residue(pdb_id='1tes', feature_format='codes')
+        residue.set_codes(aa_codes=aa_codes, category_codes=category_codes)
+        residue.get_X_and_Y_arrays()
+        self.encoder = residue.encoder
+        self.X_data = self.encoder.to_sparse(residue.X_data)
+        self.training = Training(feature_format='codes')
+        self.training.pdb_lst = ['1tes']
+        self.training.X_train, self.training.Y_train = self.X_data, residue.Y_data
+        self.training.model = MLPClassifier(hidden_layer_sizes=(5, 3), max_iter=20, random_state=1)
+        self.training.model.fit(self.X_data, residue.Y_data)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_save_and_load(self):
+        path = os.path.join(self.tmp_dir, 'neural_net')
+        ModelArtifact.from_training(training=self.training).save(path=path)
+        self.assertIn('meta.json', os.listdir(path))
+        self.assertEqual(len(os.listdir(path)), 2 * 3 + 2)  # weights, meta.json and pdb_ids.txt
+        artifact = ModelArtifact.load(path=path)
+        self.assertIsInstance(artifact.coefs[0], np.memmap)
+        self.assertEqual(artifact.window_length, self.encoder.window_length)
+        self.assertEqual(artifact.amino_acids, self.encoder.amino_acids)
+        self.assertEqual(artifact.metadata['n_proteins'], 1)
+        classifier = artifact.to_classifier()
+        self.assertTrue((classifier.predict(self.X_data) == self.training.model.predict(self.X_data)).all())
+        self.assertTrue(np.allclose(classifier.predict_proba(self.X_data),
+                                    self.training.model.predict_proba(self.X_data)))
+
+    def test_training_set_and_lineage(self):
+        path = os.path.join(self.tmp_dir, 'neural_net')
+        parent = ModelArtifact.from_training(training=self.training)
+        parent.save(path=path)
+        parent = ModelArtifact.load(path=path)
+        self.assertEqual((parent.pdb_ids, parent.version, parent.lineage), (['1tes'], 1, []))
+
+        child = ModelArtifact.from_training(training=self.training)
+        child.pdb_ids = ['2tes', '1tes']
+        child.derive_from(parent=parent)
+        self.assertEqual(ModelArtifact.keep_version(path=path), path + '.v1')
+        child.save(path=path)
+        child = ModelArtifact.load(path=path)
+        self.assertEqual((child.pdb_ids, child.version), (['1tes', '2tes'], 2))
+        self.assertEqual(child.lineage, [parent.get_summary()])
+        self.assertEqual(child.lineage[0]['saved_at'], ModelArtifact.load(path=path + '.v1').saved_at)
+
+    def test_to_classifier_continues_training(self):
+        classifier = ModelArtifact.from_training(training=self.training).to_classifier(solver='adam', random_state=1)
+        classifier.partial_fit(self.X_data, self.training.Y_train, classes=np.arange(3))
+        self.assertEqual(classifier.t_, self.X_data.shape[0])
+        self.assertFalse(np.allclose(classifier.coefs_[0], self.training.model.coefs_[0]))
+
+    def test_to_classifier_checks_sklearn_version(self):
+        artifact = ModelArtifact.from_training(training=self.training)
+        ModelArtifact.check_sklearn_version(version=sklearn.__version__, source='Installed')
+        for version in ('1.0.2', '1.9.1', '1.9.0rc1'):
+            ModelArtifact.check_sklearn_version(version=version, source='Saved')
+        for version in ('1.0.1', '1.10.0', '2.0'):
+            with self.assertRaises(ValueError):
+                ModelArtifact.check_sklearn_version(version=version, source='Saved')
+        artifact.sklearn_version = '1.10.0'
+        with self.assertRaisesRegex(ValueError, 'saved with scikit-learn 1.10.0'):
+            artifact.to_classifier()
+        artifact.sklearn_version = None
+        with patch('sklearn.__version__', '0.24.2'):
+            with self.assertRaisesRegex(ValueError, 'installed scikit-learn is 0.24.2'):
+                artifact.to_classifier()
+
+    def test_save_replaces_artifact(self):
+        path = os.path.join(self.tmp_dir, 'neural_net')
+        artifact = ModelArtifact.from_training(training=self.training)
+        artifact.save(path=path)
+        artifact.metadata['note'] = 'second'
+        artifact.save(path=path)
+        self.assertEqual(ModelArtifact.load(path=path).metadata['note'], 'second')
+        self.assertEqual(os.listdir(self.tmp_dir), ['neural_net'])
+
+    def test_newer_format_is_rejected(self):
+        path = os.path.join(self.tmp_dir, 'neural_net')
+        ModelArtifact.from_training(training=self.training).save(path=path)
+        meta_filename = os.path.join(path, ModelArtifact.meta_filename)
+        with open(meta_filename, 'r') as fp:
+            meta = json.load(fp)
+        meta['format_version'] = ModelArtifact.format_version + 1
+        with open(meta_filename, 'w') as fp:
+            json.dump(meta, fp)
+        with self.assertRaises(ValueError):
+            ModelArtifact.load(path=path)
+
+    def test_verify_tables(self):
+        artifact = ModelArtifact.from_training(training=self.training)
+        artifact.verify_tables(amino_acids=self.encoder.amino_acids, targets=self.encoder.targets)
+        with self.assertRaises(ValueError):
+            artifact.verify_tables(amino_acids={'A': 0}, targets=self.encoder.targets)
+
+    def test_load_default_migrates_legacy_model(self):
+        dump(self.training, os.path.join(self.tmp_dir, ModelArtifact.legacy_filename))
+        with patch('src.settings.Settings.model_path', new_callable=PropertyMock) as model_path:
+            model_path.return_value = self.tmp_dir
+            artifact = ModelArtifact.load_default()
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp_dir, ModelArtifact.default_name)))
+        self.assertIn('migrated_from', artifact.metadata)
+        predictions = artifact.to_classifier().predict(self.X_data)
+        self.assertTrue((predictions == self.training.model.predict(self.X_data)).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from unittest.mock import patch, PropertyMock
+from sklearn.neural_network import MLPClassifier
+from src.inference import InferenceEngine
+from src.predict import BatchPredict, Predict, SequencePredict
+from src.prediction_cache import PredictionCache
+from src.read_dssp import ReadDSSP
+from src.residue import Residue
+from test import TemporaryDsspCache
+
+temporary_cache = TemporaryDsspCache()
+setUpModule = temporary_cache.start
+tearDownModule = temporary_cache.stop
+
+
+class TestBatchPredict(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pdb_ids = ['1tes', '2tes', '3tes']
+        for pdb_id in self.pdb_ids:
+            shutil.copy('./test/1tes.dssp', os.path.join(self.tmp_dir, pdb_id + '.dssp'))
+        self.patcher = patch('src.settings.Settings.dssp_path', new_callable=PropertyMock)
+        self.patcher.start().return_value = self.tmp_dir
+        # Predictions are only cached where a test passes a cache.
+        self.cache_patcher = patch('src.settings.Settings.prediction_cache_enabled', new_callable=PropertyMock,
+                                   return_value=False)
+        self.cache_patcher.start()
+        self.residue = Residue(pdb_id='1tes', feature_format='codes')
+        self.residue.set_residue_and_structure()
+        self.residue.get_X_and_Y_arrays()
+        self.model = MLPClassifier(hidden_layer_sizes=(4,), max_iter=20, random_state=1)
+        self.model.fit(self.residue.encoder.to_sparse(self.residue.X_data), self.residue.Y_data)
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        self.cache_patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_predict(self):
+        predict = BatchPredict(pdb_id_lst=self.pdb_ids + ['1foo'], model=self.model, batch_size=500)
+        fp = io.StringIO()
+        predict.predict(fp=fp)
+        results = [json.loads(line) for line in fp.getvalue().splitlines()]
+        self.assertEqual([result['pdb_id'] for result in results], self.pdb_ids + ['1foo'])
+        self.assertIn('error', results[-1])
+        self.assertEqual(predict.n_proteins, 3)
+        self.assertEqual(predict.n_residues, 3 * self.residue.residue_count)
+
+        Y_data_pred = self.model.predict(self.residue.encoder.to_sparse(self.residue.X_data))
+        # Per-protein Q3 is computed over the labeled groups only, as by Predict.accuracy.
+        is_labeled = self.residue.Y_data.sum(axis=1) == 1
+        q3 = np.all(Y_data_pred == self.residue.Y_data, axis=1)[is_labeled].mean()
+        for result in results[:-1]:
+            self.assertEqual(result['groups'], is_labeled.sum())
+            self.assertAlmostEqual(result['q3'], q3, places=4)
+            self.assertAlmostEqual(sum(result['frequencies'].values()), 1, places=3)
+            self.assertLessEqual(sum(result['predicted_frequencies'].values()), 1 + 1e-3)
+        self.assertEqual(predict.metrics.n_proteins, 3)
+        self.assertEqual(predict.metrics.n_groups, 3 * is_labeled.sum())
+        is_correct = np.all(Y_data_pred == self.residue.Y_data, axis=1)
+        self.assertAlmostEqual(predict.metrics.q3, is_correct[is_labeled].mean())
+
+    def test_batch_size_does_not_change_results(self):
+        outputs = []
+        for batch_size in (1, 10 ** 6):
+            fp = io.StringIO()
+            BatchPredict(pdb_id_lst=self.pdb_ids, model=self.model, batch_size=batch_size).predict(fp=fp)
+            outputs.append(fp.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_single_protein_without_residues(self):
+        with open(os.path.join(self.tmp_dir, '4tes.dssp'), 'w') as fp:
+            fp.write('no residues\n')
+        for pdb_id in ('1tesZ', '4tes'):
+            with self.assertRaises(ValueError):
+                Predict(pdb_id=pdb_id, model=self.model, feature_format='codes').predict()
+
+    def test_cache(self):
+        fp = io.StringIO()
+        BatchPredict(pdb_id_lst=self.pdb_ids, model=self.model).predict(fp=fp)
+        cache = PredictionCache(memory_max_bytes=10 ** 6, disk_path=None)
+        # The three proteins have the same sequence, so the network predicts the first of them once.
+        for batch_size, n_calls in ((10 ** 6, 1), (1, 0)):
+            cached_fp = io.StringIO()
+            predict = BatchPredict(pdb_id_lst=self.pdb_ids, model=self.model, batch_size=batch_size, cache=cache)
+            with patch.object(InferenceEngine, 'predict', autospec=True, side_effect=InferenceEngine.predict) as run:
+                predict.predict(fp=cached_fp)
+            self.assertEqual(cached_fp.getvalue(), fp.getvalue())
+            self.assertEqual(run.call_count, n_calls)
+            self.assertEqual(len(run.call_args.args[1]) if n_calls else 0, n_calls * len(self.residue.X_data))
+        self.assertEqual((cache.hits, cache.misses), (5, 1))
+
+
+class TestSequencePredict(unittest.TestCase):
+    def setUp(self) -> None:
+        self.patcher = patch('src.settings.Settings.prediction_cache_enabled', new_callable=PropertyMock,
+                             return_value=False)
+        self.patcher.start()
+        self.addCleanup(self.patcher.stop)
+        with open('./test/1tes.dssp', 'rb') as fp:
+            aa_codes, category_codes = ReadDSSP.parse(fp.read())
+        self.residue = Residue(pdb_id='1tes', feature_format='codes')
+        self.residue.set_codes(aa_codes=aa_codes, category_codes=category_codes)
+        self.residue.get_X_and_Y_arrays()
+        self.model = MLPClassifier(hidden_layer_sizes=(4,), max_iter=20, random_state=1)
+        self.model.fit(self.residue.encoder.to_sparse(self.residue.X_data), self.residue.Y_data)
+        sequence = ''.join(residue.amino_acid for residue in self.residue.residue_and_structure)
+        self.records = [('p1', sequence), ('empty', ''), ('short', 'ACD'), ('p2', sequence[:100])]
+
+    def test_iter_predictions(self):
+        predictions = list(SequencePredict(model=self.model, batch_size=64).iter_predictions(records=self.records))
+        self.assertEqual([name for name, _ in predictions], ['p1', 'empty', 'short', 'p2'])
+        self.assertEqual([len(structure) for _, structure in predictions], [len(seq) for _, seq in self.records])
+        self.assertTrue(set(''.join(structure for _, structure in predictions)) <= set('HEC'))
+        # Residues with a complete training window are predicted from the same window.
+        encoder = self.residue.encoder
+        probabilities = self.model.predict_proba(encoder.to_sparse(self.residue.X_data[encoder.central_aa_pos:]))
+        expected = ''.join('HEC'[i] for i in np.argmax(probabilities, axis=1))
+        self.assertEqual(predictions[0][1][encoder.central_aa_pos:len(self.residue.X_data)], expected)
+
+    def test_non_ascii_record(self):
+        records = [('p2', self.records[3][1]), ('bad', 'MKÄLV\ufffdA'), ('p2 again', self.records[3][1])]
+        predictions = list(SequencePredict(model=self.model, batch_size=64).iter_predictions(records=records))
+        self.assertEqual([name for name, _ in predictions], ['p2', 'bad', 'p2 again'])
+        self.assertEqual(len(predictions[1][1]), 7)
+        self.assertTrue(set(predictions[1][1]) <= set('HEC'))
+        self.assertEqual(predictions[0][1], predictions[2][1])
+
+    def test_batch_size_does_not_change_results(self):
+        outputs = []
+        for batch_size in (1, 7, 10 ** 5):
+            fp = io.StringIO()
+            predict = SequencePredict(model=self.model, batch_size=batch_size)
+            predict.predict(records=iter(self.records), fp=fp)
+            outputs.append(fp.getvalue())
+            self.assertEqual(predict.n_sequences, 4)
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        self.assertTrue(outputs[0].startswith('>p1\n'))
+
+    def test_cache(self):
+        records = self.records + [('p1 again', self.records[0][1]), ('p2 again', self.records[3][1])]
+        expected = list(SequencePredict(model=self.model).iter_predictions(records=records))
+        cache = PredictionCache(memory_max_bytes=10 ** 6, disk_path=None)
+        for batch_size in (10 ** 5, 7):
+            predict = SequencePredict(model=self.model, batch_size=batch_size, cache=cache)
+            self.assertEqual(list(predict.iter_predictions(records=records)), expected)
+        # Repeats within the first pass share the prediction of their first record and count as hits.
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(cache.hits, 2 + 6)
+        self.assertEqual(len(cache.memory), 4)
+
+        retrained = MLPClassifier(hidden_layer_sizes=(4,), max_iter=20, random_state=2)
+        retrained.fit(self.residue.encoder.to_sparse(self.residue.X_data), self.residue.Y_data)
+        list(SequencePredict(model=retrained, cache=cache).iter_predictions(records=records))
+        self.assertEqual(cache.misses, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
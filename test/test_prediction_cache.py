@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from unittest.mock import patch, PropertyMock
+from src.inference import InferenceEngine
+from src.prediction_cache import PredictionCache
+
+
+class TestPredictionCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.disk_path = os.path.join(self.tmp_dir, 'predictions')
+        rng = np.random.default_rng(1)
+        self.engine = InferenceEngine(coefs=[rng.normal(size=(6, 3)), rng.normal(size=(3, 3))],
+                                      intercepts=[np.zeros(3), np.zeros(3)])
+        self.sequence = rng.integers(0, 20, size=50).astype(np.uint8)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def get_key(self, aa_codes: np.ndarray, **kwargs) -> str:
+        return PredictionCache.get_key(**{
+            'fingerprint': self.engine.fingerprint, 'window_length': 13, 'kind': 'structure', 'aa_codes': aa_codes,
+            **kwargs
+        })
+
+    def test_key(self):
+        key = self.get_key(self.sequence)
+        self.assertEqual(key, self.get_key(list(self.sequence)))
+        self.assertNotEqual(key, self.get_key(self.sequence[:-1]))
+        self.assertNotEqual(key, self.get_key(self.sequence, window_length=17))
+        self.assertNotEqual(key, self.get_key(self.sequence, kind='labels'))
+        self.assertNotEqual(key, self.get_key(self.sequence, chains=np.full(50, ord('A'), dtype=np.uint8)))
+
+    def test_fingerprint_follows_the_weights(self):
+        same = InferenceEngine(coefs=self.engine.coefs, intercepts=self.engine.intercepts)
+        self.assertEqual(same.fingerprint, self.engine.fingerprint)
+        coefs = [coef.copy() for coef in self.engine.coefs]
+        coefs[1][0, 0] += 1e-3
+        changed = InferenceEngine(coefs=coefs, intercepts=self.engine.intercepts)
+        self.assertNotEqual(changed.fingerprint, self.engine.fingerprint)
+        self.assertNotEqual(self.get_key(self.sequence), self.get_key(self.sequence, fingerprint=changed.fingerprint))
+
+    def test_memory_lru(self):
+        cache = PredictionCache(memory_max_bytes=250, disk_path=None)
+        keys = [self.get_key(self.sequence[:length]) for length in (10, 20, 30)]
+        self.assertIsNone(cache.get(keys[0]))
+        for key in keys:
+            cache.put(key, np.full(100, 1, dtype=np.uint8))
+        self.assertEqual(cache.memory_bytes, 200)
+        self.assertIsNone(cache.get(keys[0]))
+        np.testing.assert_array_equal(cache.get(keys[1]), np.full(100, 1, dtype=np.uint8))
+        cache.put(keys[0], np.zeros(100, dtype=np.uint8))
+        self.assertEqual(list(cache.memory), [keys[1], keys[0]])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertAlmostEqual(cache.hit_rate, 1 / 3)
+        with self.assertRaises(ValueError):
+            cache.get(keys[0])[0] = 1
+
+    def test_disk_tier(self):
+        key = self.get_key(self.sequence)
+        structure = np.frombuffer(b'HHHEEECCC', dtype=np.uint8)
+        PredictionCache(memory_max_bytes=0, disk_path=self.disk_path).put(key, structure)
+        cache = PredictionCache(disk_path=self.disk_path)
+        np.testing.assert_array_equal(cache.get(key), structure)
+        self.assertEqual((cache.hits, cache.disk_hits), (1, 1))
+        cache.get(key)
+        self.assertEqual((cache.hits, cache.disk_hits), (2, 1))
+        self.assertEqual(os.listdir(self.disk_path), [key + PredictionCache.entry_extension])
+
+    def test_disk_eviction(self):
+        cache = PredictionCache(disk_path=self.disk_path, disk_max_bytes=0)
+        keys = [self.get_key(self.sequence[:length]) for length in range(1, 5)]
+        for key in keys:
+            cache.put(key, np.zeros(1000, dtype=np.uint8))
+        entry_size = os.path.getsize(cache.get_entry_path(keys[0]))
+        os.utime(cache.get_entry_path(keys[0]), ns=(1, 1))
+        cache = PredictionCache(disk_path=self.disk_path, disk_max_bytes=3 * entry_size)
+        cache.put(self.get_key(self.sequence), np.zeros(1000, dtype=np.uint8))
+        self.assertFalse(os.path.exists(cache.get_entry_path(keys[0])))
+        self.assertEqual(len(os.listdir(self.disk_path)), 3)
+
+    def test_for_model(self):
+        cache = PredictionCache(disk_path=None)
+        self.assertIs(PredictionCache.for_model(self.engine, cache=cache), cache)
+        self.assertIsNone(PredictionCache.for_model(object(), cache=cache))
+        with patch('src.settings.Settings.prediction_cache_enabled', new_callable=PropertyMock, return_value=False):
+            self.assertIsNone(PredictionCache.for_model(self.engine))
+        with patch('src.settings.Settings.prediction_cache_path', new_callable=PropertyMock,
+                   return_value=self.disk_path):
+            self.assertEqual(PredictionCache.for_model(self.engine).disk_path, self.disk_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 
+import os
+import shutil
+import tempfile
 import unittest
+import numpy as np
 from unittest.mock import patch, PropertyMock
+from src.instrumentation import Instrumentation
 from src.read_dssp import ReadDSSP
+from src.tables import AminoAcid, Target
 
 
 class TestReadDSSP(unittest.TestCase):
@@ -35,6 +41,122 @@ class TestReadDSSP(unittest.TestCase):
             self.assertTrue(lst[0].amino_acid == 'P')
             self.assertTrue(lst[0].category == 'a')
 
+    def test_read_arrays(self):
+        with patch('src.settings.Settings.dssp_path', new_callable=PropertyMock) as prop:
+            prop.return_value = self.dssp_path
+            aa_codes, category_codes = ReadDSSP.read_arrays(self.dssp_test_filename)
+        self.assertEqual(aa_codes.dtype, np.uint8)
+        self.assertEqual(len(aa_codes), 506)
+        self.assertEqual(len(category_codes), 506)
+        self.assertEqual(aa_codes[0], AminoAcid.mapping['P'])
+        self.assertEqual(category_codes[0], Target.mapping['a'])
+
+    def test_read_matches_line_by_line(self):
+        expected = []
+        read_line = False
+        with open(f'{self.dssp_path}/{self.dssp_test_filename}.dssp', 'r') as fp:
+            for line in fp:
+                if line.startswith(ReadDSSP.header_line):
+                    read_line = True
+                    continue
+                if read_line:
+                    aa, structure, tag = ReadDSSP.extract_info_from_line(line=line)
+                    if tag.name == 'OKAY':
+                        expected.append((aa, ReadDSSP.dssp_structure_to_category(structure_label=structure)))
+        with patch('src.settings.Settings.dssp_path', new_callable=PropertyMock) as prop:
+            prop.return_value = self.dssp_path
+            observed = [tuple(residue) for residue in ReadDSSP.read(self.dssp_test_filename)]
+        self.assertEqual(expected, observed)
+
+    def test_parse_filtering(self):
+        data = (
+            ReadDSSP.header_line + ' BP1 BP2\n' + self.dssp_line0 + self.dssp_line2 + self.dssp_line3 +
+            '   38   38 A !*\n' +
+            '   39   39 A a  E  \n' +
+            '   40   40 A V  e  \n' +
+            '   41   41 A V  *E \n' +
+            '   42   42 A K  S'
+        ).encode('ascii')
+        aa_codes, category_codes = ReadDSSP.parse(data)
+        observed = [tuple(residue) for residue in ReadDSSP.arrays_to_tuples(aa_codes, category_codes)]
+        self.assertEqual(observed, [('P', 'a'), ('V', 'b'), ('V', 'c'), ('K', 'c')])
+
+    def test_parse_counts_lines(self):
+        Instrumentation.reset()
+        with patch('src.settings.Settings.dssp_path', new_callable=PropertyMock) as prop:
+            prop.return_value = self.dssp_path
+            aa_codes, _ = ReadDSSP.read_arrays(self.dssp_test_filename)
+        counters = dict(Instrumentation.counters)
+        Instrumentation.reset()
+        self.assertEqual(counters['residues_kept'], len(aa_codes))
+        self.assertEqual(counters['lines_dropped_chain_break'], 3)
+        self.assertEqual(counters['dssp_lines'], sum(
+            n for name, n in counters.items() if name == 'residues_kept' or name.startswith('lines_dropped_')
+        ))
+
+    def test_split_pdb_id(self):
+        self.assertEqual(ReadDSSP.split_pdb_id('1abcB'), ('1abc', 'B'))
+        self.assertEqual(ReadDSSP.split_pdb_id('1abcAb'), ('1abc', 'Ab'))
+        self.assertEqual(ReadDSSP.split_pdb_id('1abc'), ('1abc', ''))
+        self.assertEqual(ReadDSSP.split_pdb_id('s0001'), ('s0001', ''))
+        self.assertEqual(ReadDSSP.normalize_pdb_id(' 1ABCb\n'), '1abcb')
+        self.assertTrue(ReadDSSP.get_filename('1abcB').endswith('1abc.dssp'))
+
+    def test_read_chains(self):
+        with patch('src.settings.Settings.dssp_path', new_callable=PropertyMock) as prop:
+            prop.return_value = self.dssp_path
+            # A missing chain is an error on the first read, before the chain index is kept, and after it.
+            ReadDSSP.chain_indexes.pop(ReadDSSP.get_filename(self.dssp_test_filename), None)
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    ReadDSSP.read_chain_arrays(self.dssp_test_filename + 'Z')
+            arrays = ReadDSSP.read_chain_arrays(self.dssp_test_filename)
+            for chains in ('B', 'D', 'CA'):
+                for _ in range(2):  # the second read uses the chain index
+                    observed = ReadDSSP.read_chain_arrays(self.dssp_test_filename + chains)
+                    for observed_array, expected_array in zip(observed, ReadDSSP.select_chains(arrays, chains)):
+                        self.assertTrue((observed_array == expected_array).all())
+            self.assertEqual(set(observed[2].tobytes()), {ord('A'), ord('C')})
+            with self.assertRaises(ValueError):
+                ReadDSSP.read_chain_arrays(self.dssp_test_filename + 'E')
+
+    def test_read_compressed(self):
+        with open('./test/1tes.dssp', 'rb') as fp:
+            data = fp.read()
+        expected = ReadDSSP.parse_chains(data)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with patch('src.settings.Settings.dssp_path', new_callable=PropertyMock) as prop:
+                prop.return_value = tmp_dir
+                for suffix, compression in ReadDSSP.compressions.items():
+                    filename = os.path.join(tmp_dir, f'1tes.dssp{suffix}')
+                    with compression.open(filename, 'wb') as fp:
+                        fp.write(data)
+                    self.assertEqual(ReadDSSP.get_filename('1tes'), filename)
+                    for pdb_id in ('1tes', '1tesC', '1tesC'):
+                        observed = ReadDSSP.read_chain_arrays(pdb_id)
+                        for observed_array, expected_array in zip(
+                                observed, ReadDSSP.select_chains(expected, pdb_id[4:])):
+                            self.assertTrue((observed_array == expected_array).all())
+                    os.remove(filename)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_get_chain_index(self):
+        with open('./test/1tes.dssp', 'rb') as fp:
+            data = fp.read()
+        index = ReadDSSP.get_chain_index(data)
+        self.assertEqual(list(index), ['A', 'B', 'C', 'D'])
+        start, stop = index['B']
+        self.assertEqual(data[start + ReadDSSP.chain_pos], ord('B'))
+        self.assertEqual(data[stop - 1], ord('\n'))
+        self.assertTrue((ReadDSSP.parse_lines(data[start:stop])[2] == ord('B')).all())
+
+    def test_parse_no_header(self):
+        aa_codes, category_codes = ReadDSSP.parse(self.dssp_line0.encode('ascii'))
+        self.assertEqual(len(aa_codes), 0)
+        self.assertEqual(len(category_codes), 0)
+
     def test_dssp_label_to_category_alpha_helix(self):
         self.assertEqual(ReadDSSP.dssp_structure_to_category('H'), 'a')
         self.assertEqual(ReadDSSP.dssp_structure_to_category('I'), 'a')
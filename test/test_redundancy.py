@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from unittest.mock import patch, PropertyMock
+from benchmarks.synthetic_dssp import SyntheticDSSP
+from src.read_dssp import ReadDSSP
+from src.redundancy import RedundancyFilter
+from src.training import Training
+
+
+class TestRedundancyFilter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rng = np.random.default_rng(1)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.patcher = patch('src.settings.Settings.dssp_path', new_callable=PropertyMock)
+        self.patcher.start().return_value = self.tmp_dir
+        generator = SyntheticDSSP(seed=2, chain_lengths=(60, 150))
+        self.pdb_ids = ['1aaa', '1aab', '1aac', '1aad']
+        for n_chains, pdb_id in enumerate(self.pdb_ids, start=1):
+            generator.write(directory=self.tmp_dir, pdb_id=pdb_id, n_chains=min(n_chains, 2))
+        shutil.copy(os.path.join(self.tmp_dir, '1aab.dssp'), os.path.join(self.tmp_dir, '2aab.dssp'))
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_sketch(self, chain_id: str, aa_codes: np.ndarray) -> tuple:
+        return chain_id, aa_codes, RedundancyFilter.get_minimizers(aa_codes, kmer_length=5, window=5)
+
+    def mutate(self, aa_codes: np.ndarray, identity: float) -> np.ndarray:
+        mutant = aa_codes.copy()
+        positions = self.rng.choice(len(mutant), size=round(len(mutant) * (1 - identity)), replace=False)
+        mutant[positions] = (mutant[positions] + self.rng.integers(1, 20, size=len(positions))) % 20
+        return mutant
+
+    def test_get_minimizers(self):
+        aa_codes = self.rng.integers(0, 20, size=200).astype(np.uint8)
+        minimizers = RedundancyFilter.get_minimizers(aa_codes, kmer_length=5, window=5)
+        self.assertTrue(200 // 5 <= len(minimizers) < 196)
+        self.assertTrue((np.diff(minimizers.astype(np.float64)) > 0).all())
+        np.testing.assert_array_equal(RedundancyFilter.get_minimizers(aa_codes.copy(), 5, 5), minimizers)
+        self.assertEqual(len(RedundancyFilter.get_minimizers(aa_codes[:4], 5, 5)), 0)
+        self.assertEqual(len(RedundancyFilter.get_minimizers(aa_codes[:7], 5, 5)), 1)
+        with self.assertRaises(ValueError):
+            RedundancyFilter(kmer_length=9)
+
+    def test_cluster(self):
+        parent = self.rng.integers(0, 20, size=300).astype(np.uint8)
+        sketches = [
+            self.get_sketch('1aaaA', parent),
+            self.get_sketch('1aaaB', parent.copy()),  # homo-oligomer
+            self.get_sketch('1aab', self.mutate(parent, identity=0.98)),
+            self.get_sketch('1aac', parent[50:250]),  # fragment
+            self.get_sketch('1aad', self.mutate(parent, identity=0.6)),
+            self.get_sketch('1aae', self.rng.integers(0, 20, size=400).astype(np.uint8)),
+            self.get_sketch('1aaf', parent[:3]),
+        ]
+        redundancy_filter = RedundancyFilter(identity=0.9, kmer_length=5, window=5)
+        redundancy_filter.cluster(sketches=sketches)
+        self.assertEqual(redundancy_filter.representatives, ['1aaaA', '1aad', '1aae', '1aaf'])
+        self.assertEqual(redundancy_filter.clusters['1aaaA'], ['1aaaA', '1aaaB', '1aab', '1aac'])
+        self.assertEqual(redundancy_filter.clusters['1aae'], ['1aae'])
+
+    def test_run(self):
+        redundancy_filter = RedundancyFilter(read_seq=ReadDSSP, n_workers=1)
+        representatives = redundancy_filter.run(pdb_ids=self.pdb_ids + ['2aab', '1foo'])
+        self.assertEqual(representatives, ['1aaa', '1aabA', '1aabB', '1aacA', '1aacB', '1aadA', '1aadB'])
+        self.assertEqual(redundancy_filter.clusters['1aabA'], ['1aabA', '2aabA'])
+        self.assertEqual([pdb_id for pdb_id, _ in redundancy_filter.errors], ['1foo'])
+
+        filepath = os.path.join(self.tmp_dir, 'nonredundant')
+        redundancy_filter.write(filepath=filepath)
+        self.assertEqual(Training.read_pdb_lst(filepath=filepath), representatives)
+        aa_codes, _, chains = ReadDSSP.read_chain_arrays(pdb_id='1aabB')
+        self.assertEqual(set(chains.tolist()), {ord('B')})
+
+        parallel = RedundancyFilter(read_seq=ReadDSSP, n_workers=2)
+        self.assertEqual(parallel.run(pdb_ids=self.pdb_ids + ['2aab', '1foo']), representatives)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 
+import os
+import shutil
+import tempfile
 import unittest
 import numpy as np
 from unittest.mock import patch, PropertyMock
 from src.residue import Residue, ResidueFactory, AminoAcid, Target
+from test import TemporaryDsspCache
+
+temporary_cache = TemporaryDsspCache()
+setUpModule = temporary_cache.start
+tearDownModule = temporary_cache.stop
 
 
 class TestResidue(unittest.TestCase):
@@ -43,6 +51,40 @@ class TestResidue(unittest.TestCase):
         self.assertTrue(isinstance(self.residue.Y_data, np.ndarray))
         self.assertEqual(len(self.residue.Y_data), 501)
 
+    def test_X_array_windows(self):
+        aa_units = np.array(list(self.residue.amino_acids.keys()))
+        central = self.residue.central_aa_pos
+        self.assertFalse(self.residue.X_data[:central].any())
+        for group in (central, central + 1, 250, len(self.residue.X_data) - 1):
+            start = group - central
+            expected = np.concatenate([
+                self.residue.get_onehot_encoded_label(target_units=aa_units, label=residue.amino_acid)
+                for residue in self.residue.residue_and_structure[start:start + self.residue.window_length]
+            ])
+            self.assertTrue(all(expected == self.residue.X_data[group]))
+
+    def test_Y_array_labels(self):
+        central = self.residue.central_aa_pos
+        self.assertFalse(self.residue.Y_data[:central].any())
+        categories = [residue.category for residue in self.residue.residue_and_structure]
+        expected = np.array([
+            self.residue.get_onehot_encoded_label(target_units=self.target_units, label=category)
+            for category in categories[central:len(self.residue.Y_data)]
+        ])
+        self.assertTrue((expected == self.residue.Y_data[central:]).all())
+
+    def test_feature_formats(self):
+        for feature_format in ('codes', 'sparse'):
+            with patch('src.settings.Settings.dssp_path', new_callable=PropertyMock) as prop:
+                prop.return_value = self.dssp_path
+                residue = Residue(pdb_id=self.dssp_test_filename, window_length=5, feature_format=feature_format)
+                residue.set_residue_and_structure()
+                residue.get_X_and_Y_arrays()
+            X_data = residue.encoder.get_estimator_input(residue.X_data, accept_sparse=False)
+            self.assertTrue((X_data == self.residue.X_data).all())
+            self.assertTrue((residue.Y_data == self.residue.Y_data).all())
+        self.assertEqual(residue.Y_data.dtype, np.uint8)
+
     def test_get_onehot_encoded_label_a(self):
         observed = self.residue.get_onehot_encoded_label(target_units=self.target_units, label=self.label_a)
         expected = np.array([1, 0, 0])
@@ -87,6 +129,42 @@ class TestResidueFactory(unittest.TestCase):
                 del inst
 
 
+class TestResidueFactoryErrors(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        for pdb_id in ('1tes', '2tes', '3tes'):
+            shutil.copy('./test/1tes.dssp', os.path.join(self.tmp_dir, pdb_id + '.dssp'))
+        self.pdb_ids = ['1tes', '1foo', '2tes', '3tes']
+        self.patcher = patch('src.settings.Settings.dssp_path', new_callable=PropertyMock)
+        self.patcher.start().return_value = self.tmp_dir
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_construct_reports_errors(self):
+        factory = ResidueFactory(pdb_id_lst=self.pdb_ids, n_workers=1)
+        residues = factory.construct()
+        self.assertEqual(list(residues.keys()), ['1tes', '2tes', '3tes'])
+        self.assertEqual(len(factory.errors), 1)
+        error = factory.errors[0]
+        self.assertEqual(error.pdb_id, '1foo')
+        self.assertEqual(error.exception, 'FileNotFoundError')
+        self.assertTrue(error.filename.endswith('1foo.dssp'))
+
+    def test_construct_parallel(self):
+        sequential = ResidueFactory(pdb_id_lst=self.pdb_ids, feature_format='codes', n_workers=1).construct()
+        factory = ResidueFactory(pdb_id_lst=self.pdb_ids, feature_format='codes', n_workers=2)
+        parallel = factory.construct()
+        self.assertEqual(list(parallel.keys()), list(sequential.keys()))
+        self.assertEqual([error.pdb_id for error in factory.errors], ['1foo'])
+        for pdb_id, residue in parallel.items():
+            self.assertTrue((residue.X_data == sequential[pdb_id].X_data).all())
+            self.assertTrue((residue.Y_data == sequential[pdb_id].Y_data).all())
+            self.assertEqual(residue.category_frequencies, sequential[pdb_id].category_frequencies)
+            self.assertEqual(residue.residue_and_structure[384].amino_acid, 'V')
+
+
 class TestAminoAcid(unittest.TestCase):
     def test_get_table(self):
         expected = {
@@ -97,6 +175,12 @@ class TestAminoAcid(unittest.TestCase):
         self.assertEqual(expected, AminoAcid.mapping)
         self.assertEqual(AminoAcid.mapping['S'], 16)
 
+    def test_get_table_reads_file_once(self):
+        AminoAcid.get_table()
+        with patch('builtins.open', side_effect=AssertionError('table read again')):
+            AminoAcid.get_table()
+            Target.get_table()
+
 
 class TestTarget(unittest.TestCase):
     def test_get_table(self):
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import shutil
+import tempfile
+import unittest
+import warnings
+import numpy as np
+from unittest.mock import patch, PropertyMock
+from benchmarks.synthetic_dssp import SyntheticDSSP
+from src.read_dssp import ReadDSSP
+from src.search import HyperparameterSearch
+
+
+class TestHyperparameterSearch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.patcher = patch('src.settings.Settings.dssp_path', new_callable=PropertyMock)
+        self.patcher.start().return_value = self.tmp_dir
+        self.pdb_ids, _ = SyntheticDSSP(seed=5, chain_lengths=(40, 120)).write_dataset(
+            directory=self.tmp_dir, n_proteins=6
+        )
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_search(self, n_workers: int = 1) -> HyperparameterSearch:
+        return HyperparameterSearch(
+            pdb_lst=self.pdb_ids + ['1foo'], window_lengths=[5, 9], hidden_layer_sizes=[[4], [3, 3]], alphas=[1e-4],
+            n_folds=3, max_iter=20, read_seq=ReadDSSP, n_workers=n_workers
+        )
+
+    def test_folds_split_proteins(self):
+        search = self.get_search()
+        search.load()
+        self.assertEqual(len(search.proteins), 6)
+        self.assertEqual(len(search.errors), 1)
+        folds = search.get_folds()
+        self.assertEqual(len(folds), 3)
+        self.assertEqual(sorted(np.concatenate([test_index for _, test_index in folds]).tolist()), list(range(6)))
+        for train_index, test_index in folds:
+            self.assertFalse(set(train_index.tolist()) & set(test_index.tolist()))
+            self.assertEqual(len(train_index) + len(test_index), 6)
+
+    def test_run(self):
+        search = self.get_search()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            leaderboard = search.run()
+        self.assertEqual(len(leaderboard), 4)
+        self.assertEqual(len(search.results), 12)
+        self.assertEqual([entry['rank'] for entry in leaderboard], [1, 2, 3, 4])
+        self.assertEqual(sorted(leaderboard, key=lambda entry: -entry['q3_mean']), leaderboard)
+        best = leaderboard[0]['candidate']
+        self.assertEqual(search.encoder.window_length, best['window_length'])
+        self.assertEqual(search.model.hidden_layer_sizes, tuple(best['hidden_layer_sizes']))
+        self.assertEqual(search.model.coefs_[0].shape[0], search.encoder.window_length * search.encoder.n_input_units)
+        self.assertEqual(search.get_metadata()['search']['best'], leaderboard[0])
+        self.assertIn('hidden layers', search.format_leaderboard())
+
+    def test_parallel_matches_sequential(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            sequential = self.get_search(n_workers=1).run()
+            parallel = self.get_search(n_workers=2).run()
+        for entry in sequential + parallel:
+            entry.pop('fit_seconds')
+        self.assertEqual(sequential, parallel)
+
+    def test_rank(self):
+        results = [
+            {'candidate_index': 0, 'candidate': 'a', 'q3': 0.5, 'sov': 40., 'fit_seconds': 1., 'n_iter': 10},
+            {'candidate_index': 1, 'candidate': 'b', 'q3': 0.7, 'sov': 60., 'fit_seconds': 2., 'n_iter': 20},
+            {'candidate_index': 0, 'candidate': 'a', 'q3': 0.7, 'sov': 50., 'fit_seconds': 1., 'n_iter': 30},
+        ]
+        leaderboard = HyperparameterSearch.rank(results=results)
+        self.assertEqual([entry['candidate'] for entry in leaderboard], ['b', 'a'])
+        self.assertEqual(leaderboard[1]['q3_mean'], 0.6)
+        self.assertEqual(leaderboard[1]['q3_std'], 0.1)
+        self.assertEqual(leaderboard[1]['fit_seconds'], 2.)
+        self.assertEqual(leaderboard[1]['n_folds'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch, PropertyMock
+from sklearn.neural_network import MLPClassifier
+from src.predict import SequencePredict
+from src.prediction_cache import PredictionCache
+from src.read_dssp import ReadDSSP
+from src.residue import Residue
+from src.server import MicroBatcher, PredictionServer
+
+
+def get_model() -> MLPClassifier:
+    with open('./test/1tes.dssp', 'rb') as fp:
+        aa_codes, category_codes = ReadDSSP.parse(fp.read())
+    residue = Residue(pdb_id='1tes', feature_format='codes')
+    residue.set_codes(aa_codes=aa_codes, category_codes=category_codes)
+    residue.get_X_and_Y_arrays()
+    model = MLPClassifier(hidden_layer_sizes=(4,), max_iter=20, random_state=1)
+    model.fit(residue.encoder.to_sparse(residue.X_data), residue.Y_data)
+    return model
+
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.predictor = SequencePredict(model=get_model())
+        self.encoder = self.predictor.encoder
+        self.X_codes = [
+            self.encoder.get_residue_window_codes(self.encoder.encode_labels(sequence, self.encoder.input_lookup))
+            for sequence in ('ACDEFGHIKLMNPQ', 'WY', '', 'KLMNPQRSTVWYACDEF')
+        ]
+
+    def test_concurrent_requests_share_a_batch(self):
+        batcher = MicroBatcher(predictor=self.predictor, max_batch_size=1000, max_wait=0.5)
+        futures = [batcher.submit(X_codes=X_codes) for X_codes in self.X_codes]
+        structures = [future.result(timeout=5) for future in futures]
+        batcher.close()
+        self.assertEqual(batcher.n_batches, 1)
+        self.assertEqual(batcher.n_requests, 4)
+        for X_codes, structure in zip(self.X_codes, structures):
+            self.assertEqual(structure, self.predictor.predict_labels(X_codes=X_codes))
+
+    def test_max_batch_size(self):
+        batcher = MicroBatcher(predictor=self.predictor, max_batch_size=1, max_wait=0.5)
+        futures = [batcher.submit(X_codes=X_codes) for X_codes in self.X_codes[:2]]
+        [future.result(timeout=5) for future in futures]
+        batcher.close()
+        self.assertEqual(batcher.n_batches, 2)
+
+
+class TestPredictionServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        shutil.copy('./test/1tes.dssp', os.path.join(self.tmp_dir, '1tes.dssp'))
+        self.patcher = patch('src.settings.Settings.dssp_path', new_callable=PropertyMock)
+        self.patcher.start().return_value = self.tmp_dir
+        self.server = PredictionServer(model=get_model(), port=0, read_seq=ReadDSSP,
+                                       cache=PredictionCache(disk_path=None))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def post(self, body: dict) -> dict:
+        request = urllib.request.Request(f'{self.url}/predict', data=json.dumps(body).encode('utf-8'))
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_predict_sequence(self):
+        response = self.post({'name': 'seq', 'sequence': 'acdefghiklmnpqrstvwy'})
+        self.assertEqual(response['name'], 'seq')
+        self.assertEqual(len(response['structure']), 20)
+        self.assertTrue(set(response['structure']) <= set('HEC'))
+
+    def test_predict_pdb_id(self):
+        response = self.post({'pdb_id': '1TES'})
+        aa_codes, _ = ReadDSSP.read_arrays(pdb_id='1tes')
+        self.assertEqual(len(response['structure']), len(aa_codes))
+        self.assertEqual(len(response['observed']), len(aa_codes))
+        self.assertTrue(0 <= response['q3'] <= 1)
+
+    def test_errors(self):
+        os.makedirs(os.path.join(self.tmp_dir, '2dir.dssp'))
+        for body, status in (({'pdb_id': '1foo'}, 404), ({'pdb_id': '1tesZ'}, 400), ({'name': 'no sequence'}, 400),
+                             ({'pdb_id': '../../etc/passwd'}, 400), ({'pdb_id': '1tes/../1tes'}, 400),
+                             ({'pdb_id': '2dir'}, 500)):
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                self.post(body)
+            self.assertEqual(context.exception.code, status)
+
+    def test_health(self):
+        self.post({'sequence': 'ACDEFG'})
+        with urllib.request.urlopen(f'{self.url}/health') as response:
+            health = json.loads(response.read())
+        self.assertEqual(health['status'], 'ok')
+        self.assertEqual(health['requests'], 1)
+
+    def test_repeated_sequence_is_cached(self):
+        structures = [self.post({'sequence': 'ACDEFGHIK'})['structure'] for _ in range(3)]
+        self.assertEqual(len(set(structures)), 1)
+        self.assertEqual(self.post({'pdb_id': '1tes'}), self.post({'pdb_id': '1tes'}))
+        with urllib.request.urlopen(f'{self.url}/health') as response:
+            health = json.loads(response.read())
+        self.assertEqual(health['requests'], 2)
+        self.assertEqual(health['prediction_cache']['hits'], 3)
+        self.assertEqual(health['prediction_cache']['misses'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
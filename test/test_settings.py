@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 
 import os
+import sys
+import shutil
+import subprocess
+import tempfile
 import unittest
-from src.settings import Settings
+from unittest.mock import patch
+from src.settings import Settings, find_settings_file
 
 
 class TestSettings(unittest.TestCase):
@@ -11,6 +16,37 @@ class TestSettings(unittest.TestCase):
         self.assertTrue(os.path.exists(Settings.dssp_path))
         self.assertEqual('.dssp', Settings.dssp_extension)
 
+    def test_find_settings_file(self):
+        repository_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with patch('os.getcwd', return_value=tmp_dir):
+                self.assertEqual(find_settings_file(), os.path.join(repository_dir, 'settings.ini'))
+                with open(os.path.join(tmp_dir, 'settings.ini'), 'w') as fp:
+                    fp.write('[PATHS]\n')
+                self.assertEqual(find_settings_file(), os.path.join(tmp_dir, 'settings.ini'))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_paths_are_relative_to_settings_file(self):
+        settings_dir = os.path.dirname(Settings.settings_file)
+        self.assertEqual(Settings.amino_acids, os.path.join(settings_dir, 'data', 'amino_acids.csv'))
+        self.assertTrue(os.path.isabs(Settings.model_path))
+
+    def test_settings_are_read_on_first_access(self):
+        repository_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = '\n'.join([
+            'from src.settings import Settings',
+            "assert not Settings.is_loaded and 'dssp_path' not in vars(Settings)",
+            'Settings.cache_enabled = False',
+            'print(Settings.dssp_extension, Settings.cache_enabled, Settings.is_loaded)',
+        ])
+        output = subprocess.run([sys.executable, '-c', script], cwd=repository_dir, capture_output=True, text=True,
+                                check=True).stdout
+        self.assertEqual(output.split(), [Settings.dssp_extension, 'False', 'True'])
+        with self.assertRaises(AttributeError):
+            Settings.no_such_setting
+
 
 if __name__ == '__main__':
     unittest.main()
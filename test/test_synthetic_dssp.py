@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, PropertyMock
+from benchmarks.synthetic_dssp import SyntheticDSSP
+from src.read_dssp import ReadDSSP
+
+
+class TestSyntheticDSSP(unittest.TestCase):
+    def test_read_dssp_reads_expected_codes(self):
+        generator = SyntheticDSSP(seed=2, break_rate=0.05)
+        for _ in range(10):
+            content, aa_codes, category_codes = generator.generate(pdb_id='1syn')
+            aa_read, category_read = ReadDSSP.parse(data=content)
+            self.assertTrue((aa_read == aa_codes).all())
+            self.assertTrue((category_read == category_codes).all())
+
+    def test_chains_and_length(self):
+        generator = SyntheticDSSP(seed=3, break_rate=0.)
+        content, aa_codes, _ = generator.generate(pdb_id='1syn', n_chains=3, n_residues=300)
+        self.assertEqual(content.count(b'        !*'), 2)
+        self.assertEqual(content.count(b'        !'), 2)
+        self.assertLessEqual(len(aa_codes), 300)
+        self.assertEqual(bytes(sorted(set(ReadDSSP.parse_chains(data=content)[2].tolist()))), b'ABC')
+
+    def test_write_dataset(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with patch('src.settings.Settings.dssp_path', new_callable=PropertyMock) as dssp_path:
+                dssp_path.return_value = tmp_dir
+                pdb_ids, n_residues = SyntheticDSSP(seed=4).write_dataset(directory=tmp_dir, n_proteins=3)
+                self.assertEqual(sum(len(ReadDSSP.read_arrays(pdb_id)[0]) for pdb_id in pdb_ids), n_residues)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
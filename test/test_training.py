@@ -1,8 +1,19 @@
 #!/usr/bin/env python3
 
+import os
+import shutil
+import tempfile
 import unittest
 import numpy as np
+from unittest.mock import patch, PropertyMock
+from src.model_io import ModelArtifact
+from src.residue import Residue, ResidueFactory
 from src.training import Training
+from test import TemporaryDsspCache
+
+temporary_cache = TemporaryDsspCache()
+setUpModule = temporary_cache.start
+tearDownModule = temporary_cache.stop
 
 
 class TestTraining(unittest.TestCase):
@@ -32,5 +43,120 @@ class TestTraining(unittest.TestCase):
         self.training.train()
 
 
+class TestTrainingPreprocess(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pdb_ids = ['1tes', '2tes', '3tes']
+        for pdb_id in self.pdb_ids:
+            shutil.copy('./test/1tes.dssp', os.path.join(self.tmp_dir, pdb_id + '.dssp'))
+        self.patcher = patch('src.settings.Settings.dssp_path', new_callable=PropertyMock)
+        self.patcher.start().return_value = self.tmp_dir
+        residue = Residue(pdb_id='1tes')
+        residue.set_residue_and_structure()
+        residue.get_X_and_Y_arrays()
+        self.X_expected = np.concatenate([residue.X_data] * len(self.pdb_ids))
+        self.Y_expected = np.concatenate([residue.Y_data] * len(self.pdb_ids))
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_training(self, feature_format: str) -> Training:
+        training = Training(feature_format=feature_format)
+        training.pdb_lst = self.pdb_ids + ['1foo']
+        return training
+
+    def test_preprocess(self):
+        for feature_format in ('dense', 'codes', 'sparse'):
+            training = self.get_training(feature_format=feature_format)
+            training.preprocess()
+            X_data = training.encoder.get_estimator_input(training.X_data, accept_sparse=False)
+            self.assertTrue((X_data == self.X_expected).all())
+            self.assertTrue((training.Y_data == self.Y_expected).all())
+            self.assertEqual([error.pdb_id for error in training.errors], ['1foo'])
+        self.assertEqual(training.X_data.format, 'csr')
+
+    def test_iter_chunks_per_protein(self):
+        training = self.get_training(feature_format='dense')
+        chunks = list(training.iter_chunks())
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue((np.concatenate([X for X, _ in chunks]) == self.X_expected).all())
+        self.assertEqual(len(training.errors), 1)
+
+    def test_iter_chunks_fixed_size(self):
+        training = self.get_training(feature_format='codes')
+        chunks = list(training.iter_chunks(chunk_size=400))
+        self.assertEqual([len(X) for X, _ in chunks[:-1]], [400] * (len(chunks) - 1))
+        X_data = training.encoder.expand_X(np.concatenate([X for X, _ in chunks]))
+        Y_data = np.concatenate([Y for _, Y in chunks])
+        self.assertTrue((X_data == self.X_expected).all())
+        self.assertTrue((Y_data == self.Y_expected).all())
+
+
+    def test_iter_minibatches(self):
+        training = self.get_training(feature_format='codes')
+        training.batch_size = 300
+        training.shuffle_buffer = 2
+        batches = list(training.iter_minibatches(pdb_lst=self.pdb_ids, rng=np.random.default_rng(1)))
+        self.assertTrue(all(len(X) <= 300 for X, _ in batches))
+        X_codes = np.concatenate([X for X, _ in batches])
+        self.assertEqual(len(X_codes), len(self.X_expected))
+        X_sorted = np.sort(training.encoder.expand_X(X_codes), axis=0)
+        self.assertTrue((X_sorted == np.sort(self.X_expected, axis=0)).all())
+
+    def test_train_streaming(self):
+        training = self.get_training(feature_format='codes')
+        training.pdb_lst = self.pdb_ids + ['4tes']
+        shutil.copy('./test/1tes.dssp', os.path.join(self.tmp_dir, '4tes.dssp'))
+        training.n_epochs = 2
+        training.train_streaming()
+        self.assertEqual(len(training.test_pdb_lst), 1)
+        self.assertEqual(len(training.validation_scores), 2)
+        self.assertTrue(0 <= training.validation_scores[-1] <= 1)
+        self.assertEqual(training.model.predict(training.encoder.to_sparse(np.zeros((1, 13), np.uint8))).shape, (1, 3))
+
+    def test_train_continued(self):
+        training = self.get_training(feature_format='codes')
+        training.pdb_lst = self.pdb_ids[:2]
+        training.n_epochs = 2
+        training.train_streaming()
+        parent = ModelArtifact.from_training(training=training)
+        self.assertEqual(parent.pdb_ids, [self.pdb_ids[1]])  # the other protein was held out
+
+        continued = self.get_training(feature_format='dense')
+        continued.n_epochs = 2
+        with patch('src.training.ResidueFactory', wraps=ResidueFactory) as factory:
+            self.assertTrue(continued.train_continued(artifact=parent))
+        self.assertEqual(factory.call_args.kwargs['pdb_id_lst'], [self.pdb_ids[0], self.pdb_ids[2], '1foo'])
+        # Whole proteins are held out, so the windows of a protein are all on one side of the split.
+        self.assertEqual(len(continued.train_pdb_lst), 1)
+        self.assertEqual(sorted(continued.train_pdb_lst + continued.test_pdb_lst), [self.pdb_ids[0], self.pdb_ids[2]])
+        self.assertEqual(continued.get_trained_pdb_lst(), continued.train_pdb_lst)
+        self.assertEqual(continued.n_train_groups, 506 - continued.encoder.window_length)
+        self.assertEqual(continued.Y_test.shape[0], 506 - continued.encoder.window_length)
+        self.assertFalse(np.allclose(continued.model.coefs_[0], parent.coefs[0]))
+        continued.validate_model()
+        self.assertNotIn('sov', continued.validation_report)
+        self.assertNotIn('n_proteins', continued.validation_report)
+        artifact = ModelArtifact.from_training(training=continued)
+        self.assertEqual(artifact.version, 2)
+        self.assertEqual(artifact.lineage[0]['version'], 1)
+        self.assertEqual(artifact.pdb_ids, [self.pdb_ids[1]] + continued.train_pdb_lst)
+        self.assertEqual(artifact.metadata['continued_from_version'], 1)
+        self.assertEqual(artifact.metadata['n_test_proteins'], 1)
+
+        training = self.get_training(feature_format='codes')
+        training.pdb_lst = continued.test_pdb_lst
+        self.assertTrue(training.train_continued(artifact=artifact))
+        self.assertEqual((training.train_pdb_lst, training.test_pdb_lst), (continued.test_pdb_lst, []))
+        self.assertIsNone(training.validate_model())
+
+        training = self.get_training(feature_format='codes')
+        training.pdb_lst = self.pdb_ids
+        artifact.pdb_ids = self.pdb_ids
+        self.assertFalse(training.train_continued(artifact=artifact))
+        self.assertEqual(training.pdb_lst, [])
+
+
 if __name__ == '__main__':
     unittest.main()